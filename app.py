@@ -1,11 +1,11 @@
 import streamlit as st
 import uuid
-from services.recommendation_engine import RecommendationEngine, RecommendationResult
-from components.recommendation_cards import display_recommendation_card
+from services.recommendation_engine import RecommendationResult
+from services.registry import get_recommendation_engine, get_email_service, get_weather_service
+from services.popularity_service import get_popularity_service, season_for
+from components.recommendation_cards import display_recommendation_card, display_recommendation_cards
 from components.map_component import map_component
 from components.filters_component import filters_component
-from services.email_service import EmailService
-from services.weather_service import WeatherService
 from datetime import date, timedelta
 
 # 1. Ana Başlık ve Açıklama
@@ -20,24 +20,23 @@ st.set_page_config(
 with open("assets/styles.css") as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-# Initialize RecommendationEngine
-if 'recommender' not in st.session_state:
-    st.session_state.recommender = RecommendationEngine()
+# Paylaşılan servisler süreç başına bir kez oluşturulur (services/registry.py)
+recommender = get_recommendation_engine()
+weather_service = get_weather_service()
 
-# Initialize EmailService
-if 'email_service' not in st.session_state:
-    try:
-        st.session_state.email_service = EmailService()
-    except ValueError as e:
+# Initialize EmailService (hata mesajı her oturumda bir kez gösterilir)
+try:
+    email_service = get_email_service()
+except ValueError as e:
+    email_service = None
+    if not st.session_state.get("email_service_error_shown"):
         st.error(f"E-posta Servisi Hatası: {e}. Lütfen .env dosyanızdaki EMAIL_SENDER ve EMAIL_PASSWORD değerlerini kontrol edin.")
-        st.session_state.email_service = None
-    except Exception as e:
+        st.session_state.email_service_error_shown = True
+except Exception as e:
+    email_service = None
+    if not st.session_state.get("email_service_error_shown"):
         st.error(f"E-posta Servisi başlatılırken bir hata oluştu: {e}")
-        st.session_state.email_service = None
-
-# Initialize WeatherService
-if 'weather' not in st.session_state:
-    st.session_state.weather = WeatherService()
+        st.session_state.email_service_error_shown = True
 
 # Initialize chat history, user session, and latest recommendations/route
 if "messages" not in st.session_state:
@@ -66,9 +65,9 @@ with right_col:
         mini_end = st.date_input("Bitiş", value=date.today() + timedelta(days=2), key="mini_end", label_visibility="collapsed")
     city_for_weather = st.text_input("Şehir", value=st.session_state.selected_city, key="mini_city", placeholder="Şehir", label_visibility="collapsed")
     if st.button("Güncelle", key="mini_weather_btn") and city_for_weather.strip():
-        coords = st.session_state.recommender.maps_service.get_place_coordinates(city_for_weather.strip())
+        coords = recommender.maps_service.get_place_coordinates(city_for_weather.strip())
         if not coords:
-            fallback = st.session_state.weather.geocode_city(city_for_weather.strip())
+            fallback = weather_service.geocode_city(city_for_weather.strip())
             if fallback:
                 class _Tmp:
                     def __init__(self, lat, lng):
@@ -76,10 +75,10 @@ with right_col:
                         self.longitude = lng
                 coords = _Tmp(fallback[0], fallback[1])
         if coords:
-            forecast = st.session_state.weather.get_daily_forecast(coords.latitude, coords.longitude, mini_start, mini_end)
+            forecast = weather_service.get_daily_forecast(coords.latitude, coords.longitude, mini_start, mini_end)
             if forecast:
-                for day in forecast:
-                    icon = "🌧️" if WeatherService.will_likely_rain(day) else "☀️"
+                for day, rainy in zip(forecast, forecast.rain_mask()):
+                    icon = "🌧️" if rainy else "☀️"
                     temp_min = day.get('temp_min')
                     temp_max = day.get('temp_max')
                     st.markdown(f"<div class='weather-row'>{icon} {day['date']} | {temp_min}°C - {temp_max}°C</div>", unsafe_allow_html=True)
@@ -108,35 +107,15 @@ with st.container():
 
     current_filters = filters_component()
 
-    if st.button("Önerileri Getir", key="get_recommendations_button") and st.session_state.selected_city:
-        with st.spinner("Harika öneriler arıyorum..."):
-            try:
-                full_query = f"{st.session_state.selected_city}"
-                recommendations = st.session_state.recommender.get_travel_recommendations(
-                    full_query, 
-                    st.session_state.user_session_id,
-                    filters=current_filters
-                )
-                st.session_state.latest_recommendations = recommendations
-                if recommendations:
-                    st.session_state.messages.append({"role": "assistant", "type": "recommendations", "content": recommendations})
-                    st.markdown("**Asistan:** İşte size özel öneriler:")
-                else:
-                    st.session_state.messages.append({"role": "assistant", "type": "text", "content": "Üzgünüm, isteğinize uygun bir öneri bulamadım."})
-                    st.session_state.messages.append({"role": "assistant", "type": "text", "content": "Lütfen farklı filtreler deneyin."})
-                    st.markdown("**Asistan:** Üzgünüm, isteğinize uygun bir öneri bulamadım. Lütfen farklı filtreler deneyin.")
-            except ValueError as e:
-                st.error(f"API Anahtarı Hatası: {e}. Lütfen .env dosyanızı kontrol edin.")
-            except Exception as e:
-                st.error(f"Bir hata oluştu: {e}")
+    get_recommendations_clicked = st.button("Önerileri Getir", key="get_recommendations_button") and st.session_state.selected_city
     st.markdown("</div>", unsafe_allow_html=True)
 
 # --- Öneriler ve Harita Bölümü ---
 center_coords = None
 if st.session_state.selected_city.strip():
-    _coords = st.session_state.recommender.maps_service.get_place_coordinates(st.session_state.selected_city.strip())
+    _coords = recommender.maps_service.get_place_coordinates(st.session_state.selected_city.strip())
     if not _coords:
-        fb = st.session_state.weather.geocode_city(st.session_state.selected_city.strip())
+        fb = weather_service.geocode_city(st.session_state.selected_city.strip())
         if fb:
             class _Tmp2:
                 def __init__(self, lat, lng):
@@ -146,11 +125,54 @@ if st.session_state.selected_city.strip():
     if _coords:
         center_coords = (_coords.latitude, _coords.longitude)
 
-if st.session_state.latest_recommendations:
+# Ziyaret saati önerileri seçili şehrin ve mevsimin kural dosyalarıyla verilir
+popularity_service = get_popularity_service(st.session_state.selected_city.strip() or None, season_for(date.today()))
+
+# Yeni arama yapıldıysa kartlar ve harita öneriler geldikçe tek tek çizilir
+if get_recommendations_clicked:
+    st.markdown("<div class=\"st-emotion-cache-k5i0t1\">", unsafe_allow_html=True)
+    st.subheader("Önerileriniz")
+    status_placeholder = st.empty()
+    cards_container = st.container()
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    st.markdown("<div class=\"st-emotion-cache-k5i0t1\">", unsafe_allow_html=True)
+    st.subheader("Harita")
+    map_placeholder = st.empty()
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    recommendations = []
+    status_placeholder.info("Harika öneriler arıyorum...")
+    try:
+        full_query = f"{st.session_state.selected_city}"
+        for rec in recommender.iter_travel_recommendations(
+            full_query,
+            st.session_state.user_session_id,
+            filters=current_filters
+        ):
+            recommendations.append(rec)
+            with cards_container:
+                display_recommendation_card(rec, center_coords=center_coords, popularity_service=popularity_service)
+            with map_placeholder.container():
+                map_component(recommendations, st.session_state.latest_route)
+        st.session_state.latest_recommendations = recommendations
+        if recommendations:
+            st.session_state.messages.append({"role": "assistant", "type": "recommendations", "content": recommendations})
+            status_placeholder.markdown("**Asistan:** İşte size özel öneriler:")
+        else:
+            st.session_state.messages.append({"role": "assistant", "type": "text", "content": "Üzgünüm, isteğinize uygun bir öneri bulamadım."})
+            st.session_state.messages.append({"role": "assistant", "type": "text", "content": "Lütfen farklı filtreler deneyin."})
+            status_placeholder.markdown("**Asistan:** Üzgünüm, isteğinize uygun bir öneri bulamadım. Lütfen farklı filtreler deneyin.")
+    except ValueError as e:
+        status_placeholder.empty()
+        st.error(f"API Anahtarı Hatası: {e}. Lütfen .env dosyanızı kontrol edin.")
+    except Exception as e:
+        status_placeholder.empty()
+        st.error(f"Bir hata oluştu: {e}")
+elif st.session_state.latest_recommendations:
     st.markdown("<div class=\"st-emotion-cache-k5i0t1\">", unsafe_allow_html=True)
     st.subheader("Önerileriniz")
-    for rec in st.session_state.latest_recommendations:
-        display_recommendation_card(rec, center_coords=center_coords)
+    display_recommendation_cards(st.session_state.latest_recommendations, center_coords=center_coords, popularity_service=popularity_service)
     st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("<div class=\"st-emotion-cache-k5i0t1\">", unsafe_allow_html=True)
@@ -160,16 +182,38 @@ if st.session_state.latest_recommendations:
 else:
     st.info("Henüz bir öneri bulunmamaktadır. Lütfen yukarıdaki formu doldurarak arama yapın.")
 
+# --- Yakındaki Yerler (yalnızca önbellekten, Gemini çağrısı yapılmaz) ---
+if center_coords:
+    with st.expander("Yakındaki Kayıtlı Yerler"):
+        nc1, nc2, nc3 = st.columns(3)
+        with nc1:
+            nearby_radius = st.slider("Yarıçap (km)", 1, 50, 5, key="nearby_radius")
+        with nc2:
+            nearby_category = st.selectbox("Kategori", ["Tümü", "Müze", "Doğa", "Tarihi Yer"], key="nearby_category")
+        with nc3:
+            nearby_min_rating = st.slider("En düşük puan", 0.0, 5.0, 0.0, 0.5, key="nearby_min_rating")
+        nearby_places = recommender.nearby(
+            center_coords[0], center_coords[1], nearby_radius,
+            category=None if nearby_category == "Tümü" else nearby_category,
+            min_rating=nearby_min_rating or None,
+            limit=50
+        )
+        if nearby_places:
+            display_recommendation_cards(nearby_places, center_coords=center_coords, popularity_service=popularity_service,
+                                         key_prefix="nearby_")
+        else:
+            st.info("Bu yarıçapta kayıtlı bir yer bulunamadı.")
+
 # --- Favoriler Bölümü ---
 st.markdown("<div class=\"st-emotion-cache-k5i0t1\">", unsafe_allow_html=True)
 st.subheader("Favorilerim")
-favorites = st.session_state.recommender.get_favorites(st.session_state.user_session_id)
+favorites = recommender.get_favorites(st.session_state.user_session_id)
 if favorites:
     st.markdown("<div class='chips'>", unsafe_allow_html=True)
     for fav_place in favorites:
         st.markdown(f"<span class='chip'>{fav_place}</span>", unsafe_allow_html=True)
         if st.button(f"Favorilerden Çıkar", key=f"remove_fav_{fav_place}"):
-            st.session_state.recommender.remove_favorite(st.session_state.user_session_id, fav_place)
+            recommender.remove_favorite(st.session_state.user_session_id, fav_place)
             st.success(f"'{fav_place}' favorilerden çıkarıldı.")
             st.rerun()
     st.markdown("</div>", unsafe_allow_html=True)
@@ -177,14 +221,16 @@ else:
     st.info("Henüz favori bir yeriniz bulunmamaktadır.")
 
 # Favorileri E-posta Gönder Bölümü (Aktif)
-if favorites and st.session_state.get('email_service'):
+if favorites and email_service:
     st.subheader("Favorileri E-posta Olarak Gönder")
     recipient_email = st.text_input("E-posta adresinizi girin:", key="email_input")
     if st.button("Favorileri Gönder", key="send_favorites_email_button"):
         if recipient_email:
             with st.spinner("Favorileriniz e-posta ile gönderiliyor..."):
-                favorite_trip_details = st.session_state.recommender.db_manager.get_favorite_place_details(st.session_state.user_session_id)
-                if st.session_state.email_service.send_favorite_trips_email(recipient_email, favorite_trip_details):
+                # Önbellekte olmayan favoriler tek bir Gemini isteğiyle tamamlanır
+                recommender.get_places_details(favorites)
+                favorite_trip_details = recommender.db_manager.get_favorite_place_details(st.session_state.user_session_id)
+                if email_service.send_favorite_trips_email(recipient_email, favorite_trip_details):
                     st.success(f"Favori gezileriniz {recipient_email} adresine başarıyla gönderildi!")
                 else:
                     st.error("E-posta gönderilirken bir hata oluştu. Lütfen bilgilerinizi kontrol edin.")
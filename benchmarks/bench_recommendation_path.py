@@ -0,0 +1,408 @@
+"""End-to-end benchmark of the recommendation path with stubbed Gemini, Google Maps and Open-Meteo.
+
+Gemini is replaced by the local provider (services/local_ai_service.py), the
+googlemaps client by one returning responses in the Maps API shape, and the
+Open-Meteo session by one serving synthetic forecasts. Every stub adds a fixed
+latency so that cache effects stay visible. All data goes to temporary SQLite
+files; the application database is never touched. Results are written as JSON,
+including the result cache counters of DatabaseManager.get_cache_stats
+(hits, misses, expired, evictions).
+
+    python -m benchmarks.bench_recommendation_path --sessions 1 4 16 --rows 10000 100000 1000000 --output results.json
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from database.database_manager import DatabaseManager
+from services import weather_service
+from services.forecast_cache import ForecastCache
+from services.geo import haversine_km
+from services.geocoding_cache import GeocodingCache
+from services.local_ai_service import LocalRecommendationService
+from services.maps_service import MapsService
+from services.recommendation_engine import RecommendationEngine
+from services.travel_time import TravelTimeMatrix
+from services.weather_service import WeatherService
+
+CATEGORIES = ["Müze", "Tarihi Yer", "Park", "Plaj", "Alışveriş", "Kafe", "Restoran", "Doğa"]
+
+
+def _summary(seconds: Sequence[float]) -> Dict[str, Any]:
+    values = sorted(seconds)
+    if not values:
+        return {"count": 0}
+
+    def pct(p: float) -> float:
+        return values[min(len(values) - 1, int(math.ceil(p * len(values))) - 1)] * 1000
+
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "max_ms": values[-1] * 1000,
+    }
+
+
+def _timed(fn, *args, **kwargs) -> float:
+    began = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - began
+
+
+def _point(key: str) -> tuple:
+    rng = random.Random(key)
+    return round(rng.uniform(36.5, 41.5), 6), round(rng.uniform(27.0, 43.0), 6)
+
+
+class StubMapsClient:
+    """googlemaps.Client stand-in returning deterministic responses in the API's shape."""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+        time.sleep(self.latency_seconds)
+
+    def geocode(self, address: str, **kwargs):
+        self._call("geocode")
+        lat, lng = _point(address)
+        return [{"geometry": {"location": {"lat": lat, "lng": lng}}}]
+
+    def places(self, query: str, **kwargs):
+        self._call("places")
+        return {"results": [{"place_id": f"stub-{query}"}]}
+
+    def place(self, place_id: str, fields=None, **kwargs):
+        self._call("place")
+        return {"result": {"photos": [{"photo_reference": f"{place_id}-{i}"} for i in range(3)]}}
+
+    def directions(self, origin, destination, **kwargs):
+        self._call("directions")
+        return [{"legs": [{"distance": {"text": "12 km"}, "duration": {"text": "20 dk"},
+                           "steps": [{"html_instructions": "Kuzeye ilerleyin"}]}]}]
+
+    def distance_matrix(self, origins, destinations, **kwargs):
+        self._call("distance_matrix")
+        rows = []
+        for origin in origins:
+            elements = []
+            for destination in destinations:
+                seconds = haversine_km(origin[0], origin[1], destination[0], destination[1]) / 40 * 3600
+                elements.append({"status": "OK", "duration": {"value": seconds}})
+            rows.append({"elements": elements})
+        return {"rows": rows}
+
+
+class _StubResponse:
+    def __init__(self, payload: Any):
+        self._payload = payload
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class StubOpenMeteoSession:
+    """requests.Session stand-in answering forecast and geocoding URLs with synthetic payloads."""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = None):
+        params = params or {}
+        with self._lock:
+            self.calls["geocoding" if url == WeatherService.GEOCODING_URL else "forecast"] += 1
+        time.sleep(self.latency_seconds)
+        if url == WeatherService.GEOCODING_URL:
+            lat, lng = _point(params.get("name", ""))
+            return _StubResponse({"results": [{"latitude": lat, "longitude": lng}]})
+        start = date.fromisoformat(params["start_date"])
+        end = date.fromisoformat(params["end_date"])
+        latitudes = str(params["latitude"]).split(",")
+        longitudes = str(params["longitude"]).split(",")
+        payloads = [forecast_payload(float(lat), float(lng), start, end) for lat, lng in zip(latitudes, longitudes)]
+        return _StubResponse(payloads if len(payloads) > 1 else payloads[0])
+
+
+def forecast_payload(latitude: float, longitude: float, start: date, end: date) -> Dict[str, Any]:
+    """An Open-Meteo /v1/forecast response body for one location."""
+    rng = random.Random(f"{latitude:.3f},{longitude:.3f}")
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    daily: Dict[str, Any] = {"time": days}
+    for field in WeatherService.DAILY_FIELDS:
+        if field.startswith("temperature_2m_max"):
+            daily[field] = [round(rng.uniform(15, 35), 1) for _ in days]
+        elif field.startswith("temperature_2m_min"):
+            daily[field] = [round(rng.uniform(2, 18), 1) for _ in days]
+        elif field == "precipitation_probability_max":
+            daily[field] = [rng.randint(0, 100) for _ in days]
+        else:
+            daily[field] = [round(rng.choice([0, 0, 0, 0.4, 3.2, 11.0]), 1) for _ in days]
+    return {"latitude": latitude, "longitude": longitude, "timezone": "Europe/Istanbul", "daily": daily}
+
+
+def _db_size_bytes(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def bench_cold_warm(engine: RecommendationEngine, provider: LocalRecommendationService, cities: int) -> Dict[str, Any]:
+    """Latency of the same queries on a cold cache, from memory, from SQLite and as spelling variants."""
+    names = [f"Soğuk Şehir {i}" for i in range(cities)]
+    calls_before = provider.calls
+    cold = [_timed(engine.get_travel_recommendations, name, "bench") for name in names]
+    provider_calls = provider.calls - calls_before
+    warm_memory = [_timed(engine.get_travel_recommendations, name, "bench") for name in names]
+    engine.recommendation_memory.clear()
+    warm_sqlite = [_timed(engine.get_travel_recommendations, name, "bench") for name in names]
+    # Kanonikleştirme: farklı yazımlar aynı önbellek girdisine düşer
+    variants = [_timed(engine.get_travel_recommendations, f"  {name.upper()} ", "bench",
+                       {"category": "Tümü", "features": []}) for name in names]
+
+    places = [f"Benchmark Yeri {i}" for i in range(cities)]
+    place_cold = [_timed(engine.get_place_details, name) for name in places]
+    place_warm = [_timed(engine.get_place_details, name) for name in places]
+    return {
+        "queries": cities,
+        "recommendations_cold": _summary(cold),
+        "recommendations_warm_memory": _summary(warm_memory),
+        "recommendations_warm_sqlite": _summary(warm_sqlite),
+        "recommendations_spelling_variant": _summary(variants),
+        "provider_calls": provider.calls - calls_before,
+        "provider_calls_cold": provider_calls,
+        "place_details_cold": _summary(place_cold),
+        "place_details_warm": _summary(place_warm),
+    }
+
+
+def bench_concurrency(engine: RecommendationEngine, provider: LocalRecommendationService, maps_client: StubMapsClient,
+                      session_counts: List[int], requests_per_session: int, cities: int, seed: int) -> List[Dict[str, Any]]:
+    """Throughput of N simulated sessions sharing one engine, on a skewed query mix with spelling variants."""
+    results = []
+    for sessions in session_counts:
+        rng = random.Random(f"{seed}-{sessions}")
+        pool = [f"Şehir {sessions}-{i}" for i in range(cities)]
+        weights = [1 / (i + 1) for i in range(cities)]  # Zipf benzeri: birkaç şehir trafiğin çoğunu alır
+        plans = [[rng.choices(pool, weights)[0] for _ in range(requests_per_session)] for _ in range(sessions)]
+        styles = [str, str.upper, str.lower, lambda q: f" {q}  "]
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def run_session(idx: int) -> None:
+            session_rng = random.Random(f"{seed}-{sessions}-{idx}")
+            own = []
+            for query in plans[idx]:
+                own.append(_timed(engine.get_travel_recommendations, session_rng.choice(styles)(query), f"session-{idx}"))
+            with lock:
+                latencies.extend(own)
+
+        provider_before, maps_before = provider.calls, sum(maps_client.calls.values())
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            list(executor.map(run_session, range(sessions)))
+        wall = time.perf_counter() - began
+        total = sessions * requests_per_session
+        results.append({
+            "sessions": sessions,
+            "requests": total,
+            "wall_seconds": wall,
+            "throughput_rps": total / wall if wall else None,
+            "latency": _summary(latencies),
+            "provider_calls": provider.calls - provider_before,
+            "maps_calls": sum(maps_client.calls.values()) - maps_before,
+        })
+    return results
+
+
+def _grow(db: DatabaseManager, start: int, stop: int, rng: random.Random, batch: int = 10000) -> None:
+    for offset in range(start, stop, batch):
+        count = min(batch, stop - offset)
+        db.save_places_to_cache([{
+            "place_name": f"Yer {offset + i}",
+            "latitude": rng.uniform(36.0, 42.0),
+            "longitude": rng.uniform(26.0, 45.0),
+            "description": "Benchmark kaydı",
+            "category": rng.choice(CATEGORIES),
+            "rating": round(rng.uniform(1, 5), 1),
+            "image_urls": [],
+        } for i in range(count)])
+        # search_history yalnızca analiz kaydıdır; büyümesi tek ifadeyle simüle edilir
+        with db.transaction():
+            with db._get_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO search_history (search_query, user_session_id) VALUES (?, ?);",
+                    [(f"sehir {rng.randrange(5000)}_{{}}", f"session-{rng.randrange(100000)}") for _ in range(count)],
+                )
+                conn.commit()
+
+
+def _results_payload(seed: int, query: str) -> Dict[str, Any]:
+    """A recommendation_cache body shaped like the engine's: one provider answer with photo URLs."""
+    provider = LocalRecommendationService(latency_seconds=0.0, jitter_seconds=0.0, error_rate=0.0, seed=seed)
+    recommendations = provider.generate_recommendations(query)
+    for i, rec in enumerate(recommendations):
+        rec.image_urls = [f"https://maps.example/photo/{i}-{n}" for n in range(3)]
+    return {"recommendations": [rec.__dict__ for rec in recommendations]}
+
+
+def _cached_results_hit(db: DatabaseManager, key: str) -> None:
+    # Boş ya da süresi dolmuş giriş ıska yolunu ölçerdi; ölçüm yanlış yola düşerse durdurulur
+    if db.get_cached_results(key) is None:
+        raise RuntimeError(f"Expected a result cache hit for '{key}'")
+
+
+def bench_sqlite_growth(row_counts: List[int], probes: int, seed: int) -> List[Dict[str, Any]]:
+    """DatabaseManager operation latency as places_cache and search_history grow."""
+    rng = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "growth.db")
+        db = DatabaseManager(path)
+        payload = _results_payload(seed, "Sıcak Şehir")
+        if not payload["recommendations"]:
+            raise RuntimeError("Local provider returned no recommendations for the benchmark payload")
+        db.save_search_result("sicak sorgu_{}", payload)
+        rows = 0
+        for target in sorted(row_counts):
+            began = time.perf_counter()
+            _grow(db, rows, target, rng)
+            insert_seconds = time.perf_counter() - began
+            inserted, rows = target - rows, target
+
+            names = [f"Yer {rng.randrange(rows)}" for _ in range(probes)]
+            centers = [(rng.uniform(36.5, 41.5), rng.uniform(27.0, 44.0)) for _ in range(probes)]
+            with db._get_connection() as conn:
+                max_search_id = conn.execute("SELECT MAX(id) FROM search_history;").fetchone()[0] or 0
+            results.append({
+                "rows": rows,
+                "insert_rows_per_second": inserted / insert_seconds if insert_seconds else None,
+                "db_size_bytes": _db_size_bytes(path),
+                "place_lookup": _summary([_timed(db.get_cached_place_details, name) for name in names]),
+                "place_batch_lookup_20": _summary([_timed(db.get_cached_places_details, names[i:i + 20])
+                                                  for i in range(0, probes, 20)]),
+                "nearby_2km": _summary([_timed(db.get_places_within, lat, lng, 2.0, None, None, 50) for lat, lng in centers]),
+                "cached_results_hit": _summary([_timed(_cached_results_hit, db, "sicak sorgu_{}") for _ in range(probes)]),
+                "save_search_result": _summary([_timed(db.save_search_result, f"yeni sorgu {rows}-{i}_{{}}", payload, "bench")
+                                                for i in range(min(probes, 50))]),
+                "popularity_events_batch_5000": _summary([_timed(db.get_popularity_events, "search", max(0, max_search_id - 5000), 5000, 3)
+                                                          for _ in range(3)]),
+                "result_cache": db.get_cache_stats(),
+            })
+        db.close()
+    return results
+
+
+def bench_weather(weather: WeatherService, session: StubOpenMeteoSession, locations: int, days: int, parses: int) -> Dict[str, Any]:
+    """Batched forecast lookups (cold HTTP, then cache) and raw Open-Meteo payload parsing."""
+    rng = random.Random(7)
+    points = [(rng.uniform(36.5, 41.5), rng.uniform(27.0, 44.0)) for _ in range(locations)]
+    start = date.today()
+    end = start + timedelta(days=days - 1)
+    calls_before = session.calls["forecast"]
+    cold = _timed(weather.get_daily_forecasts, points, start, end)
+    http_requests = session.calls["forecast"] - calls_before
+    warm = _timed(weather.get_daily_forecasts, points, start, end)
+    payload = forecast_payload(points[0][0], points[0][1], start, start + timedelta(days=15))
+    parse = [_timed(WeatherService._parse_daily, payload) for _ in range(parses)]
+    geocode_cold = _timed(weather.geocode_city, "Benchmark Şehri")
+    geocode_warm = _timed(weather.geocode_city, "Benchmark Şehri")
+    return {
+        "locations": locations,
+        "days": days,
+        "forecasts_cold_ms": cold * 1000,
+        "forecasts_cold_http_requests": http_requests,
+        "forecasts_warm_ms": warm * 1000,
+        "parse_16_day_payload": _summary(parse),
+        "geocode_cold_ms": geocode_cold * 1000,
+        "geocode_warm_ms": geocode_warm * 1000,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        }
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "engine.db"))
+        provider = LocalRecommendationService(latency_seconds=args.llm_latency, jitter_seconds=0.0,
+                                              error_rate=args.error_rate, seed=args.seed)
+        maps_client = StubMapsClient(args.maps_latency)
+        geocoding_cache = GeocodingCache(db)
+        maps = MapsService(geocoding_cache, TravelTimeMatrix(maps_client, db), client=maps_client)
+        engine = RecommendationEngine(provider, maps, db)
+        session = StubOpenMeteoSession(args.weather_latency)
+        weather_service._session = session
+        weather = WeatherService(geocoding_cache, ForecastCache(db))
+
+        results["cold_warm"] = bench_cold_warm(engine, provider, args.cities)
+        results["concurrency"] = bench_concurrency(engine, provider, maps_client, args.sessions,
+                                                   args.requests_per_session, args.cities, args.seed)
+        results["weather"] = bench_weather(weather, session, args.weather_locations, args.weather_days, args.probes)
+        results["maps_calls"] = dict(maps_client.calls)
+        results["provider"] = {"calls": provider.calls, "injected_errors": provider.injected_errors}
+        results["result_cache"] = db.get_cache_stats()
+        db.close()
+    results["sqlite_growth"] = bench_sqlite_growth(args.rows, args.probes, args.seed)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests-per-session", type=int, default=20)
+    parser.add_argument("--cities", type=int, default=20, help="distinct queries per phase")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="places_cache/search_history sizes to measure at")
+    parser.add_argument("--probes", type=int, default=200, help="samples per database operation")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--maps-latency", type=float, default=0.05)
+    parser.add_argument("--weather-latency", type=float, default=0.1)
+    parser.add_argument("--weather-locations", type=int, default=50)
+    parser.add_argument("--weather-days", type=int, default=7)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="recommendation_path_benchmark.json")
+    parser.add_argument("--verbose", action="store_true", help="keep the services' debug output")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        results = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
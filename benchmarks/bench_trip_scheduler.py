@@ -0,0 +1,67 @@
+"""Solve-time benchmark for TripScheduler on synthetic itineraries and forecasts.
+
+    python -m benchmarks.bench_trip_scheduler
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from services.daily_forecast import DailyForecast
+from services.trip_scheduler import TripScheduler
+
+CATEGORIES = ["Müze", "Tarihi Yer", "Park", "Plaj", "Alışveriş", "Kafe", "Restoran", "Doğa", "Tarihi Yer / Müze", "Doğa Parkı"]
+
+
+def _synthetic_forecast(start: date, days: int, rng: random.Random) -> DailyForecast:
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+    daily = {
+        "time": dates,
+        "temperature_2m_max": [rng.uniform(12, 32) for _ in dates],
+        "temperature_2m_min": [rng.uniform(4, 18) for _ in dates],
+        "rain_sum": [rng.choice([0, 0, 0, 1, 4, 9]) for _ in dates],
+        "precipitation_probability_max": [rng.randint(0, 100) for _ in dates],
+        "windspeed_10m_max": [rng.uniform(5, 45) for _ in dates],
+    }
+    return DailyForecast.from_open_meteo(daily)
+
+
+def run(place_counts, day_counts, repeats: int, seed: int):
+    rng = random.Random(seed)
+    scheduler = TripScheduler()
+    start = date.today()
+    results = []
+    for days in day_counts:
+        forecast = _synthetic_forecast(start, days, rng)
+        for n in place_counts:
+            places = [{"place_name": f"Yer {i}", "category": rng.choice(CATEGORIES)} for i in range(n)]
+            timings = []
+            for _ in range(repeats):
+                began = time.perf_counter()
+                schedule = scheduler.schedule(places, start, start + timedelta(days=days - 1), forecast)
+                timings.append(time.perf_counter() - began)
+            timings.sort()
+            results.append({
+                "places": n,
+                "days": days,
+                "median_ms": timings[len(timings) // 2] * 1000,
+                "max_ms": timings[-1] * 1000,
+                "unscheduled": len(schedule.unscheduled),
+                "weather_conflicts": schedule.weather_conflicts,
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 14, 28])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args.places, args.days, args.repeats, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Cold-start and per-session memory baseline for the shared service registry.
+
+Compares building the services once per process (services/registry.py) with the
+previous behaviour of building a RecommendationEngine/WeatherService per session.
+EmailService is skipped because its constructor logs in to SMTP.
+
+    python -m benchmarks.startup_baseline --sessions 50
+"""
+import argparse
+import json
+import time
+
+from services.registry import ResourceRegistry, _current_rss_bytes
+
+
+def _measure(sessions: int, shared: bool) -> dict:
+    from services.recommendation_engine import RecommendationEngine
+    from services.weather_service import WeatherService
+
+    registry = ResourceRegistry()
+    rss_before = _current_rss_bytes()
+    started = time.perf_counter()
+    per_session = []
+    for i in range(sessions):
+        if shared:
+            state = {
+                "recommender": registry.get("recommendation_engine", RecommendationEngine),
+                "weather": registry.get("weather_service", WeatherService),
+            }
+        else:
+            state = {"recommender": RecommendationEngine(), "weather": WeatherService()}
+        state["user_session_id"] = f"session-{i}"
+        per_session.append(state)
+        if i == 0:
+            first_session_seconds = time.perf_counter() - started
+    total_seconds = time.perf_counter() - started
+    rss_after = _current_rss_bytes()
+    rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return {
+        "mode": "shared" if shared else "per_session",
+        "sessions": sessions,
+        "cold_start_seconds": first_session_seconds,
+        "mean_session_start_seconds": total_seconds / sessions,
+        "rss_delta_bytes": rss_delta,
+        "rss_per_session_bytes": rss_delta / sessions if rss_delta is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+    results = [_measure(args.sessions, shared=False), _measure(args.sessions, shared=True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
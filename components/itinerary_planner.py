@@ -1,5 +1,9 @@
 import streamlit as st
+from datetime import date, timedelta
 from typing import List, Dict, Any, Optional
+from services.registry import get_weather_service
+from services.trip_scheduler import TripScheduler
+from services.popularity_service import get_popularity_service, season_for
 
 def itinerary_planner_component(recommender):
     st.subheader("Gezi Planlayıcı")
@@ -64,6 +68,11 @@ def itinerary_planner_component(recommender):
     if 'selected_itinerary_id' in st.session_state and st.session_state.selected_itinerary_id:
         st.markdown(f"### Gezi Planı Detayları: {st.session_state.selected_itinerary_name}")
         itinerary_places = recommender.db_manager.get_itinerary_places(st.session_state.selected_itinerary_id)
+        # Önbellekte detayı olmayan yerler tek bir toplu istekle tamamlanır
+        places_without_details = [p['place_name'] for p in itinerary_places if p.get('description') is None]
+        if places_without_details:
+            recommender.get_places_details(places_without_details)
+            itinerary_places = recommender.db_manager.get_itinerary_places(st.session_state.selected_itinerary_id)
         if itinerary_places:
             for place in itinerary_places:
                 st.write(f"**{place['order_index'] + 1}. {place['place_name']}**")
@@ -85,5 +94,33 @@ def itinerary_planner_component(recommender):
                         recommender.db_manager.remove_place_from_itinerary(st.session_state.selected_itinerary_id, place['place_name'])
                         st.success(f"'{place['place_name']}' plandan kaldırıldı.")
                         st.experimental_rerun()
+
+            if len(itinerary_places) > 2 and st.button("Rotayı Optimize Et", key=f"optimize_route_{st.session_state.selected_itinerary_id}"):
+                if recommender.optimize_itinerary(st.session_state.selected_itinerary_id):
+                    st.success("Yerler en kısa rotaya göre yeniden sıralandı.")
+                    st.experimental_rerun()
+                else:
+                    st.error("Rota optimize edilirken bir hata oluştu.")
+
+            # Hava durumuna göre gün/saat planı: açık hava yerleri kuru günlere, kapalı yerler yağışlı günlere
+            with st.expander("Hava Durumuna Göre Gün Planı"):
+                sc1, sc2 = st.columns(2)
+                with sc1:
+                    trip_start = st.date_input("Gezi başlangıcı", value=date.today(), key="schedule_start")
+                with sc2:
+                    trip_end = st.date_input("Gezi bitişi", value=date.today() + timedelta(days=2), key="schedule_end")
+                if st.button("Planı Oluştur", key="build_weather_schedule") and trip_end >= trip_start:
+                    located = [p for p in itinerary_places if p.get('latitude') is not None and p.get('longitude') is not None]
+                    forecast = None
+                    if located:
+                        forecast = get_weather_service().get_daily_forecast(located[0]['latitude'], located[0]['longitude'], trip_start, trip_end)
+                    schedule = TripScheduler(get_popularity_service(season=season_for(trip_start))).schedule(itinerary_places, trip_start, trip_end, forecast)
+                    for day, visits in schedule.by_day().items():
+                        st.markdown(f"**{day}**")
+                        for visit in visits:
+                            icon = "🌧️" if visit.rainy_day else "☀️"
+                            st.write(f"{icon} {visit.time_window} - {visit.place_name} ({visit.category})")
+                    if schedule.unscheduled:
+                        st.warning(f"Plana sığmayan yerler: {', '.join(schedule.unscheduled)}")
         else:
             st.info("Bu gezi planında henüz yer bulunmamaktadır.")
@@ -1,32 +1,70 @@
 import streamlit as st
-import math
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from services.gemini_service import RecommendationResult
-from services.popularity_service import PopularityService
+from services.geo import haversine_km_from
+from services.popularity_service import PopularityService, get_popularity_service
+from services.registry import get_recommendation_engine
 
+# Uzaklık rozeti eşikleri (km) ve sınıfları
+_BADGE_CLASSES = ((2, "badge badge-green"), (8, "badge badge-amber"))
+_BADGE_FAR_CLASS = "badge badge-red"
 
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    R = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+
+def _distance_badge_class(dist_km: float) -> str:
+    for limit, cls in _BADGE_CLASSES:
+        if dist_km <= limit:
+            return cls
+    return _BADGE_FAR_CLASS
 
 
 def _distance_badge_html(dist_km: float) -> str:
-    if dist_km <= 2:
-        cls = "badge badge-green"
-    elif dist_km <= 8:
-        cls = "badge badge-amber"
-    else:
-        cls = "badge badge-red"
-    return f"<span class='{cls}'>Merkeze uzaklık: {dist_km:.1f} km</span>"
+    return f"<span class='{_distance_badge_class(dist_km)}'>Merkeze uzaklık: {dist_km:.1f} km</span>"
+
+
+def _coords(recommendation: RecommendationResult) -> Tuple[Optional[float], Optional[float]]:
+    location = recommendation.location or {}
+    return location.get('lat'), location.get('lng')
+
+
+def annotate_recommendations(recommendations: List[RecommendationResult],
+                             center_coords: Optional[Tuple[float, float]] = None,
+                             popularity_service: Optional[PopularityService] = None) -> List[Dict[str, Any]]:
+    """Precomputes what the cards show: distance badge and suggested hours for the whole list.
+
+    Distances are computed in one vectorized pass; hour suggestions are memoized lookups.
+    """
+    # Kartlar arasında paylaşılan örnek (her kart için yeni nesne oluşturulmaz)
+    popularity_service = popularity_service or get_popularity_service()
+    distances: List[Optional[float]] = [None] * len(recommendations)
+    if center_coords and recommendations:
+        lats, lngs = zip(*(_coords(rec) for rec in recommendations))
+        distances = haversine_km_from(center_coords[0], center_coords[1], lats, lngs)
+
+    annotations = []
+    for rec, dist_km in zip(recommendations, distances):
+        best, alt = popularity_service.suggest_hours(rec.category or "", rec.title)
+        annotations.append({
+            "distance_km": dist_km,
+            "badge_html": _distance_badge_html(dist_km) if dist_km is not None else None,
+            "best_hours": best,
+            "alt_hours": alt,
+        })
+    return annotations
+
+
+def display_recommendation_cards(recommendations: List[RecommendationResult], center_coords: Optional[Tuple[float, float]] = None,
+                                 popularity_service: Optional[PopularityService] = None, key_prefix: str = ""):
+    annotations = annotate_recommendations(recommendations, center_coords, popularity_service)
+    for recommendation, annotation in zip(recommendations, annotations):
+        display_recommendation_card(recommendation, center_coords, annotation, key_prefix=key_prefix)
 
 
-def display_recommendation_card(recommendation: RecommendationResult, center_coords: Optional[Tuple[float, float]] = None):
+def display_recommendation_card(recommendation: RecommendationResult, center_coords: Optional[Tuple[float, float]] = None,
+                                annotation: Optional[Dict[str, Any]] = None, popularity_service: Optional[PopularityService] = None,
+                                key_prefix: str = ""):
+    # Aynı yer birden fazla listede (öneriler, yakındaki yerler) görünebilir; key_prefix buton anahtarlarını ayırır
+    if annotation is None:
+        annotation = annotate_recommendations([recommendation], center_coords, popularity_service)[0]
     with st.container():
         st.markdown('<div class="recommendation-card">', unsafe_allow_html=True)
         st.markdown(f"<h3>{recommendation.title}</h3>", unsafe_allow_html=True)
@@ -34,16 +72,11 @@ def display_recommendation_card(recommendation: RecommendationResult, center_coo
         st.markdown(f"<div class='rating'><b>Puan:</b> {recommendation.rating} ⭐</div>", unsafe_allow_html=True)
 
         # Suggested visit hours
-        best, alt = PopularityService().suggest_hours(recommendation.category)
-        st.markdown(f"<div class='category'><b>Önerilen ziyaret saati:</b> {best} <span style='color:#6b7280'>(Alternatif: {alt})</span></div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='category'><b>Önerilen ziyaret saati:</b> {annotation['best_hours']} <span style='color:#6b7280'>(Alternatif: {annotation['alt_hours']})</span></div>", unsafe_allow_html=True)
 
         # Distance from center (if available)
-        if center_coords and recommendation.location and recommendation.location.get('lat') is not None and recommendation.location.get('lng') is not None:
-            try:
-                dist_km = _haversine_km(center_coords[0], center_coords[1], recommendation.location['lat'], recommendation.location['lng'])
-                st.markdown(_distance_badge_html(dist_km), unsafe_allow_html=True)
-            except Exception:
-                pass
+        if annotation["badge_html"]:
+            st.markdown(annotation["badge_html"], unsafe_allow_html=True)
 
         with st.expander("Detayları Gör"):
             st.write(recommendation.description)
@@ -52,8 +85,8 @@ def display_recommendation_card(recommendation: RecommendationResult, center_coo
             else:
                 st.info("Konum bilgisi mevcut değil.")
             
-            if st.button(f"Favorilere Ekle", key=f"add_fav_{recommendation.title}"):
-                if st.session_state.recommender.add_favorite(st.session_state.user_session_id, recommendation.title):
+            if st.button(f"Favorilere Ekle", key=f"{key_prefix}add_fav_{recommendation.title}"):
+                if get_recommendation_engine().add_favorite(st.session_state.user_session_id, recommendation.title):
                     st.success(f"'{recommendation.title}' favorilere eklendi!")
                 else:
                     st.error(f"'{recommendation.title}' favorilere eklenirken bir hata oluştu.")
@@ -0,0 +1,94 @@
+import os
+
+# Uygulama genelindeki ayarlanabilir değerler
+
+# Öneri zenginleştirme (Google Maps geocoding + fotoğraf) için eşzamanlılık ayarları
+ENRICHMENT_MAX_WORKERS = 8
+ENRICHMENT_CALL_TIMEOUT_SECONDS = 8.0
+
+# Geocoding önbelleği (MapsService ve WeatherService ortak kullanır)
+GEOCODE_CACHE_TTL_SECONDS = 30 * 24 * 3600
+GEOCODE_NEGATIVE_TTL_SECONDS = 24 * 3600
+GEOCODE_MEMORY_MAX_ENTRIES = 2048
+
+# SQLite bağlantı ayarları
+SQLITE_BUSY_TIMEOUT_SECONDS = 30.0
+SQLITE_CACHE_SIZE_KB = 16 * 1024
+SQLITE_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+SQLITE_CACHED_STATEMENTS = 256
+
+# Öneri sonuç önbelleği (recommendation_cache) politikası
+RESULT_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+RESULT_CACHE_MAX_ROWS = 5000
+RESULT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+RESULT_CACHE_EVICTION = "lru"  # "lru" veya "lfu"
+RESULT_CACHE_COMPACT_EVERY_N_WRITES = 50
+
+# Süreç içi bellek önbelleği (SQLite önbelleklerinin önünde)
+MEMORY_CACHE_MAX_ENTRIES = 1024
+MEMORY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+MEMORY_CACHE_TTL_SECONDS = 15 * 60
+# Gemini'nin çözemediği yer adları bu süre boyunca tekrar sorulmaz (Streamlit her etkileşimde yeniden çalışır)
+PLACE_DETAILS_NEGATIVE_TTL_SECONDS = 10 * 60
+
+# Aynı anda gelen özdeş öneri isteklerinin liderin sonucunu bekleme süresi
+SINGLE_FLIGHT_WAIT_SECONDS = 60.0
+
+# Hava durumu tahmin önbelleği: koordinatlar bu büyüklükte ızgara hücrelerine yuvarlanır
+FORECAST_GRID_DEGREES = 0.1
+FORECAST_CACHE_TTL_SECONDS = 3600
+# Eksik günler çekilirken pencere en az bu kadar güne genişletilir (Open-Meteo en fazla 16 gün verir)
+FORECAST_PREFETCH_DAYS = 7
+FORECAST_MAX_HORIZON_DAYS = 16
+# Tek bir Open-Meteo isteğinde gönderilecek en fazla konum sayısı
+FORECAST_BATCH_MAX_LOCATIONS = 50
+
+# Rota optimizasyonu (en yakın komşu + 2-opt/Or-opt) için süre bütçesi
+ROUTE_OPTIMIZER_TIME_BUDGET_SECONDS = 0.5
+
+# Distance Matrix yolculuk süresi önbelleği: koordinatlar bu ızgaraya yuvarlanır, süreler haftanın saatine göre saklanır
+TRAVEL_TIME_GRID_DEGREES = 0.005
+TRAVEL_TIME_CACHE_TTL_SECONDS = 7 * 24 * 3600
+# Distance Matrix API sınırları: istek başına en fazla 25 başlangıç, 25 varış ve 100 eleman
+DISTANCE_MATRIX_MAX_ORIGINS = 25
+DISTANCE_MATRIX_MAX_DESTINATIONS = 25
+DISTANCE_MATRIX_MAX_ELEMENTS = 100
+# Tek bir matris hesabında API'den istenecek en fazla eleman; kalanı tahminle doldurulur
+TRAVEL_TIME_MAX_API_ELEMENTS_PER_CALL = 625
+# Kota aşımı / bağlantı hatasından sonra API bu süre boyunca denenmez
+TRAVEL_TIME_API_COOLDOWN_SECONDS = 300
+# Çevrimdışı tahmin: kuş uçuşu mesafe * dolambaç katsayısı / ortalama hız (km/sa)
+TRAVEL_TIME_DETOUR_FACTOR = 1.3
+TRAVEL_MODE_SPEEDS_KMH = {"driving": 30.0, "transit": 20.0, "bicycling": 15.0, "walking": 4.8}
+
+# Ziyaret saati önerileri: şehir/mevsim kural dosyaları ve kategori eşleşmesi önbellek boyutu
+POPULARITY_RULES_DIR = "data/popularity_rules"
+POPULARITY_MATCH_CACHE_SIZE = 4096
+
+# Kayıtlardan öğrenilen yoğunluk eğrileri (python -m services.popularity_model ile güncellenir)
+# Eğriler ziyaret değil uygulama kullanım saatleridir; kural pencerelerinin yerini almaz, yalnızca açıkken
+# en iyi/alternatif pencereyi daha sakin olan önce gelecek şekilde sıralar
+POPULARITY_LEARNED_SUGGESTIONS = False
+POPULARITY_MIN_EVENTS = 500  # Bir eğrinin pencere sıralamasında kullanılması için gereken en az olay sayısı
+POPULARITY_UTC_OFFSET_HOURS = 3  # SQLite zaman damgaları UTC; eğriler yerel saate göre tutulur
+POPULARITY_MODEL_RELOAD_SECONDS = 600
+POPULARITY_UPDATE_BATCH_SIZE = 5000
+
+# Gemini'den istenen öneri sayısı
+RECOMMENDATION_COUNT = 3
+
+# Gemini önerileri akışla alınır; her öneri tamamlanınca zenginleştirme başlar
+GEMINI_STREAMING = True
+
+# Öneri önbelleği anahtarları kanonikleştirilir; eşleşme olmazsa benzer geçmiş sorgu (karakter üçlüleri) aranır
+QUERY_FUZZY_MATCHING = True
+QUERY_FUZZY_THRESHOLD = 0.8  # Dice benzerliği; "izmir"/"izmit" (0.67) gibi farklı şehirler eşleşmez
+QUERY_INDEX_MAX_ENTRIES = 5000
+
+# Öneri sağlayıcısı: "gemini" ya da çevrimdışı yük testleri için "local" (ortam değişkeniyle de seçilebilir)
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")
+# Yerel sağlayıcının gecikme ve hata enjeksiyonu ayarları
+LOCAL_AI_LATENCY_SECONDS = float(os.getenv("LOCAL_AI_LATENCY_SECONDS", "0.8"))
+LOCAL_AI_LATENCY_JITTER_SECONDS = float(os.getenv("LOCAL_AI_LATENCY_JITTER_SECONDS", "0.2"))
+LOCAL_AI_ERROR_RATE = float(os.getenv("LOCAL_AI_ERROR_RATE", "0"))
+LOCAL_AI_SEED = int(os.getenv("LOCAL_AI_SEED", "0"))
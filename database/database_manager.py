@@ -1,17 +1,159 @@
 import sqlite3
 import json
+import threading
+from contextlib import contextmanager
 from typing import Optional, Dict, Any, List
 
+from config.settings import SQLITE_BUSY_TIMEOUT_SECONDS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE_BYTES, SQLITE_CACHED_STATEMENTS
+from services.geo import geohash_cover, geohash_encode, haversine_km
+from services.text_utils import turkish_lower
+from config.settings import (
+    RESULT_CACHE_MAX_AGE_SECONDS,
+    RESULT_CACHE_MAX_ROWS,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_EVICTION,
+    RESULT_CACHE_COMPACT_EVERY_N_WRITES,
+)
+
 DB_PATH = 'database/travel_recommendations.db'
 
+# UTC zaman damgasından haftanın saati (0: Pazartesi 00:00 ... 167: Pazar 23:00); iki parametre saat farkı değiştiricisidir
+_HOUR_OF_WEEK_SQL = "((CAST(strftime('%w', {col}, ?) AS INTEGER) + 6) % 7) * 24 + CAST(strftime('%H', {col}, ?) AS INTEGER)"
+
+
+class _TransactionConnection:
+    """Connection view handed out inside DatabaseManager.transaction().
+
+    `with conn:` blocks and commit() calls of the regular methods become no-ops so
+    that every write joins the surrounding transaction, which commits once.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def commit(self) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class ResultCachePolicy:
+    """Expiry and size limits for the recommendation_cache table."""
+
+    # Tahliye sırası: en değerli satır önce gelir, sınırı aşan sondakiler silinir
+    _KEEP_ORDER = {
+        "lru": "last_accessed_at DESC, created_at DESC",
+        "lfu": "hit_count DESC, last_accessed_at DESC",
+    }
+
+    def __init__(self, max_age_seconds: int = RESULT_CACHE_MAX_AGE_SECONDS, max_rows: int = RESULT_CACHE_MAX_ROWS,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES, eviction: str = RESULT_CACHE_EVICTION,
+                 compact_every_n_writes: int = RESULT_CACHE_COMPACT_EVERY_N_WRITES):
+        if eviction not in self._KEEP_ORDER:
+            raise ValueError(f"Unknown cache eviction policy: {eviction}")
+        self.max_age_seconds = max_age_seconds
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.compact_every_n_writes = compact_every_n_writes
+
+    @property
+    def keep_order(self) -> str:
+        return self._KEEP_ORDER[self.eviction]
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str = DB_PATH):
+    # Yeni bilgi eskisinin üzerine yazılır; eksik konum/görsel bilgisi mevcut değeri silmez
+    _UPSERT_PLACE_SQL = """
+        INSERT INTO places_cache (place_name, latitude, longitude, description, category, rating, image_urls, geohash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(place_name) DO UPDATE SET
+            latitude = COALESCE(excluded.latitude, places_cache.latitude),
+            longitude = COALESCE(excluded.longitude, places_cache.longitude),
+            geohash = COALESCE(excluded.geohash, places_cache.geohash),
+            description = COALESCE(excluded.description, places_cache.description),
+            category = COALESCE(excluded.category, places_cache.category),
+            rating = COALESCE(excluded.rating, places_cache.rating),
+            image_urls = COALESCE(excluded.image_urls, places_cache.image_urls),
+            cached_at = CURRENT_TIMESTAMP;
+    """
+
+    def __init__(self, db_path: str = DB_PATH, cache_policy: Optional[ResultCachePolicy] = None):
         self.db_path = db_path
+        self.cache_policy = cache_policy or ResultCachePolicy()
+        self._cache_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "writes": 0}
+        self._cache_stats_lock = threading.Lock()
+        # Bellek katmanından karşılanan isabetler; LFU/LRU sıralaması için yazmalarda ve sıkıştırmada tabloya işlenir
+        self._pending_hits: Dict[str, int] = {}
+        # Her iş parçacığı kendi bağlantısını tekrar kullanır; iş parçacığı bitince bağlantı da kapanır
+        self._local = threading.local()
         self._create_tables()
         self._migrate_schema()
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, cached_statements=SQLITE_CACHED_STATEMENTS)
+        # WAL: okuyucular yazan bir oturumu beklemez
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_SIZE_KB)};")
+        conn.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE_BYTES)};")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
     def _get_connection(self):
-        return sqlite3.connect(self.db_path)
+        conn = self._thread_connection()
+        if getattr(self._local, "transaction_depth", 0):
+            return _TransactionConnection(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Groups all writes made on this thread inside the block into a single commit.
+
+        Nested blocks join the outermost transaction. On an exception everything is
+        rolled back and the exception is re-raised.
+        """
+        depth = getattr(self._local, "transaction_depth", 0)
+        if depth:
+            self._local.transaction_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.transaction_depth = depth
+            return
+
+        conn = self._thread_connection()
+        conn.execute("BEGIN IMMEDIATE;")
+        self._local.transaction_depth = 1
+        try:
+            yield
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._local.transaction_depth = 0
+
+    def close(self) -> None:
+        """Closes the calling thread's pooled connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
     def _create_tables(self):
         with self._get_connection() as conn:
@@ -35,6 +177,7 @@ class DatabaseManager:
                     category TEXT,
                     rating REAL,
                     image_urls JSON NULL,  -- Yeni eklendi
+                    geohash TEXT NULL,  -- Yakındaki yer sorguları için (koordinat yoksa NULL)
                     cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
             """)
@@ -61,11 +204,75 @@ class DatabaseManager:
                     itinerary_id INTEGER NOT NULL,
                     place_name TEXT NOT NULL,
                     order_index INTEGER NOT NULL,
+                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (itinerary_id) REFERENCES itineraries(id) ON DELETE CASCADE,
                     UNIQUE(itinerary_id, order_index),
                     UNIQUE(itinerary_id, place_name)
                 );
             """)
+            # Sıcak öneri önbelleği; search_history yalnızca analiz amaçlı arama kaydıdır
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS recommendation_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    results JSON NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS weather_forecast_cache (
+                    cell_lat REAL NOT NULL,
+                    cell_lng REAL NOT NULL,
+                    day TEXT NOT NULL,  -- YYYY-MM-DD
+                    payload JSON NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (cell_lat, cell_lng, day)
+                );
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS travel_time_cache (
+                    mode TEXT NOT NULL,
+                    hour_of_week INTEGER NOT NULL,  -- 0: Pazartesi 00:00 ... 167: Pazar 23:00
+                    origin_lat REAL NOT NULL,
+                    origin_lng REAL NOT NULL,
+                    dest_lat REAL NOT NULL,
+                    dest_lng REAL NOT NULL,
+                    minutes REAL NOT NULL,
+                    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (mode, hour_of_week, origin_lat, origin_lng, dest_lat, dest_lng)
+                );
+            """)
+            # Haftanın saatine göre (168 değer) yoğunluk eğrileri; counts uint32 dizisinin baytlarıdır
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS popularity_curves (
+                    scope TEXT NOT NULL,  -- place | category | city
+                    curve_key TEXT NOT NULL,
+                    counts BLOB NOT NULL,
+                    total INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (scope, curve_key)
+                );
+            """)
+            # Artımlı güncelleme: her kaynak tablo için işlenmiş son satır kimliği
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS popularity_watermarks (
+                    source TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL
+                );
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    provider TEXT NOT NULL,
+                    query_key TEXT NOT NULL,
+                    latitude REAL NULL,
+                    longitude REAL NULL,
+                    found INTEGER NOT NULL,  -- 0: sonuç bulunamadı (negatif önbellek)
+                    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (provider, query_key)
+                );
+            """)
             conn.commit()
 
     def _migrate_schema(self) -> None:
@@ -78,18 +285,114 @@ class DatabaseManager:
                 if "image_urls" not in existing_columns:
                     cursor.execute("ALTER TABLE places_cache ADD COLUMN image_urls JSON NULL;")
                     conn.commit()
+                # Konumu olan eski kayıtların geohash değeri bir kez hesaplanır
+                if "geohash" not in existing_columns:
+                    cursor.execute("ALTER TABLE places_cache ADD COLUMN geohash TEXT NULL;")
+                    cursor.execute("SELECT id, latitude, longitude FROM places_cache WHERE latitude IS NOT NULL AND longitude IS NOT NULL;")
+                    cursor.executemany("UPDATE places_cache SET geohash = ? WHERE id = ?;",
+                                       [(geohash_encode(row[1], row[2]), row[0]) for row in cursor.fetchall()])
+                    conn.commit()
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_places_cache_geohash ON places_cache(geohash);")
+
+                # itinerary_places.added_at: eski satırlar için planın oluşturulma zamanı kullanılır
+                cursor.execute("PRAGMA table_info(itinerary_places);")
+                if "added_at" not in [row[1] for row in cursor.fetchall()]:
+                    # ALTER TABLE sabit olmayan varsayılan değere izin vermez; yeni satırlar zamanı açıkça yazar
+                    cursor.execute("ALTER TABLE itinerary_places ADD COLUMN added_at TIMESTAMP NULL;")
+                    cursor.execute("""
+                        UPDATE itinerary_places SET added_at = (
+                            SELECT created_at FROM itineraries WHERE itineraries.id = itinerary_places.itinerary_id
+                        );
+                    """)
+                    conn.commit()
+
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index';")
+                existing_indexes = {row[0] for row in cursor.fetchall()}
+
+                # places_cache: yer başına tek satır (en yeni kayıt kalır), upsert için benzersiz indeks
+                if "idx_places_cache_place_name" not in existing_indexes:
+                    cursor.execute("""
+                        DELETE FROM places_cache WHERE id NOT IN (
+                            SELECT id FROM (
+                                SELECT id, ROW_NUMBER() OVER (PARTITION BY place_name ORDER BY cached_at DESC, id DESC) AS rn
+                                FROM places_cache
+                            ) WHERE rn = 1
+                        );
+                    """)
+                    cursor.execute("CREATE UNIQUE INDEX idx_places_cache_place_name ON places_cache(place_name);")
+
+                # user_favorites: aynı yer bir oturumda yalnızca bir kez favori olabilir
+                if "idx_user_favorites_session_place" not in existing_indexes:
+                    cursor.execute("""
+                        DELETE FROM user_favorites WHERE id NOT IN (
+                            SELECT MIN(id) FROM user_favorites GROUP BY user_session_id, place_name
+                        );
+                    """)
+                    cursor.execute("CREATE UNIQUE INDEX idx_user_favorites_session_place ON user_favorites(user_session_id, place_name);")
+
+                # search_history analiz için tüm aramaları saklar; sorgular indeksle karşılanır
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_history_query_created ON search_history(search_query, created_at);")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_history_session ON search_history(user_session_id);")
+
+                # Eski sürümlerde önbellek search_history içindeydi; her sorgunun en yeni sonucu taşınır
+                if "idx_recommendation_cache_created" not in existing_indexes:
+                    cursor.execute("""
+                        INSERT OR IGNORE INTO recommendation_cache (cache_key, results, size_bytes, created_at, last_accessed_at)
+                        SELECT search_query, search_results, LENGTH(search_results), created_at, created_at FROM (
+                            SELECT search_query, search_results, created_at,
+                                   ROW_NUMBER() OVER (PARTITION BY search_query ORDER BY created_at DESC, id DESC) AS rn
+                            FROM search_history WHERE search_results IS NOT NULL
+                        ) WHERE rn = 1;
+                    """)
+                    cursor.execute("CREATE INDEX idx_recommendation_cache_created ON recommendation_cache(created_at);")
+                conn.commit()
         except Exception as e:
             print(f"Schema migration error: {e}")
 
+    def _bump_cache_stat(self, name: str, amount: int = 1) -> int:
+        with self._cache_stats_lock:
+            self._cache_stats[name] += amount
+            return self._cache_stats[name]
+
+    def record_memory_hit(self, cache_key: str) -> None:
+        """Counts a hit served from the in-memory tier; flushed into hit_count on the next write or compaction."""
+        with self._cache_stats_lock:
+            self._pending_hits[cache_key] = self._pending_hits.get(cache_key, 0) + 1
+
+    def _flush_memory_hits(self, cursor: sqlite3.Cursor) -> None:
+        with self._cache_stats_lock:
+            pending, self._pending_hits = self._pending_hits, {}
+        if pending:
+            cursor.executemany("""
+                UPDATE recommendation_cache SET hit_count = hit_count + ?, last_accessed_at = CURRENT_TIMESTAMP
+                WHERE cache_key = ?;
+            """, [(count, key) for key, count in pending.items()])
+
     def save_search_result(self, query: str, results: Dict[str, Any], user_session_id: Optional[str] = None) -> bool:
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO search_history (search_query, search_results, user_session_id)
-                    VALUES (?, ?, ?);
-                """, (query, json.dumps(results), user_session_id))
-                conn.commit()
+            payload = json.dumps(results)
+            with self.transaction():
+                with self._get_connection() as conn:
+                    cursor = conn.cursor()
+                    self._flush_memory_hits(cursor)
+                    # Analiz kaydı: sonuç gövdesi sıcak önbellekte tutulur, burada tekrar saklanmaz
+                    cursor.execute("""
+                        INSERT INTO search_history (search_query, user_session_id)
+                        VALUES (?, ?);
+                    """, (query, user_session_id))
+                    cursor.execute("""
+                        INSERT INTO recommendation_cache (cache_key, results, size_bytes)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(cache_key) DO UPDATE SET
+                            results = excluded.results,
+                            size_bytes = excluded.size_bytes,
+                            created_at = CURRENT_TIMESTAMP,
+                            last_accessed_at = CURRENT_TIMESTAMP;
+                    """, (query, payload, len(payload)))
+                    conn.commit()
+                writes = self._bump_cache_stat("writes")
+                if self.cache_policy.compact_every_n_writes and writes % self.cache_policy.compact_every_n_writes == 0:
+                    self.compact_result_cache()
             return True
         except Exception as e:
             print(f"Error saving search result: {e}")
@@ -98,21 +401,101 @@ class DatabaseManager:
     def get_cached_results(self, query: str) -> Optional[Dict[str, Any]]:
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT search_results FROM search_history WHERE search_query = ? ORDER BY created_at DESC LIMIT 1;", (query,))
+            cursor.execute("""
+                SELECT results, created_at >= datetime('now', ?) FROM recommendation_cache WHERE cache_key = ?;
+            """, (f"-{int(self.cache_policy.max_age_seconds)} seconds", query))
             row = cursor.fetchone()
-            if row:
-                return json.loads(row[0])
+            results = json.loads(row[0]) if row and row[1] else None
+            # Eski sürümlerin kaydettiği boş sonuçlar (başarısız üretimler) isabet sayılmaz
+            if results and not (isinstance(results, dict) and "recommendations" in results and not results["recommendations"]):
+                cursor.execute("""
+                    UPDATE recommendation_cache SET hit_count = hit_count + 1, last_accessed_at = CURRENT_TIMESTAMP
+                    WHERE cache_key = ?;
+                """, (query,))
+                conn.commit()
+                self._bump_cache_stat("hits")
+                return results
+            self._bump_cache_stat("expired" if row and not row[1] else "misses")
             return None
-            
+
+    def get_recommendation_cache_keys(self, limit: int) -> List[str]:
+        """Most recently used result cache keys, oldest first."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT cache_key FROM (
+                        SELECT cache_key, last_accessed_at FROM recommendation_cache
+                        ORDER BY last_accessed_at DESC LIMIT ?
+                    ) ORDER BY last_accessed_at ASC;
+                """, (limit,))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error fetching recommendation cache keys: {e}")
+            return []
+
+    def compact_result_cache(self) -> int:
+        """Removes expired entries, then evicts by the policy until row and byte limits hold.
+
+        Returns the number of removed entries.
+        """
+        policy = self.cache_policy
+        removed = 0
+        try:
+            with self.transaction():
+                with self._get_connection() as conn:
+                    cursor = conn.cursor()
+                    self._flush_memory_hits(cursor)
+                    cursor.execute("DELETE FROM recommendation_cache WHERE created_at < datetime('now', ?);",
+                                   (f"-{int(policy.max_age_seconds)} seconds",))
+                    removed += cursor.rowcount
+                    cursor.execute(f"""
+                        DELETE FROM recommendation_cache WHERE cache_key IN (
+                            SELECT cache_key FROM (
+                                SELECT cache_key,
+                                       ROW_NUMBER() OVER (ORDER BY {policy.keep_order}) AS rank,
+                                       SUM(size_bytes) OVER (ORDER BY {policy.keep_order} ROWS UNBOUNDED PRECEDING) AS running_bytes
+                                FROM recommendation_cache
+                            ) WHERE rank > ? OR running_bytes > ?
+                        );
+                    """, (policy.max_rows, policy.max_bytes))
+                    removed += cursor.rowcount
+                    conn.commit()
+            self._bump_cache_stat("evictions", removed)
+        except Exception as e:
+            print(f"Error compacting result cache: {e}")
+        return removed
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        with self._cache_stats_lock:
+            stats: Dict[str, Any] = dict(self._cache_stats)
+        lookups = stats["hits"] + stats["misses"] + stats["expired"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["eviction_policy"] = self.cache_policy.eviction
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM recommendation_cache;")
+            stats["rows"], stats["bytes"] = cursor.fetchone()
+            page_count = cursor.execute("PRAGMA page_count;").fetchone()[0]
+            page_size = cursor.execute("PRAGMA page_size;").fetchone()[0]
+            freelist_count = cursor.execute("PRAGMA freelist_count;").fetchone()[0]
+        stats["db_size_bytes"] = page_count * page_size
+        stats["db_free_bytes"] = freelist_count * page_size
+        return stats
+
+    @staticmethod
+    def _place_params(place_name: str, latitude: Optional[float], longitude: Optional[float], description: Optional[str],
+                      category: Optional[str], rating: Optional[float], image_urls: Optional[List[str]]) -> tuple:
+        geohash = geohash_encode(latitude, longitude) if latitude is not None and longitude is not None else None
+        return (place_name, latitude, longitude, description, category, rating,
+                json.dumps(image_urls) if image_urls else None, geohash)
+
     def save_place_to_cache(self, place_name: str, latitude: Optional[float], longitude: Optional[float], description: str, category: str, rating: float, image_urls: Optional[List[str]] = None) -> bool:
         try:
             print(f"DEBUG: save_place_to_cache called for: {place_name}") # DEBUG
             with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO places_cache (place_name, latitude, longitude, description, category, rating, image_urls)
-                    VALUES (?, ?, ?, ?, ?, ?, ?);
-                """, (place_name, latitude, longitude, description, category, rating, json.dumps(image_urls) if image_urls else None))
+                cursor.execute(self._UPSERT_PLACE_SQL, self._place_params(place_name, latitude, longitude, description, category, rating, image_urls))
                 conn.commit()
             print(f"DEBUG: Successfully saved {place_name} to cache.") # DEBUG
             return True
@@ -120,11 +503,29 @@ class DatabaseManager:
             print(f"Error saving place to cache: {e}")
             return False
 
+    def save_places_to_cache(self, places: List[Dict[str, Any]]) -> bool:
+        """Saves several places (dicts with save_place_to_cache's arguments) in one statement."""
+        if not places:
+            return True
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(self._UPSERT_PLACE_SQL, [
+                    self._place_params(p["place_name"], p.get("latitude"), p.get("longitude"), p.get("description"),
+                                       p.get("category"), p.get("rating"), p.get("image_urls"))
+                    for p in places
+                ])
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving places to cache: {e}")
+            return False
+
     def get_cached_place_details(self, place_name: str) -> Optional[Dict[str, Any]]:
         print(f"DEBUG: get_cached_place_details called for: {place_name}") # DEBUG
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT latitude, longitude, description, category, rating, image_urls FROM places_cache WHERE place_name = ? ORDER BY cached_at DESC LIMIT 1;", (place_name,))
+            cursor.execute("SELECT latitude, longitude, description, category, rating, image_urls FROM places_cache WHERE place_name = ?;", (place_name,))
             row = cursor.fetchone()
             if row:
                 details = {
@@ -140,13 +541,296 @@ class DatabaseManager:
             print(f"DEBUG: No cached details found for {place_name}.") # DEBUG
             return None
 
+    def get_places_within(self, latitude: float, longitude: float, radius_km: float, category: Optional[str] = None,
+                          min_rating: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cached places within radius_km of the point, nearest first, with a "distance_km" field.
+
+        The geohash index narrows the search to the cells around the point; exact
+        distances are then checked in Python. category matches as a case-insensitive
+        substring (e.g. "Müze" matches "Tarihi Yer / Müze").
+        """
+        try:
+            prefixes = geohash_cover(latitude, longitude, radius_km)
+            # Her önek bir indeks aralığıdır: '{' base32 alfabesindeki son karakterden ('z') sonra gelir
+            ranges = " OR ".join(["(geohash >= ? AND geohash < ?)"] * len(prefixes))
+            params: List[Any] = [v for prefix in prefixes for v in (prefix, prefix + "{")]
+            sql = f"""
+                SELECT place_name, latitude, longitude, description, category, rating, image_urls
+                FROM places_cache WHERE ({ranges})
+            """
+            if min_rating is not None:
+                sql += " AND rating >= ?"
+                params.append(min_rating)
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql + ";", params)
+                rows = cursor.fetchall()
+
+            wanted_category = turkish_lower(category) if category else None
+            results = []
+            for row in rows:
+                if wanted_category and wanted_category not in turkish_lower(row[4] or ""):
+                    continue
+                distance = haversine_km(latitude, longitude, row[1], row[2])
+                if distance > radius_km:
+                    continue
+                results.append({
+                    "place_name": row[0],
+                    "latitude": row[1],
+                    "longitude": row[2],
+                    "description": row[3],
+                    "category": row[4],
+                    "rating": row[5],
+                    "image_urls": json.loads(row[6]) if row[6] else [],
+                    "distance_km": distance,
+                })
+            results.sort(key=lambda place: place["distance_km"])
+            return results[:limit] if limit else results
+        except Exception as e:
+            print(f"Error querying nearby places: {e}")
+            return []
+
+    def get_popularity_events(self, source: str, after_id: int, limit: int, utc_offset_hours: int) -> List[Any]:
+        """New log rows for the popularity model, oldest first, with their local hour-of-week.
+
+        search: (id, search_query, hour_of_week)
+        favorites / itinerary: (id, place_name, category, hour_of_week)
+        """
+        modifier = f"{int(utc_offset_hours):+d} hours"
+        queries = {
+            "search": f"""
+                SELECT id, search_query, {_HOUR_OF_WEEK_SQL.format(col='created_at')}
+                FROM search_history WHERE id > ? AND created_at IS NOT NULL ORDER BY id LIMIT ?;
+            """,
+            "favorites": f"""
+                SELECT f.id, f.place_name, pc.category, {_HOUR_OF_WEEK_SQL.format(col='f.added_at')}
+                FROM user_favorites f LEFT JOIN places_cache pc ON pc.place_name = f.place_name
+                WHERE f.id > ? AND f.added_at IS NOT NULL ORDER BY f.id LIMIT ?;
+            """,
+            "itinerary": f"""
+                SELECT ip.id, ip.place_name, pc.category, {_HOUR_OF_WEEK_SQL.format(col='ip.added_at')}
+                FROM itinerary_places ip LEFT JOIN places_cache pc ON pc.place_name = ip.place_name
+                WHERE ip.id > ? AND ip.added_at IS NOT NULL ORDER BY ip.id LIMIT ?;
+            """,
+        }
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(queries[source], (modifier, modifier, after_id, limit))
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error reading popularity events from {source}: {e}")
+            return []
+
+    def get_popularity_watermarks(self) -> Dict[str, int]:
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT source, last_id FROM popularity_watermarks;")
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def get_popularity_curves(self, keys: Optional[List[Any]] = None) -> List[Any]:
+        """(scope, curve_key, counts blob, total) rows; all curves or only the given (scope, key) pairs."""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            if keys is None:
+                cursor.execute("SELECT scope, curve_key, counts, total FROM popularity_curves;")
+                return cursor.fetchall()
+            rows = []
+            for start in range(0, len(keys), 400):
+                chunk = keys[start:start + 400]
+                values = ", ".join(["(?, ?)"] * len(chunk))
+                cursor.execute(f"""
+                    WITH wanted(scope, curve_key) AS (VALUES {values})
+                    SELECT p.scope, p.curve_key, p.counts, p.total
+                    FROM popularity_curves p JOIN wanted w ON p.scope = w.scope AND p.curve_key = w.curve_key;
+                """, [v for key in chunk for v in key])
+                rows.extend(cursor.fetchall())
+            return rows
+
+    def save_popularity_update(self, curves: List[Any], watermarks: Dict[str, int]) -> bool:
+        """Writes updated curves ((scope, key, counts blob, total)) and the new watermarks together."""
+        try:
+            with self.transaction():
+                with self._get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany("""
+                        INSERT INTO popularity_curves (scope, curve_key, counts, total)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(scope, curve_key) DO UPDATE SET
+                            counts = excluded.counts,
+                            total = excluded.total,
+                            updated_at = CURRENT_TIMESTAMP;
+                    """, curves)
+                    cursor.executemany("""
+                        INSERT INTO popularity_watermarks (source, last_id) VALUES (?, ?)
+                        ON CONFLICT(source) DO UPDATE SET last_id = excluded.last_id;
+                    """, list(watermarks.items()))
+                    conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving popularity curves: {e}")
+            return False
+
+    def clear_popularity_model(self) -> bool:
+        try:
+            with self.transaction():
+                with self._get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("DELETE FROM popularity_curves;")
+                    cursor.execute("DELETE FROM popularity_watermarks;")
+                    conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error clearing popularity model: {e}")
+            return False
+
+    def get_cached_geocode(self, provider: str, query_key: str, ttl_seconds: int, negative_ttl_seconds: int) -> Optional[Dict[str, Any]]:
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT latitude, longitude, found FROM geocode_cache
+                    WHERE provider = ? AND query_key = ?
+                      AND cached_at >= datetime('now', CASE WHEN found THEN ? ELSE ? END);
+                """, (provider, query_key, f"-{int(ttl_seconds)} seconds", f"-{int(negative_ttl_seconds)} seconds"))
+                row = cursor.fetchone()
+                if row:
+                    return {"latitude": row[0], "longitude": row[1], "found": bool(row[2])}
+                return None
+        except Exception as e:
+            print(f"Error reading geocode cache: {e}")
+            return None
+
+    def save_geocode(self, provider: str, query_key: str, latitude: Optional[float], longitude: Optional[float]) -> bool:
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO geocode_cache (provider, query_key, latitude, longitude, found)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(provider, query_key) DO UPDATE SET
+                        latitude = excluded.latitude,
+                        longitude = excluded.longitude,
+                        found = excluded.found,
+                        cached_at = CURRENT_TIMESTAMP;
+                """, (provider, query_key, latitude, longitude, 1 if latitude is not None and longitude is not None else 0))
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving geocode to cache: {e}")
+            return False
+
+    def get_cached_places_details(self, place_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Batch version of get_cached_place_details; places missing from the cache are left out."""
+        found: Dict[str, Dict[str, Any]] = {}
+        names = list(dict.fromkeys(place_names))
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            # SQLite parametre sınırını aşmamak için parçalar halinde sorgula
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(f"SELECT place_name, latitude, longitude, description, category, rating, image_urls FROM places_cache WHERE place_name IN ({placeholders});", chunk)
+                for row in cursor.fetchall():
+                    found[row[0]] = {
+                        "latitude": row[1],
+                        "longitude": row[2],
+                        "description": row[3],
+                        "category": row[4],
+                        "rating": row[5],
+                        "image_urls": json.loads(row[6]) if row[6] else []
+                    }
+        return found
+
+    def get_cached_forecast_days(self, cell_lat: float, cell_lng: float, days: List[str], ttl_seconds: int) -> Dict[str, Any]:
+        if not days:
+            return {}
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                placeholders = ", ".join("?" for _ in days)
+                cursor.execute(f"""
+                    SELECT day, payload FROM weather_forecast_cache
+                    WHERE cell_lat = ? AND cell_lng = ? AND day IN ({placeholders})
+                      AND fetched_at >= datetime('now', ?);
+                """, (cell_lat, cell_lng, *days, f"-{int(ttl_seconds)} seconds"))
+                return {row[0]: json.loads(row[1]) for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error reading forecast cache: {e}")
+            return {}
+
+    def save_forecast_days(self, cell_lat: float, cell_lng: float, rows: List[Any]) -> bool:
+        """rows: (day, values) pairs; values are stored as a JSON array."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT INTO weather_forecast_cache (cell_lat, cell_lng, day, payload)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(cell_lat, cell_lng, day) DO UPDATE SET
+                        payload = excluded.payload,
+                        fetched_at = CURRENT_TIMESTAMP;
+                """, [(cell_lat, cell_lng, day, json.dumps(list(values))) for day, values in rows])
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving forecast to cache: {e}")
+            return False
+
+    def get_cached_travel_times(self, mode: str, hour_of_week: int, pairs: List[Any], ttl_seconds: int) -> Dict[Any, float]:
+        """pairs: ((origin_lat, origin_lng), (dest_lat, dest_lng)) grid cells; returns {pair: minutes} for fresh rows."""
+        found: Dict[Any, float] = {}
+        if not pairs:
+            return found
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                # SQLite değişken sınırı için çiftler parçalar halinde sorgulanır
+                for start in range(0, len(pairs), 200):
+                    chunk = pairs[start:start + 200]
+                    values = ", ".join(["(?, ?, ?, ?)"] * len(chunk))
+                    params = [v for origin, dest in chunk for v in (*origin, *dest)]
+                    cursor.execute(f"""
+                        WITH wanted(origin_lat, origin_lng, dest_lat, dest_lng) AS (VALUES {values})
+                        SELECT t.origin_lat, t.origin_lng, t.dest_lat, t.dest_lng, t.minutes
+                        FROM travel_time_cache t
+                        JOIN wanted w ON t.origin_lat = w.origin_lat AND t.origin_lng = w.origin_lng
+                                     AND t.dest_lat = w.dest_lat AND t.dest_lng = w.dest_lng
+                        WHERE t.mode = ? AND t.hour_of_week = ? AND t.cached_at >= datetime('now', ?);
+                    """, (*params, mode, hour_of_week, f"-{int(ttl_seconds)} seconds"))
+                    for row in cursor.fetchall():
+                        found[((row[0], row[1]), (row[2], row[3]))] = row[4]
+            return found
+        except Exception as e:
+            print(f"Error reading travel time cache: {e}")
+            return found
+
+    def save_travel_times(self, mode: str, hour_of_week: int, rows: List[Any]) -> bool:
+        """rows: (origin cell, destination cell, minutes) triples."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT INTO travel_time_cache (mode, hour_of_week, origin_lat, origin_lng, dest_lat, dest_lng, minutes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(mode, hour_of_week, origin_lat, origin_lng, dest_lat, dest_lng) DO UPDATE SET
+                        minutes = excluded.minutes,
+                        cached_at = CURRENT_TIMESTAMP;
+                """, [(mode, hour_of_week, o[0], o[1], d[0], d[1], minutes) for o, d, minutes in rows])
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving travel times to cache: {e}")
+            return False
+
     def add_to_favorites(self, user_session_id: str, place_name: str) -> bool:
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO user_favorites (user_session_id, place_name)
-                    VALUES (?, ?);
+                    VALUES (?, ?)
+                    ON CONFLICT(user_session_id, place_name) DO NOTHING;
                 """, (user_session_id, place_name))
                 conn.commit()
             return True
@@ -166,9 +850,10 @@ class DatabaseManager:
     def get_favorite_place_details(self, user_session_id: str) -> List[Dict[str, Any]]:
         print(f"DEBUG: get_favorite_place_details called for session: {user_session_id}") # DEBUG
         favorite_place_names = self.get_favorites(user_session_id)
+        cached_details = self.get_cached_places_details(favorite_place_names)
         favorite_places_details = []
         for place_name in favorite_place_names:
-            details = self.get_cached_place_details(place_name)
+            details = cached_details.get(place_name)
             if details:
                 details["place_name"] = place_name  # Add place_name to the details
                 favorite_places_details.append(details)
@@ -213,7 +898,7 @@ class DatabaseManager:
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("INSERT INTO itinerary_places (itinerary_id, place_name, order_index) VALUES (?, ?, ?);", (itinerary_id, place_name, order_index))
+                cursor.execute("INSERT INTO itinerary_places (itinerary_id, place_name, order_index, added_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP);", (itinerary_id, place_name, order_index))
                 conn.commit()
                 return True
         except sqlite3.IntegrityError:
@@ -257,6 +942,25 @@ class DatabaseManager:
                 results.append(place_details)
             return results
 
+    def reorder_itinerary_places(self, itinerary_id: int, ordered_place_names: List[str]) -> bool:
+        """Rewrites order_index for the given places (0..n-1) in one transaction."""
+        try:
+            with self.transaction():
+                with self._get_connection() as conn:
+                    cursor = conn.cursor()
+                    # UNIQUE(itinerary_id, order_index) çakışmasını önlemek için önce geçici negatif sıralar yazılır
+                    cursor.executemany(
+                        "UPDATE itinerary_places SET order_index = ? WHERE itinerary_id = ? AND place_name = ?;",
+                        [(-(idx + 1), itinerary_id, name) for idx, name in enumerate(ordered_place_names)])
+                    cursor.executemany(
+                        "UPDATE itinerary_places SET order_index = ? WHERE itinerary_id = ? AND place_name = ?;",
+                        [(idx, itinerary_id, name) for idx, name in enumerate(ordered_place_names)])
+                    conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error reordering itinerary places: {e}")
+            return False
+
     def remove_place_from_itinerary(self, itinerary_id: int, place_name: str) -> bool:
         try:
             with self._get_connection() as conn:
@@ -0,0 +1,46 @@
+"""Named AIRecommendationService providers; the engine builds the one selected by AI_PROVIDER."""
+import threading
+from typing import Callable, Dict, List, Optional
+
+from config.settings import AI_PROVIDER
+from services.gemini_service import AIRecommendationService
+
+ProviderFactory = Callable[[], AIRecommendationService]
+
+_providers: Dict[str, ProviderFactory] = {}
+_providers_lock = threading.Lock()
+
+
+def register_provider(name: str, factory: ProviderFactory) -> None:
+    """Registers (or replaces) a provider factory under a case-insensitive name."""
+    with _providers_lock:
+        _providers[name.strip().lower()] = factory
+
+
+def available_providers() -> List[str]:
+    with _providers_lock:
+        return sorted(_providers)
+
+
+def create_ai_service(name: Optional[str] = None) -> AIRecommendationService:
+    """Builds the named provider, defaulting to AI_PROVIDER; raises ValueError for unknown names."""
+    key = (name or AI_PROVIDER).strip().lower()
+    with _providers_lock:
+        factory = _providers.get(key)
+    if factory is None:
+        raise ValueError(f"Unknown AI provider '{key}'. Available providers: {', '.join(available_providers())}")
+    return factory()
+
+
+def _gemini() -> AIRecommendationService:
+    from services.gemini_service import GeminiService
+    return GeminiService()
+
+
+def _local() -> AIRecommendationService:
+    from services.local_ai_service import LocalRecommendationService
+    return LocalRecommendationService()
+
+
+register_provider("gemini", _gemini)
+register_provider("local", _local)
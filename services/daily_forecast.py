@@ -0,0 +1,134 @@
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+NAN = float("nan")
+
+
+def _is_missing(value: float) -> bool:
+    return value != value  # NaN
+
+
+class DailyForecast:
+    """Array-backed daily forecast for one location.
+
+    Each field is an array('d') aligned with `dates`; missing values are NaN.
+    Iterating yields the per-day dicts the UI used before, built on demand.
+    """
+
+    # Alan adı -> Open-Meteo "daily" anahtarı
+    FIELDS: Dict[str, str] = {
+        "temp_max": "temperature_2m_max",
+        "temp_min": "temperature_2m_min",
+        "precipitation_sum": "precipitation_sum",
+        "rain_sum": "rain_sum",
+        "showers_sum": "showers_sum",
+        "snowfall_sum": "snowfall_sum",
+        "precipitation_probability_max": "precipitation_probability_max",
+        "windspeed_10m_max": "windspeed_10m_max",
+    }
+
+    def __init__(self, dates: List[str], columns: Dict[str, array]):
+        self.dates = dates
+        self.columns = columns
+
+    @staticmethod
+    def _column(values: Optional[Sequence[Any]], length: int) -> array:
+        values = values or []
+        column = array("d", (NAN if v is None else float(v) for v in values[:length]))
+        # Kısa diziler NaN ile tamamlanır (eksik alan IndexError'a yol açmaz)
+        if len(column) < length:
+            column.extend([NAN] * (length - len(column)))
+        return column
+
+    @classmethod
+    def from_open_meteo(cls, daily: Dict[str, Any]) -> "DailyForecast":
+        dates = list(daily.get("time") or [])
+        columns = {field: cls._column(daily.get(key), len(dates)) for field, key in cls.FIELDS.items()}
+        return cls(dates, columns)
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[str, Sequence[float]]]) -> "DailyForecast":
+        """Builds a forecast from (date, values in FIELDS order) rows, e.g. from the cache."""
+        dates = [row[0] for row in rows]
+        columns = {field: array("d", (row[1][i] for row in rows)) for i, field in enumerate(cls.FIELDS)}
+        return cls(dates, columns)
+
+    def rows(self) -> Iterator[Tuple[str, Tuple[float, ...]]]:
+        fields = [self.columns[field] for field in self.FIELDS]
+        for idx, day in enumerate(self.dates):
+            yield day, tuple(column[idx] for column in fields)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __bool__(self) -> bool:
+        return bool(self.dates)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        day: Dict[str, Any] = {"date": self.dates[idx]}
+        for field, column in self.columns.items():
+            value = column[idx]
+            day[field] = None if _is_missing(value) else value
+        return day
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for idx in range(len(self.dates)):
+            yield self[idx]
+
+    def to_columns(self) -> Dict[str, List[Optional[float]]]:
+        columns: Dict[str, List[Any]] = {"date": list(self.dates)}
+        for field, column in self.columns.items():
+            columns[field] = [None if _is_missing(v) else v for v in column]
+        return columns
+
+    def rain_mask(self, probability_threshold: float = 50, rain_threshold: float = 2.0) -> List[bool]:
+        """Same rule as WeatherService.will_likely_rain, evaluated for all days at once."""
+        return [
+            prob >= probability_threshold or rain >= rain_threshold  # NaN karşılaştırmaları False döner
+            for prob, rain in zip(self.columns["precipitation_probability_max"], self.columns["rain_sum"])
+        ]
+
+    def temperature_range(self) -> Tuple[Optional[float], Optional[float]]:
+        lows = [v for v in self.columns["temp_min"] if not _is_missing(v)]
+        highs = [v for v in self.columns["temp_max"] if not _is_missing(v)]
+        return (min(lows) if lows else None, max(highs) if highs else None)
+
+    def visit_scores(self, comfortable_temp: float = 22.0) -> List[float]:
+        """0-100 score per day for sightseeing: penalizes rain, wind and uncomfortable temperatures."""
+        scores = []
+        for t_max, t_min, prob, rain, snow, wind in zip(
+            self.columns["temp_max"], self.columns["temp_min"], self.columns["precipitation_probability_max"],
+            self.columns["rain_sum"], self.columns["snowfall_sum"], self.columns["windspeed_10m_max"],
+        ):
+            score = 100.0
+            if not _is_missing(prob):
+                score -= 0.4 * prob
+            if not _is_missing(rain):
+                score -= 4.0 * min(rain, 10.0)
+            if not _is_missing(snow):
+                score -= 5.0 * min(snow, 6.0)
+            if not _is_missing(wind) and wind > 25:
+                score -= 0.8 * (wind - 25)
+            if not _is_missing(t_max) and not _is_missing(t_min):
+                score -= 1.5 * abs((t_max + t_min) / 2 - comfortable_temp)
+            scores.append(max(0.0, score))
+        return scores
+
+    def best_day(self) -> Optional[str]:
+        scores = self.visit_scores()
+        if not scores:
+            return None
+        best_idx = max(range(len(scores)), key=scores.__getitem__)
+        return self.dates[best_idx]
+
+    def slice(self, start_date: str, end_date: str) -> "DailyForecast":
+        idx = [i for i, day in enumerate(self.dates) if start_date <= day <= end_date]
+        if not idx:
+            return DailyForecast([], {field: array("d") for field in self.FIELDS})
+        lo, hi = idx[0], idx[-1] + 1
+        return DailyForecast(self.dates[lo:hi], {field: column[lo:hi] for field, column in self.columns.items()})
+
+    def __repr__(self) -> str:
+        span = f"{self.dates[0]}..{self.dates[-1]}" if self.dates else "empty"
+        return f"DailyForecast({span}, {len(self)} days)"
+
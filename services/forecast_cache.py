@@ -0,0 +1,84 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config.settings import FORECAST_GRID_DEGREES, FORECAST_CACHE_TTL_SECONDS, MEMORY_CACHE_MAX_BYTES
+from database.database_manager import DatabaseManager
+from services.memory_cache import MISSING, MemoryCache
+
+Cell = Tuple[float, float]
+# (tarih, DailyForecast.FIELDS sırasıyla değerler)
+DayRow = Tuple[str, Tuple[float, ...]]
+
+# Bellekteki bir günlük tahmin kaydının yaklaşık boyutu
+_DAY_SIZE_BYTES = 512
+
+
+class ForecastCache:
+    """Per-day forecast records keyed by (grid cell, date), in memory and in SQLite.
+
+    Nearby coordinates fall into the same cell, and any date range is assembled
+    from day records, so overlapping requests reuse earlier fetches.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, grid_degrees: float = FORECAST_GRID_DEGREES,
+                 ttl_seconds: int = FORECAST_CACHE_TTL_SECONDS):
+        self.db_manager = db_manager or DatabaseManager()
+        self.grid_degrees = grid_degrees
+        self.ttl_seconds = ttl_seconds
+        self._memory = MemoryCache(max_entries=MEMORY_CACHE_MAX_BYTES // _DAY_SIZE_BYTES, max_bytes=MEMORY_CACHE_MAX_BYTES, ttl_seconds=ttl_seconds)
+
+    def cell_for(self, latitude: float, longitude: float) -> Cell:
+        grid = self.grid_degrees
+        return (round(round(latitude / grid) * grid, 4), round(round(longitude / grid) * grid, 4))
+
+    def get_days(self, cell: Cell, days: List[date]) -> Dict[str, Tuple[float, ...]]:
+        found: Dict[str, Tuple[float, ...]] = {}
+        missing = []
+        for day in days:
+            record = self._memory.get((cell, day.isoformat()))
+            if record is MISSING:
+                missing.append(day.isoformat())
+            else:
+                found[day.isoformat()] = record
+        if missing:
+            from_db = self.db_manager.get_cached_forecast_days(cell[0], cell[1], missing, self.ttl_seconds)
+            for day_key, values in from_db.items():
+                # Eski biçimdeki (sözlük) kayıtlar yok sayılır ve yeniden çekilir
+                if not isinstance(values, list):
+                    continue
+                values = tuple(values)
+                self._memory.set((cell, day_key), values, size_bytes=_DAY_SIZE_BYTES)
+                found[day_key] = values
+        return found
+
+    def put_days(self, cell: Cell, rows: Sequence[DayRow]) -> None:
+        self.db_manager.save_forecast_days(cell[0], cell[1], rows)
+        for day_key, values in rows:
+            self._memory.set((cell, day_key), values, size_bytes=_DAY_SIZE_BYTES)
+
+    @staticmethod
+    def missing_runs(days: List[date], cached: Dict[str, Tuple[float, ...]]) -> List[Tuple[date, date]]:
+        """Groups the uncached days into contiguous (start, end) ranges."""
+        runs: List[Tuple[date, date]] = []
+        for day in days:
+            if day.isoformat() in cached:
+                continue
+            if runs and runs[-1][1] + timedelta(days=1) == day:
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs.append((day, day))
+        return runs
+
+
+_shared_cache: Optional[ForecastCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ForecastCache()
+    return _shared_cache
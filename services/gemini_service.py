@@ -1,9 +1,13 @@
 import google.generativeai as genai
+from google.api_core.exceptions import InvalidArgument
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
-import json
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
+import time
 
 from config.api_keys import GEMINI_API_KEY
+from services.metrics import stage_timer, token_usage
+from services import prompt_builder
+from services.json_stream import iter_json_array
 
 # Placeholder for recommendation results and place details structures
 class RecommendationResult:
@@ -26,123 +30,192 @@ class PlaceDetails:
 
 class AIRecommendationService(ABC):
     @abstractmethod
-    def generate_recommendations(self, query: str) -> List[RecommendationResult]:
+    def generate_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
         pass
     
     @abstractmethod
     def get_place_details(self, place_name: str) -> Optional[PlaceDetails]:
         pass
 
+    def stream_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Iterator[RecommendationResult]:
+        # Akış desteklemeyen servisler tüm listeyi bekleyip tek tek iletir. Yarıda kesilen akışlar hata
+        # fırlatır; çağıran taraf o ana kadar gelen kısmi sonucu önbelleğe yazmamalıdır
+        yield from self.generate_recommendations(query, filters)
+
+    def get_places_details(self, place_names: List[str]) -> List[PlaceDetails]:
+        # Toplu sorgu desteklemeyen servisler için tek tek sorgulama
+        details = [self.get_place_details(name) for name in place_names]
+        return [d for d in details if d]
+
 class GeminiService(AIRecommendationService):
+    # Yapılandırılmış çıktı kipleri: önce şema, SDK desteklemiyorsa yalnızca JSON modu, en son düz metin
+    OUTPUT_MODES = ("schema", "json", "plain")
+    # Her kipin gerektirdiği GenerationConfig alanı
+    _MODE_FIELDS = {"schema": "response_schema", "json": "response_mime_type"}
+
     def __init__(self):
         if not GEMINI_API_KEY:
             raise ValueError("Gemini API Key is not set in environment variables.")
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('models/gemini-1.5-flash')
+        self.output_mode = self._supported_output_mode()
 
-    def generate_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
-        try:
-            prompt_text = f"Bir kullanıcı şu anda bir seyahat önerisi arıyor: '{query}'."
-            if filters:
-                if filters.get("category") and filters["category"] != "Tümü":
-                    prompt_text += f" Öneriler '**{filters['category']}**' kategorisinde olmalıdır."
-                if filters.get("rating") and filters["rating"] > 0:
-                    prompt_text += f" Önerilerin minimum puanı '**{filters['rating']}**' olmalıdır."
-                if filters.get("features"): 
-                    prompt_text += f" Önerilerde '**{', '.join(filters['features'])}**' özellikleri bulunmalıdır."
-            
-            prompt_text += f" Lütfen bu sorguya göre 3 adet seyahat yeri önerisi yapın."
-            prompt_text += f" Her öneri için bir başlık (title), kısa bir açıklama (description), 1 ile 5 arasında bir puan (rating), bir kategori (category) ve tahmini enlem (latitude) ve boylam (longitude) içeren bir konum (location) bilgisi sağlayın."
-            prompt_text += f" JSON formatında bir liste olarak çıktı verin."
-            
-            example_json = [{
-                "title": "Yer Adı", 
-                "description": "Kısa Açıklama", 
-                "rating": 4.5, 
-                "category": "Kategori", 
-                "location": {"lat": 12.34, "lng": 56.78}
-            }]
-            example_json_str = json.dumps(example_json, ensure_ascii=False)
-            prompt_text += f" Örnek JSON formatı: {example_json_str}"
-            
-            response = self.model.generate_content(prompt_text)
-            print(f"DEBUG: Gemini API Raw Response Object: {response}") # Yeni eklendi
-            if response.text:
-                print(f"DEBUG: Gemini API Raw Response Text: {response.text}") # Log raw response text
-                cleaned_response_text = response.text.strip()
-                # Find the start and end of the JSON block
-                json_start = cleaned_response_text.find('```json')
-                json_end = cleaned_response_text.rfind('```')
-
-                if json_start != -1 and json_end != -1 and json_start < json_end:
-                    # Extract only the JSON part
-                    json_string = cleaned_response_text[json_start + len('```json'):json_end].strip()
+    @classmethod
+    def _supported_output_mode(cls) -> str:
+        """Best output mode whose GenerationConfig field the installed SDK knows; probed once per instance."""
+        config_type = getattr(getattr(genai, "types", None), "GenerationConfig", None)
+        fields = getattr(config_type, "__dataclass_fields__", None) or getattr(config_type, "__annotations__", None)
+        if not fields:
+            # Alanlar okunamıyorsa şema denenir; reddedilirse _start bir sonraki kipe geçer
+            return cls.OUTPUT_MODES[0]
+        for mode in cls.OUTPUT_MODES[:-1]:
+            if cls._MODE_FIELDS[mode] in fields:
+                return mode
+        return cls.OUTPUT_MODES[-1]
+
+    @staticmethod
+    def _record_usage(call: str, prompt: str, usage: Any, output_text: str) -> None:
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if prompt_tokens is None:
+            # Kullanım bilgisi gelmezse yaklaşık değer (4 karakter ~ 1 token)
+            prompt_tokens = len(prompt) // 4
+            output_tokens = len(output_text) // 4
+        token_usage.record(call, int(prompt_tokens or 0), int(output_tokens or 0))
+
+    def _start(self, call: str, build_prompt: Callable[[bool], str], schema: Dict[str, Any], stream: bool = False) -> Tuple[str, Any]:
+        """Starts one generate_content call in the best output mode the installed SDK accepts.
+
+        build_prompt(with_shape) must describe the JSON shape in the prompt when
+        with_shape is True (plain mode has no schema to carry it). Returns the
+        prompt and the response (an iterable of chunks when stream is True).
+        The mode is only lowered when the SDK or the API rejects the mode's own
+        config field; any other error (a bad prompt, a quota) is raised unchanged.
+        """
+        kwargs: Dict[str, Any] = {"stream": True} if stream else {}
+        while True:
+            mode = self.output_mode
+            prompt = build_prompt(mode == "plain")
+            generation_config = None
+            if mode == "schema":
+                generation_config = {"response_mime_type": "application/json", "response_schema": schema}
+            elif mode == "json":
+                generation_config = {"response_mime_type": "application/json"}
+            try:
+                if generation_config:
+                    response = self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
                 else:
-                    # If '```json' or '```' not found, try to parse the whole text (might be pure JSON)
-                    json_string = cleaned_response_text
-                
-                print(f"DEBUG: Cleaned JSON string for parsing: {json_string[:500]}...") # Log cleaned JSON string
+                    response = self.model.generate_content(prompt, **kwargs)
+            except (TypeError, ValueError, KeyError, AttributeError, InvalidArgument) as e:
+                # Eski SDK yerelde, eski model sunucuda (400) alanı reddeder; yalnızca o zaman bir sonraki kipe
+                # kalıcı olarak geçilir. Örnek paylaşıldığı için başka hatalar kipi değiştirmemelidir
+                if mode == self.OUTPUT_MODES[-1] or self._MODE_FIELDS[mode] not in str(e):
+                    raise
+                self.output_mode = self.OUTPUT_MODES[self.OUTPUT_MODES.index(mode) + 1]
+                print(f"DEBUG: Gemini output mode '{mode}' rejected for {call} ({e}); falling back to '{self.output_mode}'.")
+                continue
+            return prompt, response
+
+    def _generate(self, call: str, build_prompt: Callable[[bool], str], schema: Dict[str, Any]) -> str:
+        with stage_timer.measure(f"gemini_{call}"):
+            prompt, response = self._start(call, build_prompt, schema)
+        text = response.text or ""
+        self._record_usage(call, prompt, getattr(response, "usage_metadata", None), text)
+        return text
+
+    def stream_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Iterator[RecommendationResult]:
+        """Yields each recommendation as soon as its JSON object is complete in the streamed response.
+
+        If the stream breaks or ends before the array is closed, the error is
+        re-raised after the items received so far, so callers can tell a partial
+        answer from a complete one.
+        """
+        started = time.perf_counter()
+        try:
+            prompt, response = self._start("recommendations", lambda with_shape: prompt_builder.recommendation_prompt(query, filters, with_shape),
+                                            prompt_builder.RECOMMENDATIONS_SCHEMA, stream=True)
+        except Exception as e:
+            print(f"ERROR: Error generating recommendations with Gemini API: {e}")
+            return
+        chunks: List[Any] = []
+        texts: List[str] = []
+
+        def chunk_texts():
+            for chunk in response:
+                chunks.append(chunk)
                 try:
-                    recommendations_data = json.loads(json_string)
-                    print(f"DEBUG: Parsed recommendations data from Gemini: {recommendations_data}") # Yeni eklendi
-                    recommendations = []
-                    for item in recommendations_data:
-                        recommendations.append(RecommendationResult(
-                            title=item.get("title", ""),
-                            description=item.get("description", ""),
-                            rating=item.get("rating", 0.0),
-                            category=item.get("category", ""),
-                            location=item.get("location", {}),
-                            image_urls=item.get("image_urls", []) # Yeni eklendi
-                        ))
-                    print(f"DEBUG: Final RecommendationResult objects created: {[rec.__dict__ for rec in recommendations]}") # Yeni eklendi
-                    return recommendations
-                except json.JSONDecodeError as e:
-                    print(f"ERROR: JSON Decode Error from Gemini API: {e}. Response text: {response.text[:200]}") # Log first 200 chars
-                    return []
-            else:
+                    text = chunk.text or ""
+                except ValueError:
+                    # Yalnızca bitiş bilgisi taşıyan parçalarda metin yoktur
+                    text = ""
+                texts.append(text)
+                yield text
+
+        count = 0
+        pieces = chunk_texts()
+        try:
+            for item in iter_json_array(pieces):
+                rec = prompt_builder.validate_recommendation(item)
+                if not rec:
+                    continue
+                if count == 0:
+                    stage_timer.record("gemini_recommendations_first_item", time.perf_counter() - started)
+                count += 1
+                yield RecommendationResult(**rec)
+            # Dizi kapandıktan sonraki parçalar (kullanım bilgisi) da tüketilir
+            for _ in pieces:
+                pass
+        except Exception as e:
+            print(f"ERROR: Error streaming recommendations from Gemini API after {count} items: {e}")
+            raise
+        finally:
+            stage_timer.record("gemini_recommendations", time.perf_counter() - started)
+            # Kullanım bilgisi akışın son parçasında gelir
+            if chunks:
+                self._record_usage("recommendations", prompt, getattr(chunks[-1], "usage_metadata", None), "".join(texts))
+        print(f"DEBUG: Streamed {count} recommendations from Gemini for query: {query}")
+
+    def generate_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
+        try:
+            text = self._generate("recommendations", lambda with_shape: prompt_builder.recommendation_prompt(query, filters, with_shape),
+                                  prompt_builder.RECOMMENDATIONS_SCHEMA)
+            if not text:
                 print(f"DEBUG: Empty response text from Gemini API for query: {query}")
                 return []
+            try:
+                items = prompt_builder.parse_recommendations(text)
+            except ValueError as e:
+                print(f"ERROR: JSON Decode Error from Gemini API: {e}. Response text: {text[:200]}")
+                return []
+            print(f"DEBUG: Parsed {len(items)} recommendations from Gemini for query: {query}")
+            return [RecommendationResult(**item) for item in items]
         except Exception as e:
             print(f"ERROR: Error generating recommendations with Gemini API: {e}")
             return []
 
-    def get_place_details(self, place_name: str) -> Optional[PlaceDetails]:
+    def get_places_details(self, place_names: List[str]) -> List[PlaceDetails]:
+        """Fetches details for several places with a single prompt."""
+        if not place_names:
+            return []
         try:
-            prompt = f"""Bana '{place_name}' hakkında detaylı bilgi ver.
-            Cevabı JSON formatında, adı (name), enlem (latitude), boylam (longitude), açıklama (description), kategori (category) ve puan (rating) içerecek şekilde ver.
-            Eğer konum bilgisi mevcut değilse enlem ve boylam değerlerini null olarak bırakabilirsin.
-            Örnek JSON formatı:
-            {{"name": "Yer Adı", "latitude": 12.34, "longitude": 56.78, "description": "Detaylı Açıklama", "category": "Kategori", "rating": 4.5}}
-            """
-            response = self.model.generate_content(prompt)
-            if response.text:
-                cleaned_response_text = response.text.strip()
-                # Find the start and end of the JSON block
-                json_start = cleaned_response_text.find('```json')
-                json_end = cleaned_response_text.rfind('```')
-
-                if json_start != -1 and json_end != -1 and json_start < json_end:
-                    # Extract only the JSON part
-                    json_string = cleaned_response_text[json_start + len('```json'):json_end].strip()
-                else:
-                    # If '```json' or '```' not found, try to parse the whole text (might be pure JSON)
-                    json_string = cleaned_response_text
-
-                try:
-                    place_data = json.loads(json_string)
-                    return PlaceDetails(
-                        name=place_data.get("name", place_name),
-                        latitude=place_data.get("latitude"),
-                        longitude=place_data.get("longitude"),
-                        description=place_data.get("description", ""),
-                        category=place_data.get("category", ""),
-                        rating=place_data.get("rating", 0.0)
-                    )
-                except json.JSONDecodeError as e:
-                    print(f"JSON Decode Error from Gemini API for place details: {e}. Response text: {response.text[:200]}")
-                    return None
-            return None
+            text = self._generate("place_details", lambda with_shape: prompt_builder.place_details_prompt(place_names, with_shape),
+                                  prompt_builder.PLACE_DETAILS_SCHEMA)
+            if not text:
+                return []
+            try:
+                places = prompt_builder.parse_places(text)
+            except ValueError as e:
+                print(f"JSON Decode Error from Gemini API for batch place details: {e}. Response text: {text[:200]}")
+                return []
+            return [PlaceDetails(**place) for place in places]
         except Exception as e:
-            print(f"Error getting place details with Gemini API: {e}")
+            print(f"Error getting batch place details with Gemini API: {e}")
+            return []
+
+    def get_place_details(self, place_name: str) -> Optional[PlaceDetails]:
+        details = self.get_places_details([place_name])
+        if not details:
             return None
+        # Model adı farklı yazsa da istenen yerin adıyla döndürülür
+        details[0].name = place_name
+        return details[0]
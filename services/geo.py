@@ -0,0 +1,119 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy streamlit ile birlikte gelir; yoksa saf Python hesaplanır
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+
+LatLng = Tuple[float, float]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_from(latitude: float, longitude: float, lats: Sequence[Optional[float]],
+                      lngs: Sequence[Optional[float]]) -> List[Optional[float]]:
+    """Distances (km) from one point to many in a single vectorized pass; None where coordinates are missing."""
+    if not lats:
+        return []
+    if np is not None:
+        lat2 = np.radians(np.array([np.nan if v is None else v for v in lats], dtype=float))
+        lng2 = np.radians(np.array([np.nan if v is None else v for v in lngs], dtype=float))
+        lat1 = math.radians(latitude)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - math.radians(longitude)) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        return [None if d != d else float(d) for d in distances.tolist()]
+    return [
+        haversine_km(latitude, longitude, lat, lng) if lat is not None and lng is not None else None
+        for lat, lng in zip(lats, lngs)
+    ]
+
+
+def haversine_matrix(points: Sequence[LatLng]) -> List[List[float]]:
+    """Symmetric pairwise distance matrix (km); trig terms are computed once per point."""
+    rad = [(math.radians(lat), math.radians(lng)) for lat, lng in points]
+    cos_lat = [math.cos(lat) for lat, _ in rad]
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        lat_i, lng_i = rad[i]
+        row = matrix[i]
+        for j in range(i + 1, n):
+            lat_j, lng_j = rad[j]
+            a = math.sin((lat_j - lat_i) / 2) ** 2 + cos_lat[i] * cos_lat[j] * math.sin((lng_j - lng_i) / 2) ** 2
+            d = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+            row[j] = d
+            matrix[j][i] = d
+    return matrix
+
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Geohash hassasiyetine göre hücre boyutu (enlem derecesi, boylam derecesi)
+_GEOHASH_CELL_DEGREES = {p: (180.0 / 2 ** ((5 * p) // 2), 360.0 / 2 ** ((5 * p + 1) // 2)) for p in range(1, 13)}
+GEOHASH_PRECISION = 9
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if longitude >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_GEOHASH_ALPHABET[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_cover(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Geohash prefixes whose cells together contain the circle around the point.
+
+    Uses the finest precision whose cells are at least radius_km on each side,
+    so the centre cell and its 8 neighbours cover the whole circle.
+    """
+    km_per_lat_degree = math.pi * EARTH_RADIUS_KM / 180
+    km_per_lng_degree = max(km_per_lat_degree * math.cos(math.radians(latitude)), 1e-6)
+    precision = 0
+    for p in range(12, 0, -1):
+        dlat, dlng = _GEOHASH_CELL_DEGREES[p]
+        if dlat * km_per_lat_degree >= radius_km and dlng * km_per_lng_degree >= radius_km:
+            precision = p
+            break
+    if not precision:
+        # Yarıçap en büyük hücreden de büyük: boş önek tüm kayıtları kapsar
+        return [""]
+    dlat, dlng = _GEOHASH_CELL_DEGREES[precision]
+    prefixes = set()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            lat = min(max(latitude + dy * dlat, -90.0), 90.0)
+            lng = (longitude + dx * dlng + 180.0) % 360.0 - 180.0
+            prefixes.add(geohash_encode(lat, lng, precision))
+    return sorted(prefixes)
@@ -0,0 +1,91 @@
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from config.settings import GEOCODE_CACHE_TTL_SECONDS, GEOCODE_NEGATIVE_TTL_SECONDS, GEOCODE_MEMORY_MAX_ENTRIES
+from database.database_manager import DatabaseManager
+from services.memory_cache import MISSING, MemoryCache
+from services.text_utils import normalize_query
+
+LatLng = Tuple[float, float]
+
+# Bellekteki bir geocode kaydının yaklaşık boyutu (anahtar + iki float)
+_ENTRY_SIZE_BYTES = 128
+
+
+class GeocodingCache:
+    """Two-level (in-process LRU + SQLite) cache for geocoding results.
+
+    Keys are (provider, normalized query). A lookup that found nothing is stored
+    as a negative entry with a shorter TTL so unknown places stop hitting the API.
+    Exceptions raised by the fetch function are never cached.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None,
+                 ttl_seconds: int = GEOCODE_CACHE_TTL_SECONDS,
+                 negative_ttl_seconds: int = GEOCODE_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = GEOCODE_MEMORY_MAX_ENTRIES):
+        self.db_manager = db_manager or DatabaseManager()
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._memory = MemoryCache(max_entries=max_entries, max_bytes=max_entries * _ENTRY_SIZE_BYTES, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "negative_hits": 0, "misses": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _remember(self, key: Tuple[str, str], value: Optional[LatLng]) -> None:
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        self._memory.set(key, value, size_bytes=_ENTRY_SIZE_BYTES, ttl_seconds=ttl)
+
+    def get_or_fetch(self, provider: str, query: str, fetch: Callable[[str], Optional[LatLng]]) -> Optional[LatLng]:
+        key = (provider, normalize_query(query))
+        if not key[1]:
+            return None
+
+        value = self._memory.get(key)
+        if value is not MISSING:
+            self._count("memory_hits" if value is not None else "negative_hits")
+            return value
+
+        cached = self.db_manager.get_cached_geocode(provider, key[1], self.ttl_seconds, self.negative_ttl_seconds)
+        if cached is not None:
+            value = (cached["latitude"], cached["longitude"]) if cached["found"] else None
+            self._count("db_hits" if value is not None else "negative_hits")
+            self._remember(key, value)
+            return value
+
+        self._count("misses")
+        try:
+            value = fetch(query)
+        except Exception as e:
+            self._count("errors")
+            print(f"Error geocoding '{query}' with {provider}: {e}")
+            return None
+        self.db_manager.save_geocode(provider, key[1], value[0] if value else None, value[1] if value else None)
+        self._remember(key, value)
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._counters)
+        stats["memory_entries"] = self._memory.stats()["entries"]
+        hits = stats["memory_hits"] + stats["db_hits"] + stats["negative_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+_shared_cache: Optional[GeocodingCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_geocoding_cache() -> GeocodingCache:
+    """Returns the process-wide geocoding cache shared by MapsService and WeatherService."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = GeocodingCache()
+    return _shared_cache
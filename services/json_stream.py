@@ -0,0 +1,153 @@
+import json
+from typing import Any, Iterable, Iterator, List
+
+_OUTSIDE = 0   # Dizinin başı henüz görülmedi (düzyazı, ```json çiti ...)
+_SPACE = " \t\r\n"
+_IN_ARRAY = 1
+_DONE = 2
+
+
+class JsonArrayStream:
+    """Incremental parser that emits the objects of a JSON array as their closing brace arrives.
+
+    Text before the array (prose, a ```json fence) and after the closing ']' is
+    ignored. A '[' only opens the array when the next non-space character is '{'
+    or ']', and a '{' only opens a top-level object when the next one is '"', so
+    brackets and braces in the prose ("[3 öneri]", "{liste}") are skipped. A
+    wrapper object ({"recommendations": [{...}, ...]}) is descended into: its first
+    member holding an array of objects is streamed. Any other top-level object is
+    emitted as a single element. Elements that are not objects or fail to parse
+    are skipped and counted in `errors`.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0           # _buffer içinde taranacak sonraki karakter
+        self._state = _OUTSIDE
+        self._bare_object = False  # Dizi yerine tek başına bir nesne taranıyor
+        self._depth = 0         # Eleman içindeki süslü/köşeli parantez derinliği
+        self._element_start = -1
+        self._in_string = False
+        self._escape = False
+        self.errors = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consumes the next piece of text and returns the elements completed by it."""
+        if self._state == _DONE or not chunk:
+            return []
+        self._buffer += chunk
+        elements: List[Any] = []
+        buffer = self._buffer
+        pos = self._pos
+        length = len(buffer)
+
+        while pos < length and self._state != _DONE:
+            ch = buffer[pos]
+            if self._state == _OUTSIDE:
+                if ch == "[":
+                    nxt = self._next_non_space(buffer, pos + 1)
+                    if nxt == length:
+                        # '[' sonrası henüz gelmedi; sonraki parçayla birlikte yeniden bakılır
+                        break
+                    if buffer[nxt] in "{]":
+                        self._state = _IN_ARRAY
+                elif ch == "{":
+                    nxt = self._next_non_space(buffer, pos + 1)
+                    if nxt == length:
+                        break
+                    if buffer[nxt] == '"':
+                        self._state = _IN_ARRAY
+                        self._bare_object = True
+                        self._element_start = pos
+                        self._depth = 1
+                pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "[" and self._bare_object and self._depth == 1:
+                nxt = self._next_non_space(buffer, pos + 1)
+                if nxt == length:
+                    break
+                if buffer[nxt] == "{":
+                    # Sarmalayıcı nesne: içindeki nesne dizisi akıtılır, sarmalayıcının kalanı yok sayılır
+                    self._bare_object = False
+                    self._element_start = -1
+                    self._depth = 0
+                else:
+                    self._depth += 1
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._element_start = pos
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # Dizinin kapanışı
+                    self._state = _DONE
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._emit(buffer[self._element_start:pos + 1], elements)
+                        self._element_start = -1
+                        if self._bare_object:
+                            self._state = _DONE
+            pos += 1
+
+        # Tamamlanan kısım atılır; yalnızca yarım kalan eleman tamponda kalır
+        if self._element_start >= 0:
+            self._buffer = buffer[self._element_start:]
+            pos -= self._element_start
+            self._element_start = 0
+        elif self._state == _OUTSIDE:
+            self._buffer = buffer[pos:]
+            pos = 0
+        else:
+            self._buffer = ""
+            pos = 0
+        self._pos = pos
+        return elements
+
+    @staticmethod
+    def _next_non_space(buffer: str, pos: int) -> int:
+        while pos < len(buffer) and buffer[pos] in _SPACE:
+            pos += 1
+        return pos
+
+    def _emit(self, text: str, elements: List[Any]) -> None:
+        try:
+            value = json.loads(text)
+        except ValueError:
+            self.errors += 1
+            return
+        if isinstance(value, dict):
+            elements.append(value)
+        else:
+            self.errors += 1
+
+
+class IncompleteJsonError(ValueError):
+    """The text ended before the JSON array was closed (e.g. a truncated or failed stream)."""
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yields array elements from streamed text chunks as soon as each one is complete.
+
+    Raises IncompleteJsonError if the chunks run out before the array is closed.
+    """
+    parser = JsonArrayStream()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    raise IncompleteJsonError("Response ended before the JSON array was closed")
@@ -0,0 +1,185 @@
+"""Deterministic offline stand-in for the Gemini service, for load tests and benchmarks.
+
+Select it with AI_PROVIDER=local. Answers depend only on the seed, the query and
+the filters; latency and failures are injected as configured.
+"""
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import (
+    RECOMMENDATION_COUNT,
+    LOCAL_AI_LATENCY_SECONDS,
+    LOCAL_AI_LATENCY_JITTER_SECONDS,
+    LOCAL_AI_ERROR_RATE,
+    LOCAL_AI_SEED,
+)
+from services import prompt_builder
+from services.gemini_service import AIRecommendationService, RecommendationResult, PlaceDetails
+from services.json_stream import iter_json_array
+from services.metrics import stage_timer
+from services.query_cache import canonical_filters, canonical_query
+
+# Bilinen şehir merkezleri; diğer sorgular için Türkiye sınırları içinde sabit bir nokta üretilir
+_CITIES = {
+    "istanbul": ("İstanbul", 41.0082, 28.9784),
+    "ankara": ("Ankara", 39.9334, 32.8597),
+    "izmir": ("İzmir", 38.4237, 27.1428),
+    "antalya": ("Antalya", 36.8969, 30.7133),
+    "bursa": ("Bursa", 40.1885, 29.0610),
+    "trabzon": ("Trabzon", 41.0027, 39.7168),
+    "nevsehir": ("Nevşehir", 38.6244, 34.7239),
+    "mugla": ("Muğla", 37.2153, 28.3636),
+}
+
+# Kategori başına yer adı kalıpları ({city} şehir adıyla doldurulur)
+_TEMPLATES = {
+    "Müze": ["{city} Arkeoloji Müzesi", "{city} Kent Müzesi", "{city} Etnografya Müzesi", "{city} Resim ve Heykel Müzesi"],
+    "Tarihi Yer": ["{city} Kalesi", "{city} Saat Kulesi", "Eski {city} Çarşısı", "{city} Antik Tiyatrosu"],
+    "Doğa": ["{city} Botanik Bahçesi", "{city} Kent Ormanı", "{city} Şelalesi", "{city} Tabiat Parkı"],
+    "Park": ["{city} Sahil Parkı", "{city} Millet Bahçesi", "{city} Gençlik Parkı"],
+    "Kafe": ["{city} Kitap Kafe", "Tarihi {city} Kahvehanesi"],
+    "Restoran": ["{city} Balık Lokantası", "{city} Ocakbaşı"],
+    "Alışveriş": ["{city} Kapalı Çarşı", "{city} El Sanatları Pazarı"],
+}
+_CATEGORIES = list(_TEMPLATES)
+
+_DESCRIPTIONS = [
+    "Şehrin en çok ziyaret edilen noktalarından biri.",
+    "Yerel tarih ve kültürü yakından tanımak için ideal.",
+    "Sakin bir mola ve fotoğraf için güzel bir durak.",
+    "Hafta sonları kalabalık olabilir; sabah saatleri önerilir.",
+]
+
+_STREAM_CHUNKS = 8
+
+
+class InjectedProviderError(RuntimeError):
+    """Failure raised on purpose by the local provider (error injection)."""
+
+
+class LocalRecommendationService(AIRecommendationService):
+    """Offline provider returning realistic recommendation JSON through the same parsing path as Gemini.
+
+    `latency_seconds` (± `jitter_seconds`) is spent per call; streamed answers
+    spread it over several chunks. With probability `error_rate` a call fails and,
+    like GeminiService, returns no results. The latency/error sequence depends
+    only on `seed` and the order of calls.
+    """
+
+    def __init__(self, latency_seconds: float = LOCAL_AI_LATENCY_SECONDS, jitter_seconds: float = LOCAL_AI_LATENCY_JITTER_SECONDS,
+                 error_rate: float = LOCAL_AI_ERROR_RATE, seed: int = LOCAL_AI_SEED, count: int = RECOMMENDATION_COUNT):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.error_rate = error_rate
+        self.seed = seed
+        self.count = count
+        self.calls = 0
+        self.injected_errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_call(self, call: str) -> float:
+        """Latency of the next call; raises InjectedProviderError for an injected failure."""
+        with self._lock:
+            self.calls += 1
+            latency = max(0.0, self.latency_seconds + self._rng.uniform(-self.jitter_seconds, self.jitter_seconds))
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.injected_errors += 1
+        if failed:
+            time.sleep(latency)
+            raise InjectedProviderError(f"Injected {call} failure")
+        return latency
+
+    @staticmethod
+    def _city(city_key: str, rng: random.Random) -> tuple:
+        """(display name, lat, lng); the name depends only on the canonical query, not its spelling."""
+        city = _CITIES.get(city_key)
+        if city is None:
+            name = " ".join(word.capitalize() for word in city_key.split()) or "Şehir"
+            city = (name, rng.uniform(36.5, 41.5), rng.uniform(27.0, 43.0))
+        return city
+
+    def _recommendation_items(self, query: str, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        city_key = canonical_query(query)
+        canonical = canonical_filters(filters)
+        rng = random.Random(f"{self.seed}|{city_key}|{json.dumps(canonical, sort_keys=True)}")
+        city, lat, lng = self._city(city_key, rng)
+        wanted = filters.get("category") if filters and filters.get("category") in _TEMPLATES else None
+        items = []
+        used = set()
+        while len(items) < self.count and len(used) < sum(len(t) for t in _TEMPLATES.values()):
+            category = wanted or rng.choice(_CATEGORIES)
+            title = rng.choice(_TEMPLATES[category]).format(city=city)
+            if title in used:
+                if wanted and len(used) >= len(_TEMPLATES[wanted]):
+                    break
+                continue
+            used.add(title)
+            items.append({
+                "title": title,
+                "description": rng.choice(_DESCRIPTIONS),
+                "rating": round(rng.uniform(3.8, 4.9), 1),
+                "category": category,
+                "location": {"lat": round(lat + rng.uniform(-0.04, 0.04), 6), "lng": round(lng + rng.uniform(-0.04, 0.04), 6)},
+            })
+        return items
+
+    def generate_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
+        try:
+            with stage_timer.measure("local_ai_recommendations"):
+                time.sleep(self._next_call("recommendations"))
+                text = json.dumps(self._recommendation_items(query, filters), ensure_ascii=False)
+            return [RecommendationResult(**item) for item in prompt_builder.parse_recommendations(text)]
+        except Exception as e:
+            print(f"ERROR: Error generating recommendations with local provider: {e}")
+            return []
+
+    def stream_recommendations(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Iterator[RecommendationResult]:
+        try:
+            latency = self._next_call("recommendations")
+        except InjectedProviderError as e:
+            print(f"ERROR: Error generating recommendations with local provider: {e}")
+            return
+        text = json.dumps(self._recommendation_items(query, filters), ensure_ascii=False)
+        size = max(1, -(-len(text) // _STREAM_CHUNKS))
+
+        def chunks():
+            # Gecikme parçalara bölünür; ilk öneri tüm yanıttan önce gelir
+            for start in range(0, len(text), size):
+                time.sleep(latency / _STREAM_CHUNKS)
+                yield text[start:start + size]
+
+        for item in iter_json_array(chunks()):
+            rec = prompt_builder.validate_recommendation(item)
+            if rec:
+                yield RecommendationResult(**rec)
+
+    def get_places_details(self, place_names: List[str]) -> List[PlaceDetails]:
+        if not place_names:
+            return []
+        try:
+            time.sleep(self._next_call("place_details"))
+        except InjectedProviderError as e:
+            print(f"Error getting batch place details with local provider: {e}")
+            return []
+        details = []
+        for name in place_names:
+            rng = random.Random(f"{self.seed}|place|{canonical_query(name)}")
+            category = next((c for c in _CATEGORIES if canonical_query(c) in canonical_query(name)), None) or rng.choice(_CATEGORIES)
+            name_key = canonical_query(name)
+            city_key = next((key for key in _CITIES if key in name_key.split()), "")
+            _, lat, lng = self._city(city_key, rng)
+            if city_key:
+                lat, lng = lat + rng.uniform(-0.04, 0.04), lng + rng.uniform(-0.04, 0.04)
+            details.append(PlaceDetails(name=name, latitude=round(lat, 6), longitude=round(lng, 6),
+                                        description=rng.choice(_DESCRIPTIONS), category=category,
+                                        rating=round(rng.uniform(3.8, 4.9), 1)))
+        return details
+
+    def get_place_details(self, place_name: str) -> Optional[PlaceDetails]:
+        details = self.get_places_details([place_name])
+        return details[0] if details else None
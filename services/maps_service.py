@@ -1,7 +1,10 @@
 import googlemaps
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from config.api_keys import GOOGLE_MAPS_API_KEY
+from database.database_manager import DatabaseManager
+from services.geocoding_cache import GeocodingCache, get_geocoding_cache
+from services.travel_time import TravelTimeMatrix
 
 # Placeholder for data structures
 class Coordinates:
@@ -25,20 +28,35 @@ class RouteInfo:
         self.steps = steps
 
 class MapsService:
-    def __init__(self):
-        if not GOOGLE_MAPS_API_KEY:
-            raise ValueError("Google Maps API Key is not set in environment variables.")
-        self.client = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
-        
+    GEOCODE_PROVIDER = "google"
+
+    def __init__(self, geocoding_cache: Optional[GeocodingCache] = None, travel_time_matrix: Optional[TravelTimeMatrix] = None,
+                 client: Any = None, db_manager: Optional[DatabaseManager] = None):
+        # client verilirse (ör. kaydedilmiş yanıtlar döndüren bir benchmark istemcisi) API anahtarı gerekmez
+        if client is None:
+            if not GOOGLE_MAPS_API_KEY:
+                raise ValueError("Google Maps API Key is not set in environment variables.")
+            client = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+        self.client = client
+        self.geocoding_cache = geocoding_cache or get_geocoding_cache()
+        self.travel_time_matrix = travel_time_matrix or TravelTimeMatrix(self.client, db_manager)
+
+    def _geocode(self, place_name: str) -> Optional[Tuple[float, float]]:
+        # Hatalar yukarı iletilir ki önbellek bunları "bulunamadı" olarak kaydetmesin
+        print(f"DEBUG: MapsService geocoding for: {place_name}") # DEBUG
+        geocode_result = self.client.geocode(place_name)
+        if geocode_result:
+            location = geocode_result[0]['geometry']['location']
+            print(f"DEBUG: MapsService found coordinates for {place_name}: {location}") # DEBUG
+            return (location['lat'], location['lng'])
+        print(f"DEBUG: MapsService found no results for: {place_name}") # DEBUG
+        return None
+
     def get_place_coordinates(self, place_name: str) -> Optional[Coordinates]:
         try:
-            print(f"DEBUG: MapsService geocoding for: {place_name}") # DEBUG
-            geocode_result = self.client.geocode(place_name)
-            if geocode_result:
-                location = geocode_result[0]['geometry']['location']
-                print(f"DEBUG: MapsService found coordinates for {place_name}: {location}") # DEBUG
-                return Coordinates(latitude=location['lat'], longitude=location['lng'])
-            print(f"DEBUG: MapsService found no results for: {place_name}") # DEBUG
+            location = self.geocoding_cache.get_or_fetch(self.GEOCODE_PROVIDER, place_name, self._geocode)
+            if location:
+                return Coordinates(latitude=location[0], longitude=location[1])
             return None
         except Exception as e:
             print(f"Error getting place coordinates with Google Maps API for {place_name}: {e}") # DEBUG
@@ -98,19 +116,20 @@ class MapsService:
     def get_travel_time_minutes(self, origin: Coordinates, destination: Coordinates, mode: str = "driving") -> Optional[int]:
         """Estimate travel time in minutes between two coordinates for a given mode (driving, walking, transit)."""
         try:
-            if mode not in ["driving", "walking", "transit", "bicycling"]:
-                mode = "driving"
-            directions = self.client.directions(
-                origin=(origin.latitude, origin.longitude),
-                destination=(destination.latitude, destination.longitude),
-                mode=mode
+            minutes = self.travel_time_matrix.minutes_between(
+                (origin.latitude, origin.longitude),
+                (destination.latitude, destination.longitude),
+                mode
             )
-            if not directions:
-                return None
-            leg = directions[0]['legs'][0]
-            seconds = leg['duration']['value']
-            return int(round(seconds / 60))
+            return int(round(minutes))
         except Exception as e:
             print(f"Error getting travel time: {e}")
             return None
 
+    def get_travel_time_matrix(self, points: List[Tuple[float, float]], mode: str = "driving") -> Optional[List[List[float]]]:
+        """Pairwise travel times in minutes; cached Distance Matrix results with an offline estimate fallback."""
+        try:
+            return self.travel_time_matrix.matrix(points, mode)
+        except Exception as e:
+            print(f"Error getting travel time matrix: {e}")
+            return None
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# get() için "anahtar yok" işareti; None geçerli bir önbellek değeri olabilir
+MISSING = object()
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache bounded by entry count and approximate bytes.
+
+    Every entry has a TTL (the cache default or a per-entry override). Sizes are
+    supplied by the caller because only it knows a cheap estimate for its values.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (value, size_bytes, expires_at)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return default
+            value, _, expires_at = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, size_bytes: int = 1, ttl_seconds: Optional[float] = None) -> None:
+        if size_bytes > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size_bytes, expires_at)
+            self._bytes += size_bytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                return True
+            return False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_caches: Dict[str, MemoryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_memory_cache(name: str, max_entries: int, max_bytes: int, ttl_seconds: float) -> MemoryCache:
+    """Returns the process-wide cache registered under `name`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = MemoryCache(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+            _caches[name] = cache
+        return cache
+
+
+def memory_cache_stats() -> Dict[str, Dict[str, float]]:
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
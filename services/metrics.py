@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+
+class StageTimer:
+    """Process-wide rolling latency samples per pipeline stage (seconds)."""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    @contextmanager
+    def measure(self, stage: str, into: Optional[Dict[str, float]] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(stage, elapsed)
+            if into is not None:
+                into[stage] = into.get(stage, 0.0) + elapsed
+
+    @staticmethod
+    def _percentile(sorted_values, pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+        return sorted_values[idx]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._samples.items()}
+        result = {}
+        for stage, values in snapshot.items():
+            result[stage] = {
+                "count": len(values),
+                "p50_ms": self._percentile(values, 50) * 1000,
+                "p95_ms": self._percentile(values, 95) * 1000,
+                "max_ms": (values[-1] if values else 0.0) * 1000,
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+# Tüm oturumlar tarafından paylaşılan zamanlayıcı
+stage_timer = StageTimer()
+
+
+class TokenUsage:
+    """Process-wide token counts per model call type (e.g. "recommendations", "place_details")."""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "output_tokens": 0})
+        self._lock = threading.Lock()
+
+    def record(self, call: str, prompt_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            totals = self._totals[call]
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["output_tokens"] += output_tokens
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {call: dict(totals) for call, totals in self._totals.items()}
+        for totals in snapshot.values():
+            calls = totals["calls"] or 1
+            totals["avg_prompt_tokens"] = totals["prompt_tokens"] / calls
+            totals["avg_output_tokens"] = totals["output_tokens"] / calls
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+# Gemini çağrılarının giriş/çıkış token sayıları
+token_usage = TokenUsage()
@@ -0,0 +1,241 @@
+"""Hour-of-week activity curves learned from search, favorite and itinerary logs.
+
+The curves record when people use the app for a place, category or city, not
+when they visit it, so they are a busyness signal only. They never replace the
+curated visit windows; with POPULARITY_LEARNED_SUGGESTIONS enabled they only
+reorder those windows, quietest first.
+
+Build or update the stored curves (incremental by default):
+
+    python -m services.popularity_model [--full]
+"""
+import argparse
+import json
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import (
+    POPULARITY_MIN_EVENTS,
+    POPULARITY_UTC_OFFSET_HOURS,
+    POPULARITY_MODEL_RELOAD_SECONDS,
+    POPULARITY_UPDATE_BATCH_SIZE,
+)
+from database.database_manager import DatabaseManager
+from services.text_utils import normalize_query
+
+HOURS_PER_WEEK = 168
+PLACE = "place"
+CATEGORY = "category"
+CITY = "city"
+SOURCES = ("search", "favorites", "itinerary")
+
+CurveKey = Tuple[str, str]
+Rule = Tuple[str, str]
+
+
+def empty_curve() -> array:
+    return array("I", bytes(4 * HOURS_PER_WEEK))
+
+
+def curve_from_blob(blob: bytes) -> array:
+    curve = array("I")
+    curve.frombytes(blob)
+    return curve
+
+
+_base_service = None
+
+
+def category_key(category: Optional[str]) -> str:
+    """Groups noisy categories under the built-in rule they match ("Doğa Parkı" -> "doga")."""
+    global _base_service
+    if _base_service is None:
+        # popularity_service bu modülü içe aktardığı için burada geç yüklenir
+        from services.popularity_service import PopularityService
+        _base_service = PopularityService(model=None)
+    matched = _base_service.match_key(category or "")
+    return normalize_query(matched if matched else category or "")
+
+
+def parse_search_query(search_query: str) -> Tuple[str, Optional[str]]:
+    """(city, category filter) from a search_history query ("İzmir_{...filters json...}")."""
+    idx = search_query.find("_{")
+    if idx < 0:
+        return search_query, None
+    try:
+        filters = json.loads(search_query[idx + 1:])
+    except ValueError:
+        filters = {}
+    category = filters.get("category") if isinstance(filters, dict) else None
+    return search_query[:idx], category if category and category != "Tümü" else None
+
+
+def window_load(profile: List[float], window: str) -> float:
+    """Summed activity of a "HH:MM-HH:MM" window in a 24-hour profile."""
+    start, end = (int(part.split(":")[0]) for part in window.split("-"))
+    return sum(profile[start:end])
+
+
+class PopularityModel:
+    """Read side of the learned curves: all curves in memory, O(1) lookups.
+
+    Curves are reloaded from SQLite at most every `reload_seconds`. A curve is
+    only used to rank visit windows once it has `min_events` events.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, min_events: int = POPULARITY_MIN_EVENTS,
+                 reload_seconds: float = POPULARITY_MODEL_RELOAD_SECONDS):
+        self.db_manager = db_manager or DatabaseManager()
+        self.min_events = min_events
+        self.reload_seconds = reload_seconds
+        self._curves: Dict[CurveKey, array] = {}
+        self._totals: Dict[CurveKey, int] = {}
+        self._suggestions: Dict[Tuple[CurveKey, Optional[int], Rule], Rule] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        curves: Dict[CurveKey, array] = {}
+        totals: Dict[CurveKey, int] = {}
+        try:
+            for scope, key, blob, total in self.db_manager.get_popularity_curves():
+                curves[(scope, key)] = curve_from_blob(blob)
+                totals[(scope, key)] = total
+        except Exception as e:
+            print(f"Error loading popularity curves: {e}")
+        with self._lock:
+            self._curves, self._totals, self._suggestions = curves, totals, {}
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_seconds:
+            self.load()
+
+    def curve(self, scope: str, key: str) -> Optional[array]:
+        self._ensure_loaded()
+        return self._curves.get((scope, key))
+
+    def busyness(self, scope: str, key: str, hour_of_week: int) -> Optional[float]:
+        """0..1 relative busyness of the hour (1 = the curve's busiest hour)."""
+        curve = self.curve(scope, key)
+        if not curve:
+            return None
+        peak = max(curve)
+        return curve[hour_of_week] / peak if peak else 0.0
+
+    def _trusted(self, scope: str, key: str) -> Optional[CurveKey]:
+        curve_key = (scope, key)
+        return curve_key if self._totals.get(curve_key, 0) >= self.min_events else None
+
+    def rank_windows(self, windows: Rule, category: Optional[str], place_name: Optional[str] = None,
+                     weekday: Optional[int] = None) -> Optional[Rule]:
+        """The given (best, alternative) windows ordered quietest first by the place's curve, else its category's.
+
+        Only the order of the curated windows changes; None without enough data.
+        """
+        self._ensure_loaded()
+        if not self._totals:
+            return None
+        curve_key = (place_name and self._trusted(PLACE, normalize_query(place_name))) or \
+            (category and self._trusted(CATEGORY, category_key(category)))
+        if not curve_key:
+            return None
+        memo_key = (curve_key, weekday, tuple(windows))
+        suggestion = self._suggestions.get(memo_key)
+        if suggestion is None:
+            curve = self._curves[curve_key]
+            days = [weekday] if weekday is not None else range(7)
+            profile = [sum(curve[day * 24 + hour] for day in days) for hour in range(24)]
+            best, alt = windows
+            # Eşitlikte küratörlü sıra korunur
+            suggestion = (alt, best) if window_load(profile, alt) < window_load(profile, best) else (best, alt)
+            self._suggestions[memo_key] = suggestion
+        return suggestion
+
+
+def update_curves(db_manager: Optional[DatabaseManager] = None, full: bool = False,
+                  batch_size: int = POPULARITY_UPDATE_BATCH_SIZE) -> Dict[str, int]:
+    """Folds log rows newer than the stored watermarks into the curves.
+
+    With full=True the curves are dropped and rebuilt from the whole history.
+    Each batch is saved together with its watermarks, so an interrupted run
+    resumes where it stopped without counting events twice.
+    """
+    db_manager = db_manager or DatabaseManager()
+    if full:
+        db_manager.clear_popularity_model()
+    watermarks = db_manager.get_popularity_watermarks()
+    stats = {"events": 0, "curves_updated": 0}
+
+    for source in SOURCES:
+        while True:
+            rows = db_manager.get_popularity_events(source, watermarks.get(source, 0), batch_size, POPULARITY_UTC_OFFSET_HOURS)
+            if not rows:
+                break
+            deltas: Dict[CurveKey, array] = {}
+
+            def add(scope: str, key: str, hour_of_week: int) -> None:
+                if not key or hour_of_week is None:
+                    return
+                curve = deltas.get((scope, key))
+                if curve is None:
+                    curve = deltas[(scope, key)] = empty_curve()
+                curve[hour_of_week] += 1
+
+            for row in rows:
+                if source == "search":
+                    city, category = parse_search_query(row[1])
+                    add(CITY, normalize_query(city), row[2])
+                    if category:
+                        add(CATEGORY, category_key(category), row[2])
+                else:
+                    add(PLACE, normalize_query(row[1]), row[3])
+                    if row[2]:
+                        add(CATEGORY, category_key(row[2]), row[3])
+
+            merged = []
+            existing = {(scope, key): curve_from_blob(blob) for scope, key, blob, _ in db_manager.get_popularity_curves(list(deltas))}
+            for curve_key, delta in deltas.items():
+                curve = existing.get(curve_key, empty_curve())
+                for hour, count in enumerate(delta):
+                    if count:
+                        curve[hour] += count
+                merged.append((curve_key[0], curve_key[1], curve.tobytes(), sum(curve)))
+
+            watermarks[source] = rows[-1][0]
+            if not db_manager.save_popularity_update(merged, {source: watermarks[source]}):
+                raise RuntimeError(f"Popularity update failed for source {source}")
+            stats["events"] += len(rows)
+            stats["curves_updated"] += len(merged)
+            if len(rows) < batch_size:
+                break
+    return stats
+
+
+_shared_model: Optional[PopularityModel] = None
+_shared_model_lock = threading.Lock()
+
+
+def get_popularity_model() -> PopularityModel:
+    global _shared_model
+    if _shared_model is None:
+        with _shared_model_lock:
+            if _shared_model is None:
+                _shared_model = PopularityModel()
+    return _shared_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or update the popularity curves from the logs.")
+    parser.add_argument("--full", action="store_true", help="drop the stored curves and rebuild from the whole history")
+    args = parser.parse_args()
+    began = time.perf_counter()
+    stats = update_curves(full=args.full)
+    stats["seconds"] = round(time.perf_counter() - began, 3)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,38 @@
-from typing import Dict, Tuple
+import glob
+import json
+import os
+import re
+import threading
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import POPULARITY_RULES_DIR, POPULARITY_MATCH_CACHE_SIZE, POPULARITY_LEARNED_SUGGESTIONS
+from services.popularity_model import PopularityModel, get_popularity_model
+from services.text_utils import normalize_query
+
+Rule = Tuple[str, str]
+
+
+def season_for(day: date) -> str:
+    """Northern-hemisphere meteorological season name used by rule files."""
+    return {12: "winter", 1: "winter", 2: "winter", 3: "spring", 4: "spring", 5: "spring",
+            6: "summer", 7: "summer", 8: "summer"}.get(day.month, "autumn")
+
 
 class PopularityService:
-    """Heuristic visit time suggestions by category. Returns (best_time, alternative_time)."""
-    CATEGORY_RULES: Dict[str, Tuple[str, str]] = {
+    """Heuristic visit time suggestions by category. Returns (best_time, alternative_time).
+
+    Rule keys are matched as substrings of the category after Turkish-aware
+    folding ("TARİHİ YER / Müze" -> "tarihi yer / muze"). All keys are compiled
+    into one regex; when several keys match, the earliest rule wins, as with the
+    original linear scan. Results are memoized per category string.
+
+    The rules are the source of the visit windows. When a PopularityModel is
+    attached and POPULARITY_LEARNED_SUGGESTIONS is on, the matched rule's best and
+    alternative windows are swapped if our logs show the best one is busier.
+    """
+    CATEGORY_RULES: Dict[str, Rule] = {
         "Müze": ("10:00-12:00", "15:00-17:00"),
         "Tarihi Yer": ("09:00-11:00", "16:00-18:00"),
         "Park": ("08:00-10:00", "17:00-19:00"),
@@ -13,11 +43,127 @@ class PopularityService:
         "Doğa": ("08:00-10:00", "16:00-18:00"),
     }
 
-    DEFAULT: Tuple[str, str] = ("10:00-12:00", "16:00-18:00")
+    DEFAULT: Rule = ("10:00-12:00", "16:00-18:00")
+
+    def __init__(self, rules: Optional[Dict[str, Rule]] = None, default: Optional[Rule] = None,
+                 model: Optional[PopularityModel] = None):
+        self.rules = dict(self.CATEGORY_RULES if rules is None else rules)
+        self.default = default or self.DEFAULT
+        self.model = model
+        # Aynı katlanmış anahtara sahip kurallardan ilki geçerlidir
+        self._rule_by_key: Dict[str, Rule] = {}
+        self._original_key: Dict[str, str] = {}
+        for key, val in self.rules.items():
+            self._rule_by_key.setdefault(normalize_query(key), val)
+            self._original_key.setdefault(normalize_query(key), key)
+        self._priority = {key: idx for idx, key in enumerate(self._rule_by_key)}
+        keys = [key for key in self._rule_by_key if key]
+        # Öne bakış (lookahead) her konumda eşleşmeye izin verir; örtüşen anahtarlar da bulunur
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in keys) + "))") if keys else None
+        self._match = lru_cache(maxsize=POPULARITY_MATCH_CACHE_SIZE)(self._match_uncached)
+
+    def _match_uncached(self, category: str) -> Optional[str]:
+        if self._pattern is None:
+            return None
+        best = None
+        for found in self._pattern.finditer(normalize_query(category)):
+            key = found.group(1)
+            if best is None or self._priority[key] < self._priority[best]:
+                best = key
+                if self._priority[key] == 0:
+                    break
+        return best
+
+    def match_key(self, category: str) -> Optional[str]:
+        """The rule key (as written in the rules) that applies to the category, if any."""
+        best = self._match(category or "")
+        return self._original_key[best] if best is not None else None
+
+    def suggest_hours(self, category: str, place_name: Optional[str] = None) -> Rule:
+        best = self._match(category or "")
+        rule = self._rule_by_key[best] if best is not None else self.default
+        if self.model is not None and POPULARITY_LEARNED_SUGGESTIONS:
+            ranked = self.model.rank_windows(rule, category, place_name)
+            if ranked:
+                return ranked
+        return rule
+
+    def with_overrides(self, rules: Dict[str, Rule], default: Optional[Rule] = None) -> "PopularityService":
+        """A new service whose rules take priority over this one's."""
+        merged = dict(rules)
+        for key, val in self.rules.items():
+            merged.setdefault(key, val)
+        return PopularityService(merged, default or self.default, self.model)
+
+
+class RuleSet:
+    def __init__(self, name: str, rules: Dict[str, Rule], city: Optional[str] = None, season: Optional[str] = None,
+                 default: Optional[Rule] = None):
+        self.name = name
+        self.rules = rules
+        self.city = normalize_query(city) if city else None
+        self.season = season
+        self.default = default
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        default = tuple(data["default"]) if data.get("default") else None
+        return cls(
+            name=data.get("name") or os.path.splitext(os.path.basename(path))[0],
+            rules={key: tuple(val) for key, val in data.get("rules", {}).items()},
+            city=data.get("city"),
+            season=data.get("season"),
+            default=default,
+        )
+
+    @property
+    def specificity(self) -> int:
+        return (2 if self.city else 0) + (1 if self.season else 0)
+
+
+_rule_sets: Optional[List[RuleSet]] = None
+# Aynı kural dosyası birleşimine düşen şehir/mevsim çiftleri aynı örneği paylaşır
+_services: Dict[Tuple[str, ...], PopularityService] = {}
+_services_lock = threading.Lock()
+
+
+def load_rule_sets(rules_dir: str = POPULARITY_RULES_DIR) -> List[RuleSet]:
+    rule_sets = []
+    for path in sorted(glob.glob(os.path.join(rules_dir, "*.json"))):
+        try:
+            rule_sets.append(RuleSet.from_file(path))
+        except Exception as e:
+            print(f"Error loading popularity rules from {path}: {e}")
+    return rule_sets
+
 
-    def suggest_hours(self, category: str) -> Tuple[str, str]:
-        for key, val in self.CATEGORY_RULES.items():
-            if key.lower() in (category or "").lower():
-                return val
-        return self.DEFAULT
+def get_popularity_service(city: Optional[str] = None, season: Optional[str] = None) -> PopularityService:
+    """Shared service for a city/season: matching rule files layered over the built-in rules.
 
+    A file applies when its city (if set) and season (if set) match; more specific
+    files (city + season > city > season) take priority.
+    """
+    global _rule_sets
+    if _rule_sets is None:
+        with _services_lock:
+            if _rule_sets is None:
+                _rule_sets = load_rule_sets()
+    city_key = normalize_query(city) if city else None
+    applicable = sorted(
+        (rs for rs in _rule_sets
+         if (rs.city is None or rs.city == city_key) and (rs.season is None or rs.season == season)),
+        key=lambda rs: rs.specificity,
+    )
+    key = tuple(rs.name for rs in applicable)
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                service = PopularityService(model=get_popularity_model())
+                for rule_set in applicable:
+                    service = service.with_overrides(rule_set.rules, rule_set.default)
+                _services[key] = service
+    return service
@@ -0,0 +1,165 @@
+"""Gemini prompts, structured-output schemas and response parsing in one place."""
+import json
+from typing import Any, Dict, List, Optional
+
+from config.settings import RECOMMENDATION_COUNT
+
+# Yapılandırılmış çıktı şemaları (Gemini response_schema, OpenAPI alt kümesi)
+_LOCATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "lat": {"type": "NUMBER", "nullable": True},
+        "lng": {"type": "NUMBER", "nullable": True},
+    },
+}
+
+RECOMMENDATIONS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "title": {"type": "STRING"},
+            "description": {"type": "STRING"},
+            "rating": {"type": "NUMBER"},
+            "category": {"type": "STRING"},
+            "location": _LOCATION_SCHEMA,
+        },
+        "required": ["title", "description", "rating", "category", "location"],
+    },
+}
+
+_PLACE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "name": {"type": "STRING"},
+        "latitude": {"type": "NUMBER", "nullable": True},
+        "longitude": {"type": "NUMBER", "nullable": True},
+        "description": {"type": "STRING"},
+        "category": {"type": "STRING"},
+        "rating": {"type": "NUMBER"},
+    },
+    "required": ["name", "description", "category", "rating"],
+}
+
+PLACE_DETAILS_SCHEMA = {"type": "ARRAY", "items": _PLACE_SCHEMA}
+
+# Şema desteklenmediğinde modele gösterilen kısa biçim tarifleri
+_RECOMMENDATION_SHAPE = '[{"title":str,"description":str,"rating":1-5,"category":str,"location":{"lat":num,"lng":num}}]'
+_PLACE_SHAPE = '[{"name":str,"latitude":num|null,"longitude":num|null,"description":str,"category":str,"rating":1-5}]'
+
+
+def _filter_clauses(filters: Optional[Dict[str, Any]]) -> List[str]:
+    clauses = []
+    if filters:
+        if filters.get("category") and filters["category"] != "Tümü":
+            clauses.append(f"Kategori: {filters['category']}.")
+        if filters.get("rating") and filters["rating"] > 0:
+            clauses.append(f"Minimum puan: {filters['rating']}.")
+        if filters.get("features"):
+            clauses.append(f"Özellikler: {', '.join(filters['features'])}.")
+    return clauses
+
+
+def recommendation_prompt(query: str, filters: Optional[Dict[str, Any]] = None, with_shape: bool = False) -> str:
+    parts = [f"Seyahat isteği: '{query}'."]
+    parts.extend(_filter_clauses(filters))
+    parts.append(f"{RECOMMENDATION_COUNT} gezilecek yer öner: başlık, kısa açıklama, 1-5 puan, kategori ve tahmini konum (lat/lng).")
+    if with_shape:
+        parts.append(f"Yalnızca JSON dizisi döndür: {_RECOMMENDATION_SHAPE}")
+    return " ".join(parts)
+
+
+def place_details_prompt(place_names: List[str], with_shape: bool = False) -> str:
+    names_json = json.dumps(place_names, ensure_ascii=False)
+    prompt = (f"Şu yerlerin her biri için bilgi ver: {names_json}. "
+              "name listedeki yazımla aynı olsun; konum bilinmiyorsa latitude/longitude null olsun.")
+    if with_shape:
+        prompt += f" Yalnızca JSON dizisi döndür: {_PLACE_SHAPE}"
+    return prompt
+
+
+def strip_json_fence(text: str) -> str:
+    cleaned = text.strip()
+    json_start = cleaned.find('```json')
+    json_end = cleaned.rfind('```')
+    if json_start != -1 and json_end != -1 and json_start < json_end:
+        return cleaned[json_start + len('```json'):json_end].strip()
+    return cleaned
+
+
+def load_json_array(text: str) -> List[Any]:
+    """Parses a model response that should be a JSON array; raises ValueError otherwise.
+
+    JSON mode returns bare JSON, so the fence scan only runs when the direct parse fails.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = json.loads(strip_json_fence(text))
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a JSON array, got {type(data).__name__}")
+    return data
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number == number else None  # NaN elenir
+
+
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def validate_recommendation(item: Any) -> Optional[Dict[str, Any]]:
+    """Normalized recommendation dict, or None if the item has no usable title."""
+    if not isinstance(item, dict):
+        return None
+    title = _text(item.get("title"))
+    if not title:
+        return None
+    location = item.get("location") if isinstance(item.get("location"), dict) else {}
+    lat = _number(location.get("lat", item.get("latitude")))
+    lng = _number(location.get("lng", item.get("longitude")))
+    if lat is not None and not -90 <= lat <= 90 or lng is not None and not -180 <= lng <= 180:
+        lat = lng = None
+    rating = _number(item.get("rating"))
+    return {
+        "title": title,
+        "description": _text(item.get("description")),
+        "rating": min(max(rating, 0.0), 5.0) if rating is not None else 0.0,
+        "category": _text(item.get("category")),
+        "location": {"lat": lat, "lng": lng},
+        "image_urls": item.get("image_urls") if isinstance(item.get("image_urls"), list) else [],
+    }
+
+
+def validate_place(item: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(item, dict):
+        return None
+    name = _text(item.get("name"))
+    if not name:
+        return None
+    rating = _number(item.get("rating"))
+    return {
+        "name": name,
+        "latitude": _number(item.get("latitude")),
+        "longitude": _number(item.get("longitude")),
+        "description": _text(item.get("description")),
+        "category": _text(item.get("category")),
+        "rating": min(max(rating, 0.0), 5.0) if rating is not None else 0.0,
+    }
+
+
+def parse_recommendations(text: str) -> List[Dict[str, Any]]:
+    return [rec for rec in map(validate_recommendation, load_json_array(text)) if rec]
+
+
+def parse_places(text: str) -> List[Dict[str, Any]]:
+    return [place for place in map(validate_place, load_json_array(text)) if place]
@@ -0,0 +1,180 @@
+"""Canonical recommendation cache keys and a near-duplicate index over past queries."""
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from config.settings import QUERY_FUZZY_THRESHOLD, QUERY_INDEX_MAX_ENTRIES
+from services.text_utils import normalize_query
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+# Varsayılan değerler anahtara girmez: "Tümü" kategorisi ile hiç kategori seçmemek aynı aramadır
+_DEFAULT_CATEGORIES = {"", "tumu"}
+
+
+def canonical_query(query: str) -> str:
+    """Folded query text: "İstanbul", " istanbul " and "ISTANBUL." all give "istanbul"."""
+    return normalize_query(_PUNCTUATION_RE.sub(" ", query or ""))
+
+
+def canonical_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Filters with defaults dropped and values folded; feature order and duplicates do not matter."""
+    canonical: Dict[str, Any] = {}
+    if not filters:
+        return canonical
+    category = normalize_query(str(filters.get("category") or ""))
+    if category not in _DEFAULT_CATEGORIES:
+        canonical["category"] = category
+    rating = filters.get("rating")
+    if isinstance(rating, (int, float)) and not isinstance(rating, bool) and rating > 0:
+        canonical["rating"] = rating
+    features = sorted({normalize_query(str(f)) for f in filters.get("features") or []} - {""})
+    if features:
+        canonical["features"] = features
+    # Bilinmeyen filtreler olduğu gibi korunur; farklı sonuç üretebilirler
+    for key, value in filters.items():
+        if key not in ("category", "rating", "features") and value not in (None, "", [], {}):
+            canonical[key] = value
+    return canonical
+
+
+def cache_key(query: str, filters: Optional[Dict[str, Any]] = None) -> str:
+    """Recommendation cache key in the "query_{filters json}" form kept in search_history."""
+    filters_json = json.dumps(canonical_filters(filters), sort_keys=True, ensure_ascii=False, default=str)
+    return f"{canonical_query(query)}_{filters_json}"
+
+
+def split_cache_key(key: str) -> Tuple[str, str]:
+    """(canonical query, canonical filters json) of a stored key, including keys in the older raw format."""
+    idx = key.find("_{")
+    if idx < 0:
+        return canonical_query(key), "{}"
+    try:
+        filters = json.loads(key[idx + 1:])
+    except ValueError:
+        filters = {}
+    filters_json = json.dumps(canonical_filters(filters if isinstance(filters, dict) else {}),
+                              sort_keys=True, ensure_ascii=False, default=str)
+    return canonical_query(key[:idx]), filters_json
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a: Set[str], b: Set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 1.0
+
+
+def tokens_match(a: str, b: str, threshold: float) -> bool:
+    """Same number of words and each word pair equal or trigram-similar.
+
+    Long queries score high on the whole string even when one word differs
+    completely ("sehir 0" / "sehir 1", "izmir konak" / "izmit konak"), so every word
+    must be a near duplicate on its own.
+    """
+    words_a, words_b = a.split(), b.split()
+    return len(words_a) == len(words_b) and all(
+        x == y or dice(trigrams(x), trigrams(y)) >= threshold for x, y in zip(words_a, words_b))
+
+
+class NearDuplicateIndex:
+    """Character-trigram index of cached query keys for serving close matches.
+
+    Only keys with the same canonical filters are compared; the query texts are
+    scored with the Dice coefficient of their trigram sets, and every word must
+    be a near duplicate of its counterpart (see tokens_match). Keys in the older raw
+    format are folded on insert, so entries cached before canonicalization stay
+    reachable. Holds at most `max_entries` keys, dropping the least recently used.
+    """
+
+    def __init__(self, keys: Iterable[str] = (), threshold: float = QUERY_FUZZY_THRESHOLD,
+                 max_entries: int = QUERY_INDEX_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, Set[str]]]" = OrderedDict()
+        self._postings: Dict[Tuple[str, str], Set[str]] = {}  # (filtre json, trigram) -> sorgular
+        self._lock = threading.Lock()
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str) -> None:
+        query, filters_json = split_cache_key(key)
+        if not query:
+            return
+        entry_key = (filters_json, query)
+        with self._lock:
+            if entry_key in self._entries:
+                # Aynı kanonik biçime düşen eski anahtar, kanonik anahtarın yerini almaz
+                stored_key, grams = self._entries[entry_key]
+                if key == f"{query}_{filters_json}" or stored_key != f"{query}_{filters_json}":
+                    self._entries[entry_key] = (key, grams)
+                self._entries.move_to_end(entry_key)
+                return
+            grams = trigrams(query)
+            self._entries[entry_key] = (key, grams)
+            for gram in grams:
+                self._postings.setdefault((filters_json, gram), set()).add(query)
+            while len(self._entries) > self.max_entries:
+                (old_filters, old_query), (_, old_grams) = self._entries.popitem(last=False)
+                for gram in old_grams:
+                    queries = self._postings.get((old_filters, gram))
+                    if queries is not None:
+                        queries.discard(old_query)
+                        if not queries:
+                            del self._postings[(old_filters, gram)]
+
+    def discard(self, key: str) -> None:
+        query, filters_json = split_cache_key(key)
+        with self._lock:
+            entry = self._entries.pop((filters_json, query), None)
+            if entry is None:
+                return
+            for gram in entry[1]:
+                queries = self._postings.get((filters_json, gram))
+                if queries is not None:
+                    queries.discard(query)
+                    if not queries:
+                        del self._postings[(filters_json, gram)]
+
+    def closest(self, key: str) -> Optional[str]:
+        """The stored key most similar to `key` above the threshold (an exact fold scores 1.0), or None."""
+        query, filters_json = split_cache_key(key)
+        if not query:
+            return None
+        grams = trigrams(query)
+        with self._lock:
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for candidate in self._postings.get((filters_json, gram), ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            best, best_score = None, self.threshold
+            for candidate, count in shared.items():
+                stored_key, candidate_grams = self._entries[(filters_json, candidate)]
+                score = 2 * count / (len(grams) + len(candidate_grams))
+                if score >= best_score and stored_key != key and tokens_match(query, candidate, self.threshold):
+                    best, best_score = candidate, score
+            if best is None:
+                return None
+            self._entries.move_to_end((filters_json, best))
+            return self._entries[(filters_json, best)][0]
+
+
+_shared_index: Optional[NearDuplicateIndex] = None
+_shared_index_lock = threading.Lock()
+
+
+def get_query_index(db_manager) -> NearDuplicateIndex:
+    """Process-wide index, seeded once with the most recently used keys of the result cache."""
+    global _shared_index
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                _shared_index = NearDuplicateIndex(db_manager.get_recommendation_cache_keys(QUERY_INDEX_MAX_ENTRIES))
+    return _shared_index
@@ -1,110 +1,262 @@
-from typing import List, Dict, Any, Optional
-from services.gemini_service import GeminiService, RecommendationResult, PlaceDetails
-from services.maps_service import MapsService, Coordinates, RouteInfo, Place
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from services.gemini_service import AIRecommendationService, RecommendationResult, PlaceDetails
+from services.ai_providers import create_ai_service
+from services.maps_service import MapsService, RouteInfo
+from services.metrics import stage_timer
+from services.memory_cache import MISSING, get_memory_cache
+from services.single_flight import SingleFlight
+from services.route_optimizer import RouteOptimizer
+from services import query_cache
+from services.text_utils import normalize_query
 from database.database_manager import DatabaseManager
+from config.settings import ENRICHMENT_MAX_WORKERS, ENRICHMENT_CALL_TIMEOUT_SECONDS
+from config.settings import MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES, MEMORY_CACHE_TTL_SECONDS, PLACE_DETAILS_NEGATIVE_TTL_SECONDS
+from config.settings import SINGLE_FLIGHT_WAIT_SECONDS, ROUTE_OPTIMIZER_TIME_BUDGET_SECONDS, GEMINI_STREAMING
+from config.settings import QUERY_FUZZY_MATCHING
 # from services.email_service import EmailService # Kaldırıldı
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import json
+import threading
+import time
+
+# Maps çağrıları için tüm motorlar tarafından paylaşılan sınırlı iş parçacığı havuzu
+_ENRICHMENT_POOL = ThreadPoolExecutor(max_workers=ENRICHMENT_MAX_WORKERS, thread_name_prefix="enrichment")
+
+# Aynı önbellek anahtarı için eşzamanlı Gemini + Maps işlemlerini tek çağrıda birleştirir
+recommendation_flights = SingleFlight()
 
 class RecommendationEngine:
-    def __init__(self):
-        self.gemini_service = GeminiService()
-        self.maps_service = MapsService()
-        self.db_manager = DatabaseManager()
+    def __init__(self, gemini_service: Optional[AIRecommendationService] = None, maps_service: Optional[MapsService] = None,
+                 db_manager: Optional[DatabaseManager] = None):
+        # Sağlayıcı AI_PROVIDER ayarıyla seçilir (services/ai_providers.py); testler kendi servislerini verebilir
+        self.gemini_service = gemini_service or create_ai_service()
+        self.db_manager = db_manager or DatabaseManager()
+        self.maps_service = maps_service or MapsService(db_manager=self.db_manager)
+        self._local = threading.local()
+        # Tüm oturumlar tarafından paylaşılan bellek katmanı; anahtarlar SQLite önbellekleriyle aynıdır
+        self.recommendation_memory = get_memory_cache("recommendations", MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES, MEMORY_CACHE_TTL_SECONDS)
+        self.place_memory = get_memory_cache("place_details", MEMORY_CACHE_MAX_ENTRIES, MEMORY_CACHE_MAX_BYTES, MEMORY_CACHE_TTL_SECONDS)
+        # Haversine ile bulunan sıra, önbellekli Distance Matrix süreleriyle iyileştirilir
+        self.route_optimizer = RouteOptimizer(self.maps_service.get_travel_time_matrix, ROUTE_OPTIMIZER_TIME_BUDGET_SECONDS)
+        # Tam eşleşme olmayan sorgular için benzer geçmiş sorguların dizini (kapalıysa None)
+        self.query_index = query_cache.get_query_index(self.db_manager) if QUERY_FUZZY_MATCHING else None
         # self.email_service = EmailService() # Yeni servis
 
+    @property
+    def last_timings(self) -> Dict[str, float]:
+        """Stage durations (seconds) of the last recommendation request on the calling thread."""
+        return getattr(self._local, "timings", {})
+
+    @staticmethod
+    def _has_location(rec: RecommendationResult) -> bool:
+        return bool(rec.location and rec.location.get("lat") and rec.location.get("lng"))
+
+    def _submit_enrichment(self, rec: RecommendationResult):
+        """Submits the Maps lookups for one recommendation and returns (coords_future, photos_future)."""
+        coords_future = None
+        if not self._has_location(rec):
+            coords_future = _ENRICHMENT_POOL.submit(self.maps_service.get_place_coordinates, rec.title)
+        photos_future = _ENRICHMENT_POOL.submit(self.maps_service.get_place_photos, rec.title)
+        return coords_future, photos_future
+
+    @staticmethod
+    def _future_result(future, deadline: float, default, label: str):
+        if future is None:
+            return default
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            print(f"WARNING: {label} timed out after {ENRICHMENT_CALL_TIMEOUT_SECONDS}s, continuing without it.")
+            return default
+        except Exception as e:
+            print(f"Error during {label}: {e}")
+            return default
+
+    @staticmethod
+    def _enrichment_done(futures) -> bool:
+        return all(future is None or future.done() for future in futures)
+
+    def _apply_enrichment(self, rec: RecommendationResult, futures, deadline: float) -> None:
+        coords_future, photos_future = futures
+        coords = self._future_result(coords_future, deadline, None, f"geocoding for '{rec.title}'")
+        if coords:
+            rec.location = {"lat": coords.latitude, "lng": coords.longitude}
+        rec.image_urls = self._future_result(photos_future, deadline, [], f"photo lookup for '{rec.title}'") or []
+
+    @staticmethod
+    def _estimate_size(payload: Any) -> int:
+        return len(json.dumps(payload, ensure_ascii=False, default=str))
+
     def get_travel_recommendations(self, query: str, user_session_id: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> List[RecommendationResult]:
-        # Construct a unique cache key based on query and filters
-        cache_key = f"{query}_{json.dumps(filters, sort_keys=True)}"
-        # 1. Cache Kontrolü
+        return list(self.iter_travel_recommendations(query, user_session_id, filters))
+
+    def iter_travel_recommendations(self, query: str, user_session_id: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> Iterator[RecommendationResult]:
+        """Yields each recommendation as soon as it is parsed and enriched, in Gemini's order.
+
+        Results are written to the caches only after the last one has been yielded,
+        so a consumer that stops early does not cache a partial result set.
+        """
+        # Kanonik anahtar: büyük/küçük harf, Türkçe karakterler, boşluklar ve filtre sırası/varsayılanları fark etmez
+        cache_key = query_cache.cache_key(query, filters)
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        self._local.timings = timings
+        # 1. Cache Kontrolü (önce bellek, sonra SQLite; bulunamazsa benzer geçmiş sorgu)
+        with stage_timer.measure("cache_lookup", timings):
+            cached = self._cached_recommendations(cache_key)
+            if cached is None and self.query_index is not None:
+                similar_key = self.query_index.closest(cache_key)
+                if similar_key is not None:
+                    cached = self._cached_recommendations(similar_key)
+                    if cached is None:
+                        # Süresi dolmuş ya da silinmiş giriş dizinden de çıkarılır
+                        self.query_index.discard(similar_key)
+                    else:
+                        print(f"Near-duplicate cache hit for query: {cache_key} -> {similar_key}")
+        if cached is not None:
+            yield from cached
+            return
+
+        # 2. Aynı anahtar için süren bir üretim varsa onun sonucunu bekle
+        call, is_leader = recommendation_flights.begin(cache_key)
+        if not is_leader:
+            print(f"Waiting for in-flight request for query: {cache_key}")
+            with stage_timer.measure("coalesced_wait", timings):
+                succeeded, shared_results = call.wait(SINGLE_FLIGHT_WAIT_SECONDS)
+            if succeeded:
+                yield from shared_results
+                return
+            # Lider başarısız oldu ya da çok yavaş; bu istek kendi sonucunu üretir
+            yield from self._generate_recommendations(cache_key, query, filters, user_session_id, timings, started)
+            return
+
+        produced: List[RecommendationResult] = []
+        try:
+            # Lider olmadan hemen önce biten bir üretim belleğe yazmış olabilir
+            memory_hit = self.recommendation_memory.get(cache_key)
+            if memory_hit is not MISSING and memory_hit:
+                self.db_manager.record_memory_hit(cache_key)
+                source = memory_hit
+            else:
+                source = self._generate_recommendations(cache_key, query, filters, user_session_id, timings, started)
+            for rec in source:
+                produced.append(rec)
+                yield rec
+            recommendation_flights.finish(cache_key, call, result=tuple(produced))
+        finally:
+            # Hata ya da tüketicinin erken bırakması: bekleyenler kendi üretimlerine geçer
+            recommendation_flights.finish(cache_key, call, succeeded=False)
+
+    def _cached_recommendations(self, cache_key: str) -> Optional[Tuple[RecommendationResult, ...]]:
+        memory_hit = self.recommendation_memory.get(cache_key)
+        if memory_hit is not MISSING and memory_hit:
+            print(f"Memory cache hit for query: {cache_key}")
+            self.db_manager.record_memory_hit(cache_key)
+            return memory_hit
         cached_results = self.db_manager.get_cached_results(cache_key)
-        if cached_results:
-            print(f"Cache hit for query: {cache_key}")
-            # Convert raw JSON back to RecommendationResult objects
-            recs = []
-            for item in cached_results.get("recommendations", []):
-                recs.append(RecommendationResult(
-                    title=item["title"],
-                    description=item["description"],
-                    rating=item["rating"],
-                    category=item["category"],
-                    location=item.get("location", {})
-                ))
-            return recs
+        if not cached_results or not cached_results.get("recommendations"):
+            return None
+        print(f"Cache hit for query: {cache_key}")
+        # Convert raw JSON back to RecommendationResult objects
+        recs = tuple(RecommendationResult(
+            title=item["title"],
+            description=item["description"],
+            rating=item["rating"],
+            category=item["category"],
+            location=item.get("location", {}),
+            image_urls=item.get("image_urls")
+        ) for item in cached_results.get("recommendations", []))
+        self.recommendation_memory.set(cache_key, recs, size_bytes=self._estimate_size(cached_results))
+        return recs
 
+    def _generate_recommendations(self, cache_key: str, query: str, filters: Optional[Dict[str, Any]], user_session_id: Optional[str],
+                                  timings: Dict[str, float], started: float) -> Iterator[RecommendationResult]:
         print(f"Cache miss for query: {cache_key}. Generating new recommendations.")
-        # 2. AI İşleme (Gemini API)
-        # Dynamically build the prompt with filters
-        prompt_with_filters = f"Bir kullanıcı şu anda bir seyahat önerisi arıyor: '{query}'."
-        if filters:
-            if filters.get("category") and filters["category"] != "Tümü":
-                prompt_with_filters += f" Kategori: {filters['category']}."
-            if filters.get("rating") and filters["rating"] > 0:
-                prompt_with_filters += f" Minimum puan: {filters['rating']}."
-            if filters.get("features"): # Assuming features is a list of strings
-                prompt_with_filters += f" Ek özellikler: {', '.join(filters['features'])}."
-            # Distance filter can be used for maps_service later, not directly for Gemini prompt for now.
-        
-        prompt_with_filters += f" Lütfen bu sorguya göre 3 adet seyahat yeri önerisi yapın."
-        prompt_with_filters += f" Her öneri için bir başlık (title), kısa bir açıklama (description), 1 ile 5 arasında bir puan (rating), bir kategori (category) ve tahmini enlem (latitude) ve boylam (longitude) içeren bir konum (location) bilgisi sağlayın."
-        example_json = [{
-            "title": "Yer Adı", 
-            "description": "Kısa Açıklama", 
-            "rating": 4.5, 
-            "category": "Kategori", 
-            "location": {"lat": 12.34, "lng": 56.78}
-        }]
-        example_json_str = json.dumps(example_json, ensure_ascii=False)
-
-        prompt_with_filters += f" JSON formatında bir liste olarak çıktı verin."
-        prompt_with_filters += f" Örnek JSON formatı: {example_json_str}"
-
-        recommendations = self.gemini_service.generate_recommendations(prompt_with_filters)
-        
-        results_to_cache = []
-        for rec in recommendations:
-            print(f"DEBUG: Recommendation from Gemini - Title: '{rec.title}', Initial Location: {rec.location}") # DEBUG
-
-            # 3. Lokasyon İşleme (Google Maps API) - Koordinatları Al
-            coords = None # Koordinatları varsayılan olarak None olarak ayarla
-            if not rec.location.get("lat") or not rec.location.get("lng"):
-                coords = self.maps_service.get_place_coordinates(rec.title)
-                if coords:
-                    rec.location = {"lat": coords.latitude, "lng": coords.longitude}
-            else:
-                # Gemini'den konum geliyorsa, direkt olarak kullan
-                coords = Coordinates(latitude=rec.location["lat"], longitude=rec.location["lng"])
-            
-            print(f"DEBUG: Processing recommendation '{rec.title}'. Final Location: {rec.location}") # DEBUG
+        # AI İşleme (Gemini API) - istem tek yerde, prompt_builder içinde kurulur. Akış kipinde her öneri
+        # JSON nesnesi tamamlanır tamamlanmaz Maps zenginleştirmesi başlar; model sonrakileri üretirken
+        # zenginleştirmesi biten öneriler sırayla iletilir
+        gemini_started = time.perf_counter()
+        if GEMINI_STREAMING:
+            stream = self.gemini_service.stream_recommendations(query, filters)
+        else:
+            stream = iter(self.gemini_service.generate_recommendations(query, filters))
+        recommendations: List[RecommendationResult] = []
+        pending = deque()
+        enrichment_started = None
 
-            # 3.5 Görsel İşleme (Google Places API) - Fotoğraf URL'lerini Al
-            image_urls = self.maps_service.get_place_photos(rec.title)
-            print(f"DEBUG: Retrieved {len(image_urls)} image URLs for '{rec.title}'.") # DEBUG
+        def deliver(rec, futures, deadline) -> RecommendationResult:
+            self._apply_enrichment(rec, futures, deadline)
+            if "first_result" not in timings:
+                timings["first_result"] = time.perf_counter() - started
+                stage_timer.record("first_result", timings["first_result"])
+            return rec
 
-            # Her durumda yer detaylarını places_cache'e kaydet (veya güncelle)
-            self.db_manager.save_place_to_cache(
-                place_name=rec.title,
-                latitude=rec.location.get("lat"), # None olabilir
-                longitude=rec.location.get("lng"), # None olabilir
-                description=rec.description,
-                category=rec.category,
-                rating=rec.rating,
-                image_urls=image_urls # Yeni eklendi
-            )
-            print(f"DEBUG: Attempted to save '{rec.title}' to cache with location: {rec.location.get('lat')}, {rec.location.get('lng')}, images: {len(image_urls) if image_urls else 0}") # DEBUG
+        complete = True
+        try:
+            for rec in stream:
+                if enrichment_started is None:
+                    enrichment_started = time.perf_counter()
+                recommendations.append(rec)
+                pending.append((rec, self._submit_enrichment(rec), time.monotonic() + ENRICHMENT_CALL_TIMEOUT_SECONDS))
+                while pending and self._enrichment_done(pending[0][1]):
+                    yield deliver(*pending.popleft())
+        except Exception as e:
+            # Akış yarıda kesildi: gelen öneriler gösterilir ama eksik sonuç önbelleğe yazılmaz
+            print(f"Error receiving recommendations for '{cache_key}': {e}")
+            complete = False
+        timings["gemini"] = time.perf_counter() - gemini_started
+        stage_timer.record("gemini", timings["gemini"])
 
-            results_to_cache.append(rec.__dict__)
+        while pending:
+            yield deliver(*pending.popleft())
+        if enrichment_started is not None:
+            timings["enrichment"] = time.perf_counter() - enrichment_started
+            stage_timer.record("enrichment", timings["enrichment"])
 
-        # 4. Veri Kaydetme (arama geçmişi için)
-        self.db_manager.save_search_result(cache_key, {"recommendations": results_to_cache}, user_session_id)
-        
-        return recommendations
+        # Boş ya da yarım sonuç (ör. geçici bir Gemini hatası) önbelleğe yazılmaz; aynı sorgu bir sonraki istekte yeniden denenir
+        cacheable = complete and bool(recommendations)
+        if not cacheable:
+            print(f"No complete recommendations for query: {cache_key}. Result not cached.")
+
+        # Her durumda yer detaylarını places_cache'e kaydet (veya güncelle) - tek transaction
+        results_to_cache = [rec.__dict__ for rec in recommendations]
+        with stage_timer.measure("db_write", timings):
+            try:
+                with self.db_manager.transaction():
+                    self.db_manager.save_places_to_cache([{
+                        "place_name": rec.title,
+                        "latitude": rec.location.get("lat"), # None olabilir
+                        "longitude": rec.location.get("lng"), # None olabilir
+                        "description": rec.description,
+                        "category": rec.category,
+                        "rating": rec.rating,
+                        "image_urls": rec.image_urls
+                    } for rec in recommendations])
+
+                    # Veri Kaydetme (arama geçmişi için)
+                    if cacheable:
+                        self.db_manager.save_search_result(cache_key, {"recommendations": results_to_cache}, user_session_id)
+            except Exception as e:
+                print(f"Error saving recommendations for '{cache_key}': {e}")
+        if cacheable:
+            self.recommendation_memory.set(cache_key, tuple(recommendations), size_bytes=self._estimate_size(results_to_cache))
+            if self.query_index is not None:
+                self.query_index.add(cache_key)
+        for rec in recommendations:
+            self.place_memory.invalidate(rec.title)
+        timings["total"] = time.perf_counter() - started
+        stage_timer.record("total", timings["total"])
 
     def get_place_details(self, place_name: str) -> Optional[PlaceDetails]:
-        # 1. Cache Kontrolü
+        # 1. Cache Kontrolü (önce bellek, sonra SQLite). Bellekteki None, kısa süre önce çözülemeyen bir addır
+        details = self.place_memory.get(place_name)
+        if details is not MISSING:
+            return details
         cached_details = self.db_manager.get_cached_place_details(place_name)
         if cached_details:
             print(f"Cache hit for place details: {place_name}")
-            return PlaceDetails(
+            details = PlaceDetails(
                 name=place_name,
                 latitude=cached_details["latitude"],
                 longitude=cached_details["longitude"],
@@ -112,6 +264,8 @@ class RecommendationEngine:
                 category=cached_details["category"],
                 rating=cached_details["rating"]
             )
+            self.place_memory.set(place_name, details, size_bytes=self._estimate_size(cached_details))
+            return details
         
         print(f"Cache miss for place details: {place_name}. Fetching new details.")
         # Fetch details from Gemini (or another source if available)
@@ -119,18 +273,119 @@ class RecommendationEngine:
         if details:
             # Save to cache
             self.db_manager.save_place_to_cache(
-                name=details.name,
+                place_name=details.name,
                 latitude=details.latitude,
                 longitude=details.longitude,
                 description=details.description,
                 category=details.category,
                 rating=details.rating
             )
+            self.place_memory.invalidate(details.name)
+        else:
+            self.place_memory.set(place_name, None, ttl_seconds=PLACE_DETAILS_NEGATIVE_TTL_SECONDS)
         return details
 
+    def get_places_details(self, place_names: List[str]) -> Dict[str, Optional[PlaceDetails]]:
+        """Batch get_place_details: one cache query, one Gemini prompt for all misses, one transaction.
+
+        Names Gemini could not resolve are remembered as None for
+        PLACE_DETAILS_NEGATIVE_TTL_SECONDS and left out of the next batches.
+        """
+        results: Dict[str, Optional[PlaceDetails]] = {}
+        missing_in_memory = []
+        for name in dict.fromkeys(place_names):
+            details = self.place_memory.get(name)
+            if details is not MISSING:
+                results[name] = details
+            else:
+                missing_in_memory.append(name)
+        if not missing_in_memory:
+            return results
+
+        cached = self.db_manager.get_cached_places_details(missing_in_memory)
+        misses = []
+        for name in missing_in_memory:
+            if name in cached:
+                details = PlaceDetails(
+                    name=name,
+                    latitude=cached[name]["latitude"],
+                    longitude=cached[name]["longitude"],
+                    description=cached[name]["description"],
+                    category=cached[name]["category"],
+                    rating=cached[name]["rating"]
+                )
+                self.place_memory.set(name, details, size_bytes=self._estimate_size(cached[name]))
+                results[name] = details
+            else:
+                misses.append(name)
+        if not misses:
+            return results
+
+        print(f"Cache miss for {len(misses)} places. Fetching details in one batch.")
+        fetched = self.gemini_service.get_places_details(misses)
+        # Gemini adları küçük farklarla döndürebilir; normalize edilmiş adla eşleştir
+        by_key = {normalize_query(d.name): d for d in fetched}
+        matched: Dict[str, PlaceDetails] = {}
+        for name in misses:
+            details = by_key.get(normalize_query(name))
+            if details:
+                details.name = name
+                matched[name] = details
+            else:
+                self.place_memory.set(name, None, ttl_seconds=PLACE_DETAILS_NEGATIVE_TTL_SECONDS)
+            results[name] = details
+        if matched:
+            self.db_manager.save_places_to_cache([{
+                "place_name": name,
+                "latitude": d.latitude,
+                "longitude": d.longitude,
+                "description": d.description,
+                "category": d.category,
+                "rating": d.rating
+            } for name, d in matched.items()])
+            for name in matched:
+                self.place_memory.invalidate(name)
+        return results
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float, category: Optional[str] = None,
+               min_rating: Optional[float] = None, limit: Optional[int] = None) -> List[RecommendationResult]:
+        """Cached places around a point as recommendations, nearest first; never calls Gemini."""
+        with stage_timer.measure("nearby_query"):
+            places = self.db_manager.get_places_within(latitude, longitude, radius_km, category, min_rating, limit)
+        return [RecommendationResult(
+            title=p["place_name"],
+            description=p["description"] or "",
+            rating=p["rating"],
+            category=p["category"] or "",
+            location={"lat": p["latitude"], "lng": p["longitude"]},
+            image_urls=p["image_urls"]
+        ) for p in places]
+
+    def invalidate_cached_recommendations(self, cache_key: str) -> None:
+        self.recommendation_memory.invalidate(cache_key)
+
     def plan_route(self, places: List[str]) -> Optional[RouteInfo]:
         return self.maps_service.generate_route(places)
 
+    def optimize_itinerary(self, itinerary_id: int, mode: str = "driving") -> Optional[List[str]]:
+        """Reorders an itinerary's places to shorten the route and saves the new order.
+
+        The first place stays the starting point; places without coordinates go last.
+        """
+        places = self.db_manager.get_itinerary_places(itinerary_id)
+        if len(places) < 3:
+            return [p["place_name"] for p in places]
+        points = [
+            (p["latitude"], p["longitude"]) if p.get("latitude") is not None and p.get("longitude") is not None else None
+            for p in places
+        ]
+        with stage_timer.measure("route_optimize"):
+            order = self.route_optimizer.optimize(points, mode)
+        ordered_names = [places[i]["place_name"] for i in order]
+        if not self.db_manager.reorder_itinerary_places(itinerary_id, ordered_names):
+            return None
+        return ordered_names
+
     def add_favorite(self, user_session_id: str, place_name: str) -> bool:
         return self.db_manager.add_to_favorites(user_session_id, place_name)
 
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Süreç başına bir kez oluşturulan, tüm Streamlit oturumlarının paylaştığı servisler.
+# Oturuma özel durum (user_session_id, son öneriler, ...) st.session_state içinde kalır.
+
+
+def _current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+class ResourceRegistry:
+    """Thread-safe, lazily built process-wide singletons with build-time/memory accounting.
+
+    A factory that raises ValueError (configuration errors such as missing
+    credentials) is remembered, so a misconfigured service is not rebuilt on every
+    session; each later call raises a fresh exception with the same message. Other
+    errors (e.g. a network failure during an SMTP login) are not remembered and the
+    next call tries again.
+    """
+
+    def __init__(self):
+        self._resources: Dict[str, Any] = {}
+        self._errors: Dict[str, Tuple[type, str]] = {}
+        self._build_stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            if name in self._resources:
+                return self._resources[name]
+            if name in self._errors:
+                # Aynı istisna nesnesi yeniden fırlatılırsa traceback her çağrıda uzar; yenisi oluşturulur
+                error_type, message = self._errors[name]
+                raise error_type(message)
+            rss_before = _current_rss_bytes()
+            started = time.perf_counter()
+            try:
+                resource = factory()
+            except Exception as e:
+                if isinstance(e, ValueError):
+                    self._errors[name] = (type(e), str(e))
+                self._build_stats[name] = {"build_seconds": time.perf_counter() - started, "error": str(e)}
+                raise
+            rss_after = _current_rss_bytes()
+            self._build_stats[name] = {
+                "build_seconds": time.perf_counter() - started,
+                "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            }
+            self._resources[name] = resource
+            return resource
+
+    def reset(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._resources.clear()
+                self._errors.clear()
+                self._build_stats.clear()
+            else:
+                self._resources.pop(name, None)
+                self._errors.pop(name, None)
+                self._build_stats.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resources": {name: dict(stats) for name, stats in self._build_stats.items()},
+                "cold_start_seconds": sum(stats["build_seconds"] for stats in self._build_stats.values()),
+                "rss_bytes": _current_rss_bytes(),
+            }
+
+
+registry = ResourceRegistry()
+
+
+def get_recommendation_engine():
+    from services.recommendation_engine import RecommendationEngine
+    return registry.get("recommendation_engine", RecommendationEngine)
+
+
+def get_weather_service():
+    from services.weather_service import WeatherService
+    return registry.get("weather_service", WeatherService)
+
+
+def get_email_service():
+    from services.email_service import EmailService
+    return registry.get("email_service", EmailService)
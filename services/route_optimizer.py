@@ -0,0 +1,134 @@
+import time
+from typing import Callable, List, Optional, Sequence
+
+from services.geo import LatLng, haversine_matrix
+
+# (noktalar, ulaşım modu) -> dakika cinsinden süre matrisi ya da None
+MatrixProvider = Callable[[Sequence[LatLng], str], Optional[List[List[float]]]]
+
+
+def path_cost(order: Sequence[int], matrix: List[List[float]]) -> float:
+    return sum(matrix[order[i]][order[i + 1]] for i in range(len(order) - 1))
+
+
+def nearest_neighbour(matrix: List[List[float]], start: int = 0) -> List[int]:
+    n = len(matrix)
+    unvisited = set(range(n))
+    unvisited.discard(start)
+    order = [start]
+    current = start
+    while unvisited:
+        row = matrix[current]
+        current = min(unvisited, key=row.__getitem__)
+        unvisited.remove(current)
+        order.append(current)
+    return order
+
+
+def two_opt(order: List[int], matrix: List[List[float]], deadline: float) -> List[int]:
+    """2-opt for an open path with a fixed first stop; reverses order[i..j] while it shortens the path."""
+    order = list(order)
+    n = len(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            row_a, row_b = matrix[a], matrix[b]
+            d_ab = row_a[b]
+            for j in range(i + 1, n):
+                c = order[j]
+                d = order[j + 1] if j + 1 < n else None
+                # Yolun sonundaki kenar yoksa karşılığı da 0 sayılır
+                delta = row_a[c] - d_ab
+                if d is not None:
+                    delta += row_b[d] - matrix[c][d]
+                if delta < -1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+                    break
+            if improved or time.perf_counter() >= deadline:
+                break
+    return order
+
+
+def or_opt(order: List[int], matrix: List[List[float]], deadline: float, max_segment: int = 3) -> List[int]:
+    """Moves segments of 1..max_segment stops (optionally reversed) to a cheaper position."""
+    order = list(order)
+    n = len(order)
+
+    def edge(x: Optional[int], y: Optional[int]) -> float:
+        return 0.0 if x is None or y is None else matrix[x][y]
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, n - length + 1):
+                seg = order[i:i + length]
+                prev = order[i - 1]
+                nxt = order[i + length] if i + length < n else None
+                removal_gain = edge(prev, seg[0]) + edge(seg[-1], nxt) - edge(prev, nxt)
+                rest = order[:i] + order[i + length:]
+                best_delta, best_pos, best_seg = -1e-9, None, None
+                for k in range(len(rest)):
+                    a = rest[k]
+                    b = rest[k + 1] if k + 1 < len(rest) else None
+                    if k == i - 1:
+                        continue
+                    base = edge(a, b)
+                    for candidate in (seg, seg[::-1]):
+                        delta = edge(a, candidate[0]) + edge(candidate[-1], b) - base - removal_gain
+                        if delta < best_delta:
+                            best_delta, best_pos, best_seg = delta, k, candidate
+                if best_pos is not None:
+                    order = rest[:best_pos + 1] + best_seg + rest[best_pos + 1:]
+                    improved = True
+                    break
+            if improved or time.perf_counter() >= deadline:
+                break
+    return order
+
+
+class RouteOptimizer:
+    """Orders stops to minimize total travel: nearest neighbour, then 2-opt and Or-opt.
+
+    The first pass uses haversine distances. When a matrix provider is given
+    (e.g. cached Distance Matrix travel times), the result is refined against it.
+    The first stop stays fixed; stops without coordinates keep their relative
+    order at the end.
+    """
+
+    def __init__(self, matrix_provider: Optional[MatrixProvider] = None, time_budget_seconds: float = 0.5):
+        self.matrix_provider = matrix_provider
+        self.time_budget_seconds = time_budget_seconds
+
+    def _improve(self, order: List[int], matrix: List[List[float]], deadline: float) -> List[int]:
+        while time.perf_counter() < deadline:
+            cost = path_cost(order, matrix)
+            order = or_opt(two_opt(order, matrix, deadline), matrix, deadline)
+            if path_cost(order, matrix) >= cost - 1e-9:
+                break
+        return order
+
+    def optimize(self, points: Sequence[Optional[LatLng]], mode: str = "driving") -> List[int]:
+        located = [i for i, p in enumerate(points) if p is not None]
+        unlocated = [i for i, p in enumerate(points) if p is None]
+        if len(located) < 3:
+            return located + unlocated
+
+        deadline = time.perf_counter() + self.time_budget_seconds
+        coords = [points[i] for i in located]
+        matrix = haversine_matrix(coords)
+        order = self._improve(nearest_neighbour(matrix, 0), matrix, deadline)
+
+        if self.matrix_provider is not None:
+            travel_matrix = self.matrix_provider(coords, mode)
+            if travel_matrix:
+                # 2-opt yön değiştirdiği için gidiş/dönüş süreleri ortalanır; iyileştirme ayrı bir bütçeyle çalışır
+                n = len(travel_matrix)
+                symmetric = [[(travel_matrix[i][j] + travel_matrix[j][i]) / 2 for j in range(n)] for i in range(n)]
+                refined = self._improve(order, symmetric, time.perf_counter() + self.time_budget_seconds / 2)
+                if path_cost(refined, travel_matrix) < path_cost(order, travel_matrix):
+                    order = refined
+        return [located[i] for i in order] + unlocated
@@ -0,0 +1,76 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.succeeded = False
+        self.waiters = 0
+
+    def wait(self, timeout: Optional[float] = None) -> Tuple[bool, Any]:
+        """Blocks until the leader finishes; returns (succeeded, result)."""
+        if not self.done.wait(timeout):
+            return False, None
+        return self.succeeded, self.result
+
+
+class SingleFlight:
+    """Coalesces concurrent computations that share a key.
+
+    The first caller for a key becomes the leader and must call finish(); callers
+    arriving while it runs get the same _Call and wait for its result.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    def begin(self, key: Hashable) -> Tuple[_Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._counters["leaders"] += 1
+            return call, True
+
+    def finish(self, key: Hashable, call: _Call, result: Any = None, succeeded: bool = True) -> None:
+        if call.done.is_set():
+            return
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.succeeded = succeeded
+        call.done.set()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Runs fn once for all concurrent callers with the same key.
+
+        A waiter whose leader fails or exceeds `timeout` runs fn itself.
+        """
+        call, is_leader = self.begin(key)
+        if not is_leader:
+            succeeded, result = call.wait(timeout)
+            if succeeded:
+                return result
+            return fn()
+        try:
+            result = fn()
+        except Exception:
+            self.finish(key, call, succeeded=False)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
@@ -0,0 +1,33 @@
+import re
+import unicodedata
+
+# Türkçe harflerin ASCII karşılıkları (küçük harfe çevirdikten sonra uygulanır)
+_TURKISH_ASCII = str.maketrans({
+    "ç": "c",
+    "ğ": "g",
+    "ı": "i",
+    "ö": "o",
+    "ş": "s",
+    "ü": "u",
+    "â": "a",
+    "î": "i",
+    "û": "u",
+})
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def turkish_lower(text: str) -> str:
+    """Lowercases with Turkish rules: 'İ' -> 'i' and 'I' -> 'ı'."""
+    return (text or "").replace("İ", "i").replace("I", "ı").lower()
+
+
+def normalize_query(text: str) -> str:
+    """Case-, whitespace- and diacritic-insensitive key for free-form place/city queries.
+
+    "İstanbul", " istanbul " and "ISTANBUL" all map to "istanbul".
+    """
+    folded = turkish_lower(text).translate(_TURKISH_ASCII)
+    # Kalan aksanlı harfler (é, à, ...) için genel Unicode ayrıştırması
+    folded = "".join(ch for ch in unicodedata.normalize("NFKD", folded) if not unicodedata.combining(ch))
+    return _WHITESPACE_RE.sub(" ", folded).strip()
@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config.settings import (
+    TRAVEL_TIME_GRID_DEGREES,
+    TRAVEL_TIME_CACHE_TTL_SECONDS,
+    DISTANCE_MATRIX_MAX_ORIGINS,
+    DISTANCE_MATRIX_MAX_DESTINATIONS,
+    DISTANCE_MATRIX_MAX_ELEMENTS,
+    TRAVEL_TIME_MAX_API_ELEMENTS_PER_CALL,
+    TRAVEL_TIME_API_COOLDOWN_SECONDS,
+    TRAVEL_TIME_DETOUR_FACTOR,
+    TRAVEL_MODE_SPEEDS_KMH,
+)
+from database.database_manager import DatabaseManager
+from services.geo import LatLng, haversine_km
+
+Cell = Tuple[float, float]
+TRAVEL_MODES = ("driving", "walking", "transit", "bicycling")
+
+
+def hour_of_week(moment: datetime) -> int:
+    """0 = Monday 00:00 ... 167 = Sunday 23:00."""
+    return moment.weekday() * 24 + moment.hour
+
+
+def estimate_minutes(origin: LatLng, destination: LatLng, mode: str = "driving") -> float:
+    """Offline estimate: great-circle distance with a detour factor at the mode's average speed."""
+    speed = TRAVEL_MODE_SPEEDS_KMH.get(mode, TRAVEL_MODE_SPEEDS_KMH["driving"])
+    distance = haversine_km(origin[0], origin[1], destination[0], destination[1]) * TRAVEL_TIME_DETOUR_FACTOR
+    return distance / speed * 60
+
+
+class TravelTimeMatrix:
+    """Pairwise travel times (minutes) from the Distance Matrix API.
+
+    Results are cached in SQLite per (origin cell, destination cell, mode,
+    hour-of-week). Uncached pairs are requested in blocks that respect the API
+    limits; when the API is unavailable, over quota, or the per-call element
+    budget is spent, a haversine-based estimate is used instead (not cached).
+    """
+
+    def __init__(self, client: Any = None, db_manager: Optional[DatabaseManager] = None,
+                 grid_degrees: float = TRAVEL_TIME_GRID_DEGREES, ttl_seconds: int = TRAVEL_TIME_CACHE_TTL_SECONDS):
+        self.client = client
+        self.db_manager = db_manager or DatabaseManager()
+        self.grid_degrees = grid_degrees
+        self.ttl_seconds = ttl_seconds
+        self._api_disabled_until = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"cache_hits": 0, "api_requests": 0, "api_elements": 0, "estimates": 0, "api_errors": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def cell_for(self, point: LatLng) -> Cell:
+        grid = self.grid_degrees
+        return (round(round(point[0] / grid) * grid, 4), round(round(point[1] / grid) * grid, 4))
+
+    def _api_available(self) -> bool:
+        return self.client is not None and time.monotonic() >= self._api_disabled_until
+
+    @staticmethod
+    def _blocks(origins: List[Cell], destinations: List[Cell]):
+        """Splits origins x destinations into blocks within the per-request limits."""
+        dest_size = min(DISTANCE_MATRIX_MAX_DESTINATIONS, DISTANCE_MATRIX_MAX_ELEMENTS, len(destinations))
+        origin_size = max(1, min(DISTANCE_MATRIX_MAX_ORIGINS, DISTANCE_MATRIX_MAX_ELEMENTS // dest_size))
+        for o in range(0, len(origins), origin_size):
+            for d in range(0, len(destinations), dest_size):
+                yield origins[o:o + origin_size], destinations[d:d + dest_size]
+
+    def _fetch(self, missing: List[Tuple[Cell, Cell]], representative: Dict[Cell, LatLng], mode: str,
+               departure: datetime) -> Dict[Tuple[Cell, Cell], float]:
+        fetched: Dict[Tuple[Cell, Cell], float] = {}
+        wanted = set(missing)
+        origins = sorted({o for o, _ in missing})
+        destinations = sorted({d for _, d in missing})
+        budget = TRAVEL_TIME_MAX_API_ELEMENTS_PER_CALL
+        params: Dict[str, Any] = {"mode": mode}
+        if mode in ("driving", "transit"):
+            # Trafik / sefer saatlerine göre süre; geçmiş zamanlar API tarafından reddedilir
+            params["departure_time"] = max(departure, datetime.now())
+
+        for block_origins, block_destinations in self._blocks(origins, destinations):
+            if not any((o, d) in wanted for o in block_origins for d in block_destinations):
+                continue
+            elements = len(block_origins) * len(block_destinations)
+            if elements > budget or not self._api_available():
+                break
+            try:
+                response = self.client.distance_matrix(
+                    origins=[representative[o] for o in block_origins],
+                    destinations=[representative[d] for d in block_destinations],
+                    **params
+                )
+            except Exception as e:
+                # Kota aşımı veya bağlantı hatası: bir süre yalnızca tahmin kullanılır
+                print(f"Error getting distance matrix: {e}")
+                self._count("api_errors")
+                self._api_disabled_until = time.monotonic() + TRAVEL_TIME_API_COOLDOWN_SECONDS
+                break
+            budget -= elements
+            self._count("api_requests")
+            self._count("api_elements", elements)
+            for o, row in zip(block_origins, response.get("rows", [])):
+                for d, element in zip(block_destinations, row.get("elements", [])):
+                    if (o, d) not in wanted or element.get("status") != "OK":
+                        continue
+                    duration = element.get("duration_in_traffic") or element.get("duration")
+                    if duration:
+                        fetched[(o, d)] = duration["value"] / 60
+        return fetched
+
+    def matrix(self, points: Sequence[LatLng], mode: str = "driving", departure: Optional[datetime] = None) -> List[List[float]]:
+        """Travel-time matrix in minutes between all points; the diagonal is 0."""
+        if mode not in TRAVEL_MODES:
+            mode = "driving"
+        departure = departure or datetime.now()
+        how = hour_of_week(departure)
+        cells = [self.cell_for(p) for p in points]
+        representative: Dict[Cell, LatLng] = {}
+        for cell, point in zip(cells, points):
+            representative.setdefault(cell, tuple(point))
+
+        pairs = sorted({(o, d) for o in representative for d in representative if o != d})
+        times = self.db_manager.get_cached_travel_times(mode, how, pairs, self.ttl_seconds)
+        self._count("cache_hits", len(times))
+        missing = [pair for pair in pairs if pair not in times]
+        if missing and self._api_available():
+            fetched = self._fetch(missing, representative, mode, departure)
+            if fetched:
+                self.db_manager.save_travel_times(mode, how, [(o, d, minutes) for (o, d), minutes in fetched.items()])
+                times.update(fetched)
+
+        n = len(points)
+        result = [[0.0] * n for _ in range(n)]
+        estimates = 0
+        for i in range(n):
+            for j in range(n):
+                if i == j:
+                    continue
+                minutes = times.get((cells[i], cells[j]))
+                if minutes is None:
+                    # Aynı hücredeki noktalar ve API'den alınamayan çiftler için tahmin
+                    minutes = estimate_minutes(points[i], points[j], mode)
+                    estimates += 1
+                result[i][j] = minutes
+        if estimates:
+            self._count("estimates", estimates)
+        return result
+
+    def minutes_between(self, origin: LatLng, destination: LatLng, mode: str = "driving",
+                        departure: Optional[datetime] = None) -> float:
+        return self.matrix([origin, destination], mode, departure)[0][1]
@@ -0,0 +1,226 @@
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.daily_forecast import DailyForecast
+from services.popularity_service import PopularityService
+from services.text_utils import turkish_lower
+
+# Kategori türleri: açık hava yerleri kuru günlere, kapalı yerler yağışlı günlere yerleştirilir
+OUTDOOR_CATEGORIES = ["Park", "Plaj", "Doğa"]
+INDOOR_CATEGORIES = ["Müze", "Alışveriş"]
+
+OUTDOOR = "outdoor"
+INDOOR = "indoor"
+FLEXIBLE = "flexible"
+
+# Ziyaretlerin planlanabileceği saat aralığı ve bir ziyaretin varsayılan süresi
+DAY_START_HOUR = 8
+DAY_END_HOUR = 21
+DEFAULT_VISIT_HOURS = 2
+
+
+class ScheduledVisit:
+    def __init__(self, place_name: str, category: str, day: str, start_hour: int, end_hour: int, kind: str, rainy_day: bool):
+        self.place_name = place_name
+        self.category = category
+        self.day = day
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.kind = kind
+        self.rainy_day = rainy_day
+
+    @property
+    def time_window(self) -> str:
+        return f"{self.start_hour:02d}:00-{self.end_hour:02d}:00"
+
+
+class TripSchedule:
+    def __init__(self, days: List[str], visits: List[ScheduledVisit], unscheduled: List[str]):
+        self.days = days
+        self.visits = visits
+        self.unscheduled = unscheduled
+
+    def by_day(self) -> Dict[str, List[ScheduledVisit]]:
+        plan: Dict[str, List[ScheduledVisit]] = {day: [] for day in self.days}
+        for visit in self.visits:
+            plan[visit.day].append(visit)
+        for visits in plan.values():
+            visits.sort(key=lambda v: v.start_hour)
+        return plan
+
+    @property
+    def weather_conflicts(self) -> int:
+        """Outdoor visits that had to go on a rainy day."""
+        return sum(1 for v in self.visits if v.kind == OUTDOOR and v.rainy_day)
+
+
+def _parse_window(window: str) -> Tuple[int, int]:
+    start, end = window.split("-")
+    return int(start.split(":")[0]), int(end.split(":")[0])
+
+
+class _DayState:
+    def __init__(self, day: str, rainy: bool, score: float):
+        self.day = day
+        self.rainy = rainy
+        self.score = score
+        self.busy = [False] * 24
+        self.load = 0
+        self.visits: List[ScheduledVisit] = []
+        # Bu süre (saat) ve üzeri için artık boş aralık yok; dolu günler tekrar taranmaz
+        self.no_slot_for = DAY_END_HOUR - DAY_START_HOUR + 1
+
+    def free_slot(self, preferred: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        duration = preferred[0][1] - preferred[0][0] if preferred else DEFAULT_VISIT_HOURS
+        if duration >= self.no_slot_for:
+            return None
+        # Önce kategorinin önerilen saatleri, sonra bir ziyarete ya da gün sınırına bitişik en erken boş aralık;
+        # bitişik yerleşim boş saatleri bölmez, günün kalanına sonraki ziyaretler sığar
+        for start, end in preferred:
+            if self.is_free(start, end):
+                return start, end
+        loose = None
+        for start in range(DAY_START_HOUR, DAY_END_HOUR - duration + 1):
+            end = start + duration
+            if self.is_free(start, end):
+                if start == DAY_START_HOUR or end == DAY_END_HOUR or self.busy[start - 1] or self.busy[end]:
+                    return start, end
+                if loose is None:
+                    loose = (start, end)
+        if loose:
+            return loose
+        self.no_slot_for = duration
+        return None
+
+    def is_free(self, start: int, end: int) -> bool:
+        return start >= DAY_START_HOUR and end <= DAY_END_HOUR and not any(self.busy[start:end])
+
+    def book(self, visit: ScheduledVisit) -> None:
+        for hour in range(visit.start_hour, visit.end_hour):
+            self.busy[hour] = True
+        self.load += 1
+        self.visits.append(visit)
+
+    @property
+    def free_hours(self) -> int:
+        return DAY_END_HOUR - DAY_START_HOUR - sum(self.busy[DAY_START_HOUR:DAY_END_HOUR])
+
+    def compact(self) -> None:
+        """Shifts the day's visits, in order, to back-to-back slots from DAY_START_HOUR."""
+        self.visits.sort(key=lambda v: v.start_hour)
+        hour = DAY_START_HOUR
+        moved = False
+        for visit in self.visits:
+            duration = visit.end_hour - visit.start_hour
+            if visit.start_hour != hour:
+                visit.start_hour, visit.end_hour = hour, hour + duration
+                moved = True
+            hour += duration
+        if moved:
+            self.busy = [DAY_START_HOUR <= h < hour for h in range(24)]
+            self.no_slot_for = DAY_END_HOUR - DAY_START_HOUR + 1
+
+
+class TripScheduler:
+    """Greedy weather-aware assignment of itinerary places to trip days and hours.
+
+    Outdoor places are placed first on the driest days, indoor places prefer rainy
+    days, and the rest fill the least loaded days. Each visit takes the category's
+    suggested window (PopularityService), its alternative, or the earliest free slot
+    next to another visit. Places left over are backfilled by packing a day's
+    visits back to back, giving up their suggested hours so the gaps between them
+    can hold one more visit. Runs in O(places * days), fast enough for long trips
+    with hundreds of stops.
+    """
+
+    def __init__(self, popularity_service: Optional[PopularityService] = None):
+        self.popularity_service = popularity_service or PopularityService()
+
+    @staticmethod
+    def classify(category: str) -> str:
+        lowered = turkish_lower(category)
+        if any(turkish_lower(key) in lowered for key in OUTDOOR_CATEGORIES):
+            return OUTDOOR
+        if any(turkish_lower(key) in lowered for key in INDOOR_CATEGORIES):
+            return INDOOR
+        return FLEXIBLE
+
+    def schedule(self, places: List[Dict[str, Any]], start_date: date, end_date: date,
+                 forecast: Optional[DailyForecast] = None) -> TripSchedule:
+        days = [(start_date + timedelta(days=i)).isoformat() for i in range((end_date - start_date).days + 1)]
+        rainy_by_day: Dict[str, bool] = {}
+        score_by_day: Dict[str, float] = {}
+        if forecast:
+            for day, rainy, score in zip(forecast.dates, forecast.rain_mask(), forecast.visit_scores()):
+                rainy_by_day[day] = rainy
+                score_by_day[day] = score
+        states = [_DayState(day, rainy_by_day.get(day, False), score_by_day.get(day, 50.0)) for day in days]
+
+        # Hava durumuna göre gün tercih sıraları bir kez hesaplanır
+        dry_first = sorted(states, key=lambda s: (s.rainy, -s.score))
+        wet_first = sorted(states, key=lambda s: (not s.rainy, s.score))
+        soft_cap = math.ceil(len(places) / len(states)) if states else 0
+
+        windows_cache: Dict[str, List[Tuple[int, int]]] = {}
+        order = {OUTDOOR: 0, INDOOR: 1, FLEXIBLE: 2}
+        prepared = []
+        for place in places:
+            category = place.get("category") or ""
+            kind = self.classify(category)
+            if category not in windows_cache:
+                windows_cache[category] = [_parse_window(w) for w in self.popularity_service.suggest_hours(category)]
+            prepared.append((order[kind], kind, category, place))
+        prepared.sort(key=lambda item: item[0])
+
+        visits: List[ScheduledVisit] = []
+        leftover = []
+        for item in prepared:
+            placed = self._place(item, self._candidates(item[1], states, dry_first, wet_first), windows_cache[item[2]], soft_cap)
+            if placed:
+                visits.append(placed)
+            else:
+                leftover.append(item)
+
+        # Yerleşemeyenler için toplam boş süresi yeten günler sıkıştırılır; ziyaretler arasındaki boşluklar birleşir
+        unscheduled: List[str] = []
+        for item in leftover:
+            windows = windows_cache[item[2]]
+            duration = windows[0][1] - windows[0][0] if windows else DEFAULT_VISIT_HOURS
+            placed = None
+            for state in self._candidates(item[1], states, dry_first, wet_first):
+                if state.free_hours >= duration:
+                    state.compact()
+                    placed = self._place(item, [state], windows, soft_cap=0)
+                    if placed:
+                        break
+            if placed:
+                visits.append(placed)
+            else:
+                unscheduled.append(item[3].get("place_name", ""))
+        return TripSchedule(days, visits, unscheduled)
+
+    @staticmethod
+    def _candidates(kind: str, states: List[_DayState], dry_first: List[_DayState],
+                    wet_first: List[_DayState]) -> List[_DayState]:
+        if kind == OUTDOOR:
+            return dry_first
+        if kind == INDOOR:
+            return wet_first
+        return sorted(states, key=lambda s: s.load)
+
+    @staticmethod
+    def _place(item: Tuple[int, str, str, Dict[str, Any]], candidates: List[_DayState],
+               windows: List[Tuple[int, int]], soft_cap: int) -> Optional[ScheduledVisit]:
+        _, kind, category, place = item
+        # Önce günlük yükü dengeli tutan günler denenir, olmazsa boş saati olan herhangi bir gün
+        for respect_cap in (True, False):
+            for state in candidates:
+                if respect_cap and state.load >= soft_cap:
+                    continue
+                slot = state.free_slot(windows)
+                if slot:
+                    visit = ScheduledVisit(place.get("place_name", ""), category, state.day, slot[0], slot[1], kind, state.rainy)
+                    state.book(visit)
+                    return visit
+        return None
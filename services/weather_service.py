@@ -1,73 +1,174 @@
 from typing import List, Dict, Any, Optional, Tuple
+import threading
 import requests
-from datetime import date
+from requests.adapters import HTTPAdapter
+from datetime import date, timedelta
+
+from config.settings import FORECAST_PREFETCH_DAYS, FORECAST_MAX_HORIZON_DAYS, FORECAST_BATCH_MAX_LOCATIONS
+from services.daily_forecast import DailyForecast
+from services.forecast_cache import ForecastCache, get_forecast_cache
+from services.geocoding_cache import GeocodingCache, get_geocoding_cache
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Process-wide keep-alive session for Open-Meteo requests."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
 
 class WeatherService:
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
     GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+    GEOCODE_PROVIDER = "open-meteo"
+    DAILY_FIELDS = [
+        "temperature_2m_max",
+        "temperature_2m_min",
+        "precipitation_sum",
+        "rain_sum",
+        "showers_sum",
+        "snowfall_sum",
+        "precipitation_probability_max",
+        "windspeed_10m_max"
+    ]
+
+    def __init__(self, geocoding_cache: Optional[GeocodingCache] = None, forecast_cache: Optional[ForecastCache] = None):
+        self.geocoding_cache = geocoding_cache or get_geocoding_cache()
+        self.forecast_cache = forecast_cache or get_forecast_cache()
+
+    def _geocode(self, city_name: str) -> Optional[Tuple[float, float]]:
+        params = {
+            "name": city_name,
+            "count": 1,
+            "language": "tr",
+            "format": "json"
+        }
+        resp = _get_session().get(self.GEOCODING_URL, params=params, timeout=15)
+        resp.raise_for_status()
+        data = resp.json()
+        results = data.get("results") or []
+        if not results:
+            return None
+        first = results[0]
+        return (first.get("latitude"), first.get("longitude"))
 
     def geocode_city(self, city_name: str) -> Optional[Tuple[float, float]]:
         try:
-            params = {
-                "name": city_name,
-                "count": 1,
-                "language": "tr",
-                "format": "json"
-            }
-            resp = requests.get(self.GEOCODING_URL, params=params, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-            results = data.get("results") or []
-            if not results:
-                return None
-            first = results[0]
-            return (first.get("latitude"), first.get("longitude"))
+            return self.geocoding_cache.get_or_fetch(self.GEOCODE_PROVIDER, city_name, self._geocode)
         except Exception as e:
             print(f"Error geocoding city with Open-Meteo: {e}")
             return None
 
-    def get_daily_forecast(self, latitude: float, longitude: float, start_date: date, end_date: date) -> Optional[List[Dict[str, Any]]]:
+    @staticmethod
+    def _parse_daily(data: Dict[str, Any]) -> Optional[DailyForecast]:
+        if not data or "daily" not in data:
+            return None
+        return DailyForecast.from_open_meteo(data["daily"])
+
+    def _request_daily(self, latitudes: List[float], longitudes: List[float], start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """One Open-Meteo request for one or more locations; returns the raw per-location objects."""
+        params = {
+            "latitude": ",".join(str(lat) for lat in latitudes),
+            "longitude": ",".join(str(lng) for lng in longitudes),
+            "daily": self.DAILY_FIELDS,
+            "timezone": "auto",
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        }
+        response = _get_session().get(self.BASE_URL, params=params, timeout=15)
+        response.raise_for_status()
+        data = response.json()
+        # Birden fazla konum istendiğinde Open-Meteo bir liste döndürür
+        return data if isinstance(data, list) else [data]
+
+    def _fetch_daily(self, latitude: float, longitude: float, start_date: date, end_date: date) -> Optional[DailyForecast]:
+        return self._parse_daily(self._request_daily([latitude], [longitude], start_date, end_date)[0])
+
+    def _prefetch_window(self, run_start: date, run_end: date) -> Optional[Tuple[date, date]]:
+        """Request range for a missing run, clamped to the forecast horizon; None if the run is past it."""
+        # Open-Meteo ufkun ötesindeki günler için 400 döndürür
+        horizon = date.today() + timedelta(days=FORECAST_MAX_HORIZON_DAYS - 1)
+        if run_start > horizon:
+            return None
+        # Sonraki istekler de önbellekten karşılansın diye kısa aralıklar genişletilir
+        end = max(run_end, run_start + timedelta(days=FORECAST_PREFETCH_DAYS - 1))
+        return run_start, min(end, horizon)
+
+    def get_daily_forecast(self, latitude: float, longitude: float, start_date: date, end_date: date) -> Optional[DailyForecast]:
+        """Forecast for the days that are cached or could be fetched; None only when no day is available."""
         try:
-            params = {
-                "latitude": latitude,
-                "longitude": longitude,
-                "daily": [
-                    "temperature_2m_max",
-                    "temperature_2m_min",
-                    "precipitation_sum",
-                    "rain_sum",
-                    "showers_sum",
-                    "snowfall_sum",
-                    "precipitation_probability_max",
-                    "windspeed_10m_max"
-                ],
-                "timezone": "auto",
-                "start_date": start_date.isoformat(),
-                "end_date": end_date.isoformat(),
-            }
-            response = requests.get(self.BASE_URL, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            if not data or "daily" not in data:
-                return None
-            daily = data["daily"]
-            days = []
-            for idx, day in enumerate(daily.get("time", [])):
-                days.append({
-                    "date": day,
-                    "temp_max": daily.get("temperature_2m_max", [None])[idx],
-                    "temp_min": daily.get("temperature_2m_min", [None])[idx],
-                    "precipitation_sum": daily.get("precipitation_sum", [None])[idx],
-                    "rain_sum": daily.get("rain_sum", [None])[idx],
-                    "showers_sum": daily.get("showers_sum", [None])[idx],
-                    "snowfall_sum": daily.get("snowfall_sum", [None])[idx],
-                    "precipitation_probability_max": daily.get("precipitation_probability_max", [None])[idx],
-                    "windspeed_10m_max": daily.get("windspeed_10m_max", [None])[idx],
-                })
-            return days
+            cell = self.forecast_cache.cell_for(latitude, longitude)
+            days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+            rows = self.forecast_cache.get_days(cell, days)
         except Exception as e:
             print(f"Error fetching weather: {e}")
             return None
+        # Yalnızca önbellekte olmayan gün aralıkları Open-Meteo'dan çekilir (hücre merkezi için). Bir aralık
+        # başarısız olursa diğerleri ve önbellekteki günler yine döndürülür
+        for run_start, run_end in ForecastCache.missing_runs(days, rows):
+            window = self._prefetch_window(run_start, run_end)
+            if window is None:
+                continue
+            try:
+                fetched = self._fetch_daily(cell[0], cell[1], *window)
+                if fetched:
+                    fetched_rows = list(fetched.rows())
+                    self.forecast_cache.put_days(cell, fetched_rows)
+                    rows.update(fetched_rows)
+            except Exception as e:
+                print(f"Error fetching weather for {window[0]} - {window[1]}: {e}")
+        result = [(day.isoformat(), rows[day.isoformat()]) for day in days if day.isoformat() in rows]
+        return DailyForecast.from_rows(result) if result else None
+
+    def get_daily_forecasts(self, locations: List[Tuple[float, float]], start_date: date, end_date: date) -> List[Optional[DailyForecast]]:
+        """Forecasts for many (lat, lng) pairs with as few HTTP requests as possible.
+
+        Locations sharing a grid cell are fetched once, cells that are not fully
+        cached are fetched FORECAST_BATCH_MAX_LOCATIONS at a time, and each result
+        is an array-backed DailyForecast aligned with `locations` (None where no
+        forecast is available).
+        """
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        cells = [self.forecast_cache.cell_for(lat, lng) for lat, lng in locations]
+        rows_by_cell: Dict[Tuple[float, float], Dict[str, Tuple[float, ...]]] = {}
+        to_fetch = []
+        for cell in dict.fromkeys(cells):
+            rows_by_cell[cell] = self.forecast_cache.get_days(cell, days)
+            if len(rows_by_cell[cell]) < len(days):
+                to_fetch.append(cell)
+
+        window = self._prefetch_window(start_date, end_date)
+        if to_fetch and window:
+            for i in range(0, len(to_fetch), FORECAST_BATCH_MAX_LOCATIONS):
+                chunk = to_fetch[i:i + FORECAST_BATCH_MAX_LOCATIONS]
+                try:
+                    payloads = self._request_daily([c[0] for c in chunk], [c[1] for c in chunk], *window)
+                except Exception as e:
+                    print(f"Error fetching weather for {len(chunk)} locations: {e}")
+                    continue
+                for cell, payload in zip(chunk, payloads):
+                    fetched = self._parse_daily(payload)
+                    if fetched:
+                        fetched_rows = list(fetched.rows())
+                        self.forecast_cache.put_days(cell, fetched_rows)
+                        rows_by_cell[cell].update(fetched_rows)
+
+        results: List[Optional[DailyForecast]] = []
+        for cell in cells:
+            cell_rows = rows_by_cell[cell]
+            rows = [(day.isoformat(), cell_rows[day.isoformat()]) for day in days if day.isoformat() in cell_rows]
+            results.append(DailyForecast.from_rows(rows) if rows else None)
+        return results
 
     @staticmethod
     def will_likely_rain(day: Dict[str, Any]) -> bool:
@@ -0,0 +1,56 @@
+import math
+import random
+import unittest
+
+from services.geo import (EARTH_RADIUS_KM, geohash_cover, geohash_encode, haversine_km, haversine_km_from,
+                          haversine_matrix)
+
+
+def _destination(latitude: float, longitude: float, bearing: float, distance_km: float):
+    """Point reached from (latitude, longitude) after distance_km along a great circle."""
+    phi1, lambda1, delta = math.radians(latitude), math.radians(longitude), distance_km / EARTH_RADIUS_KM
+    phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(bearing))
+    lambda2 = lambda1 + math.atan2(math.sin(bearing) * math.sin(delta) * math.cos(phi1),
+                                   math.cos(delta) - math.sin(phi1) * math.sin(phi2))
+    return math.degrees(phi2), (math.degrees(lambda2) + 540.0) % 360.0 - 180.0
+
+
+class HaversineTest(unittest.TestCase):
+    def test_known_distance(self):
+        # İstanbul (Sultanahmet) - Ankara (Kızılay) ~ 350 km
+        self.assertAlmostEqual(haversine_km(41.0054, 28.9768, 39.9208, 32.8541), 350.0, delta=5.0)
+
+    def test_vectorized_and_matrix_agree(self):
+        points = [(41.0, 29.0), (38.4, 27.1), (36.9, 30.7)]
+        distances = haversine_km_from(41.0, 29.0, [p[0] for p in points] + [None], [p[1] for p in points] + [None])
+        self.assertIsNone(distances[-1])
+        matrix = haversine_matrix(points)
+        for j, (lat, lng) in enumerate(points):
+            self.assertAlmostEqual(distances[j], haversine_km(41.0, 29.0, lat, lng), places=6)
+            self.assertAlmostEqual(matrix[0][j], distances[j], places=6)
+            self.assertEqual(matrix[j][0], matrix[0][j])
+
+
+class GeohashCoverTest(unittest.TestCase):
+    def test_known_geohash(self):
+        self.assertEqual(geohash_encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_cover_contains_every_point_of_the_circle(self):
+        rng = random.Random(0)
+        centers = [(41.0082, 28.9784), (36.8969, 30.7133), (0.0, 0.0), (-33.9, 18.4), (65.0, 25.0), (10.0, 179.99)]
+        for latitude, longitude in centers:
+            for radius in (0.3, 2.0, 15.0, 120.0):
+                prefixes = geohash_cover(latitude, longitude, radius)
+                self.assertLessEqual(len(prefixes), 9)
+                for _ in range(300):
+                    point = _destination(latitude, longitude, rng.uniform(0, 2 * math.pi), rng.uniform(0, radius * 0.999))
+                    code = geohash_encode(*point)
+                    self.assertTrue(any(code.startswith(prefix) for prefix in prefixes),
+                                    f"{point} outside cover of {(latitude, longitude)} r={radius}")
+
+    def test_huge_radius_covers_everything(self):
+        self.assertEqual(geohash_cover(41.0, 29.0, 20000.0), [""])
+
+
+if __name__ == "__main__":
+    unittest.main()
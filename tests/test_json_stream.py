@@ -0,0 +1,82 @@
+import json
+import random
+import unittest
+
+from services.json_stream import IncompleteJsonError, JsonArrayStream, iter_json_array
+
+ITEMS = [
+    {"title": "Galata \"Kulesi\" [x] {y}", "location": {"lat": 41.02, "lng": 28.97}, "tags": ["a", "]"]},
+    {"title": "Kaçış \\", "nested": [1, [2, {"z": "}"}]]},
+    {"title": "Çamlıca"},
+]
+
+
+def _split(text: str, rng: random.Random):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 30))))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+class JsonArrayStreamTest(unittest.TestCase):
+    def test_split_chunks_give_same_items(self):
+        text = json.dumps(ITEMS, ensure_ascii=False)
+        rng = random.Random(0)
+        for _ in range(200):
+            self.assertEqual(list(iter_json_array(_split(text, rng))), ITEMS)
+        self.assertEqual(list(iter_json_array(list(text))), ITEMS)
+
+    def test_fence_and_prose_around_array(self):
+        text = "Tabii! İşte öneriler:\n```json\n" + json.dumps(ITEMS, ensure_ascii=False, indent=2) + "\n```\nİyi gezmeler [son]"
+        self.assertEqual(list(iter_json_array([text])), ITEMS)
+
+    def test_bracket_in_prose_before_array(self):
+        text = 'Aşağıda [3 öneri] var: [{"title":"A"}]'
+        self.assertEqual(list(iter_json_array([text])), [{"title": "A"}])
+        # '[' ile ardından gelen '{' farklı parçalarda olabilir
+        self.assertEqual(list(iter_json_array(["Liste: [", "  \n", '{"title":"B"}]'])), [{"title": "B"}])
+
+    def test_braces_inside_strings(self):
+        text = '[{"title":"{[\\"}]"},{"title":"ok"}]'
+        self.assertEqual(list(iter_json_array([text])), [{"title": '{["}]'}, {"title": "ok"}])
+
+    def test_objects_emitted_as_soon_as_closed(self):
+        parser = JsonArrayStream()
+        self.assertEqual(parser.feed('[{"a":1},{"b":'), [{"a": 1}])
+        self.assertEqual(parser.feed('2}]'), [{"b": 2}])
+        self.assertTrue(parser.done)
+
+    def test_bare_object_and_invalid_elements(self):
+        self.assertEqual(list(iter_json_array(['{"title":"tek"}'])), [{"title": "tek"}])
+        parser = JsonArrayStream()
+        # Skaler elemanlar atlanır; nesne olmayan ya da bozuk elemanlar errors ile sayılır
+        self.assertEqual(parser.feed('[{"a":1}, 1, "s", [2], {bad}, {"b":2}]'), [{"a": 1}, {"b": 2}])
+        self.assertEqual(parser.errors, 2)
+
+    def test_brace_in_prose_before_array(self):
+        text = 'Here is {the list}: [{"title":"A"},{"title":"B"}]'
+        self.assertEqual(list(iter_json_array([text])), [{"title": "A"}, {"title": "B"}])
+
+    def test_wrapper_object_is_descended(self):
+        text = json.dumps({"note": "[{ değil }]", "recommendations": ITEMS, "count": 3}, ensure_ascii=False)
+        rng = random.Random(1)
+        for _ in range(200):
+            self.assertEqual(list(iter_json_array(_split(text, rng))), ITEMS)
+        parser = JsonArrayStream()
+        self.assertEqual(parser.feed('Sonuç: {"recommendations": [{"a":1},'), [{"a": 1}])
+        self.assertEqual(parser.feed('{"b":2}]}'), [{"b": 2}])
+        self.assertTrue(parser.done)
+
+    def test_object_with_nested_arrays_is_not_a_wrapper(self):
+        item = {"title": "A", "image_urls": [], "tags": ["x"], "location": {"lat": 1, "lng": 2}}
+        self.assertEqual(list(iter_json_array([json.dumps(item)])), [item])
+
+    def test_truncated_stream_raises(self):
+        stream = iter_json_array(['[{"title":"A"},{"title":'])
+        self.assertEqual(next(stream), {"title": "A"})
+        with self.assertRaises(IncompleteJsonError):
+            next(stream)
+        with self.assertRaises(IncompleteJsonError):
+            list(iter_json_array(["Üzgünüm, öneri yok."]))
+
+
+if __name__ == "__main__":
+    unittest.main()
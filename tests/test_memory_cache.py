@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from services.memory_cache import MISSING, MemoryCache
+
+
+class MemoryCacheTest(unittest.TestCase):
+    def test_lru_eviction_by_entry_count(self):
+        cache = MemoryCache(max_entries=2, max_bytes=1000, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # "a" en son kullanılan olur
+        cache.set("c", 3)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget_eviction(self):
+        cache = MemoryCache(max_entries=10, max_bytes=100, ttl_seconds=60)
+        cache.set("a", "x", size_bytes=40)
+        cache.set("b", "y", size_bytes=40)
+        cache.set("c", "z", size_bytes=40)
+        self.assertIs(cache.get("a"), MISSING)
+        self.assertEqual(cache.stats()["bytes"], 80)
+        # Tek başına bütçeyi aşan değer hiç saklanmaz ve diğerlerini çıkarmaz
+        cache.set("huge", "w", size_bytes=101)
+        self.assertIs(cache.get("huge"), MISSING)
+        self.assertEqual((cache.get("b"), cache.get("c")), ("y", "z"))
+
+    def test_replacing_a_key_updates_bytes(self):
+        cache = MemoryCache(max_entries=10, max_bytes=100, ttl_seconds=60)
+        cache.set("a", 1, size_bytes=60)
+        cache.set("a", 2, size_bytes=30)
+        self.assertEqual(cache.stats()["bytes"], 30)
+        self.assertEqual(cache.get("a"), 2)
+
+    def test_ttl_expiry_and_per_entry_override(self):
+        with mock.patch("services.memory_cache.time.monotonic", return_value=1000.0) as now:
+            cache = MemoryCache(max_entries=10, max_bytes=100, ttl_seconds=60)
+            cache.set("default", 1)
+            cache.set("short", None, ttl_seconds=5)
+            now.return_value = 1004.0
+            # None geçerli bir değerdir; MISSING'den ayrılır
+            self.assertIsNone(cache.get("short"))
+            now.return_value = 1006.0
+            self.assertIs(cache.get("short"), MISSING)
+            self.assertEqual(cache.get("default"), 1)
+            now.return_value = 1061.0
+            self.assertIs(cache.get("default"), MISSING)
+        stats = cache.stats()
+        self.assertEqual((stats["expirations"], stats["entries"], stats["bytes"]), (2, 0, 0))
+
+    def test_invalidate_and_clear(self):
+        cache = MemoryCache(max_entries=10, max_bytes=100, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertTrue(cache.invalidate("a"))
+        self.assertFalse(cache.invalidate("a"))
+        cache.clear()
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from services.query_cache import NearDuplicateIndex, cache_key, canonical_query, split_cache_key, tokens_match
+
+
+class CacheKeyTest(unittest.TestCase):
+    def test_spelling_variants_share_a_key(self):
+        self.assertEqual(canonical_query(" İSTANBUL. "), "istanbul")
+        self.assertEqual(cache_key("İstanbul"), cache_key("istanbul", {"category": "Tümü", "rating": 0, "features": []}))
+        self.assertEqual(cache_key("Bodrum", {"features": ["Plaj", "aile"]}),
+                         cache_key("bodrum", {"features": ["aile", "plaj", "Plaj"]}))
+
+    def test_filters_change_the_key(self):
+        self.assertNotEqual(cache_key("Bodrum"), cache_key("Bodrum", {"category": "Müze"}))
+        self.assertNotEqual(cache_key("Bodrum", {"rating": 4}), cache_key("Bodrum", {"rating": 4.5}))
+
+    def test_split_folds_older_raw_keys(self):
+        self.assertEqual(split_cache_key('İzmir_{"category": "Tümü"}'), ("izmir", "{}"))
+        self.assertEqual(split_cache_key(cache_key("Muğla", {"category": "Doğa"})), ("mugla", '{"category": "doga"}'))
+
+
+class NearDuplicateIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NearDuplicateIndex([cache_key("Fethiye"), cache_key("İzmir"), cache_key("İzmir Konak"),
+                                         cache_key("Antalya", {"category": "Müze"})], threshold=0.8)
+
+    def test_typos_are_accepted(self):
+        self.assertEqual(self.index.closest(cache_key("Fethiyee")), cache_key("Fethiye"))
+        self.assertEqual(self.index.closest(cache_key("Antalyaa", {"category": "Müze"})),
+                         cache_key("Antalya", {"category": "Müze"}))
+
+    def test_different_places_are_rejected(self):
+        self.assertIsNone(self.index.closest(cache_key("İzmit")))
+        self.assertIsNone(self.index.closest(cache_key("İzmit Konak")))
+        self.assertFalse(tokens_match("sehir 0", "sehir 1", 0.8))
+
+    def test_filters_must_match(self):
+        self.assertIsNone(self.index.closest(cache_key("Antalyaa")))
+        self.assertIsNone(self.index.closest(cache_key("Fethiyee", {"category": "Plaj"})))
+
+    def test_discard_and_size_limit(self):
+        self.index.discard(cache_key("Fethiye"))
+        self.assertIsNone(self.index.closest(cache_key("Fethiyee")))
+        small = NearDuplicateIndex(max_entries=2)
+        for city in ("Fethiye", "Kaş", "Bodrum"):
+            small.add(cache_key(city))
+        self.assertEqual(len(small), 2)
+        self.assertIsNone(small.closest(cache_key("Fethiyee")))
+        self.assertEqual(small.closest(cache_key("Bodrumm")), cache_key("Bodrum"))
+
+
+if __name__ == "__main__":
+    unittest.main()
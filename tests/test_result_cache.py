@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from database.database_manager import DatabaseManager, ResultCachePolicy
+
+PAYLOAD = {"recommendations": [{"title": "Galata Kulesi", "description": "", "rating": 4.6, "category": "Tarihi Yer",
+                                "location": {}, "image_urls": None}]}
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _db(self, **policy) -> DatabaseManager:
+        policy.setdefault("compact_every_n_writes", 0)
+        db = DatabaseManager(os.path.join(self.tmp.name, f"{len(os.listdir(self.tmp.name))}.db"), ResultCachePolicy(**policy))
+        self.addCleanup(db.close)
+        return db
+
+    @staticmethod
+    def _set(db: DatabaseManager, key: str, hit_count: int, accessed: str, created: str = "now") -> None:
+        with db._get_connection() as conn:
+            conn.execute("""
+                UPDATE recommendation_cache SET hit_count = ?, last_accessed_at = datetime('now', ?), created_at = datetime('now', ?)
+                WHERE cache_key = ?;
+            """, (hit_count, accessed, created if created != "now" else "0 seconds", key))
+            conn.commit()
+
+    @staticmethod
+    def _keys(db: DatabaseManager):
+        with db._get_connection() as conn:
+            return sorted(row[0] for row in conn.execute("SELECT cache_key FROM recommendation_cache;"))
+
+    def _fill(self, db: DatabaseManager) -> None:
+        # "popular" çok kullanılmış ama uzun zamandır erişilmemiş, "recent" tam tersi
+        for key in ("popular", "recent", "cold"):
+            db.save_search_result(key, PAYLOAD)
+        self._set(db, "popular", 50, "-5 hours")
+        self._set(db, "recent", 1, "-1 minutes")
+        self._set(db, "cold", 0, "-10 hours")
+
+    def test_lru_keeps_recently_used(self):
+        db = self._db(eviction="lru", max_rows=1)
+        self._fill(db)
+        self.assertEqual(db.compact_result_cache(), 2)
+        self.assertEqual(self._keys(db), ["recent"])
+
+    def test_lfu_keeps_frequently_used(self):
+        db = self._db(eviction="lfu", max_rows=2)
+        self._fill(db)
+        self.assertEqual(db.compact_result_cache(), 1)
+        self.assertEqual(self._keys(db), ["popular", "recent"])
+
+    def test_lfu_counts_memory_tier_hits(self):
+        db = self._db(eviction="lfu", max_rows=1)
+        self._fill(db)
+        for _ in range(60):
+            db.record_memory_hit("cold")
+        db.compact_result_cache()
+        self.assertEqual(self._keys(db), ["cold"])
+
+    def test_expired_rows_and_byte_limit(self):
+        db = self._db(max_age_seconds=3600, max_bytes=len(str(PAYLOAD)) * 2)
+        self._fill(db)
+        self._set(db, "cold", 0, "-10 hours", created="-2 hours")
+        self.assertIsNone(db.get_cached_results("cold"))
+        db.save_search_result("newest", PAYLOAD)
+        db.compact_result_cache()
+        # Süresi dolan satır silinir, kalanlardan bayt sınırına sığan en yeniler tutulur
+        self.assertEqual(self._keys(db), ["newest", "recent"])
+        stats = db.get_cache_stats()
+        self.assertEqual((stats["expired"], stats["evictions"]), (1, 2))
+
+    def test_empty_payload_is_a_miss(self):
+        db = self._db()
+        db.save_search_result("empty", {"recommendations": []})
+        db.save_search_result("full", PAYLOAD)
+        self.assertIsNone(db.get_cached_results("empty"))
+        self.assertEqual(db.get_cached_results("full"), PAYLOAD)
+        stats = db.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ResultCachePolicy(eviction="fifo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import itertools
+import random
+import time
+import unittest
+
+from services.geo import haversine_matrix
+from services.route_optimizer import RouteOptimizer, nearest_neighbour, or_opt, path_cost, two_opt
+
+
+def _random_points(rng: random.Random, count: int):
+    return [(rng.uniform(40.9, 41.1), rng.uniform(28.8, 29.2)) for _ in range(count)]
+
+
+def _far_future() -> float:
+    return time.perf_counter() + 60
+
+
+class LocalSearchTest(unittest.TestCase):
+    def test_two_opt_never_lengthens_the_path(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            matrix = haversine_matrix(_random_points(rng, rng.randint(3, 25)))
+            start = list(range(len(matrix)))
+            rng.shuffle(start)
+            improved = two_opt(start, matrix, _far_future())
+            self.assertLessEqual(path_cost(improved, matrix), path_cost(start, matrix) + 1e-9)
+            self.assertEqual(improved[0], start[0])
+            self.assertEqual(sorted(improved), sorted(start))
+
+    def test_or_opt_never_lengthens_the_path(self):
+        rng = random.Random(1)
+        for _ in range(30):
+            matrix = haversine_matrix(_random_points(rng, rng.randint(3, 20)))
+            start = nearest_neighbour(matrix, 0)
+            improved = or_opt(start, matrix, _far_future())
+            self.assertLessEqual(path_cost(improved, matrix), path_cost(start, matrix) + 1e-9)
+            self.assertEqual(improved[0], 0)
+            self.assertEqual(sorted(improved), list(range(len(matrix))))
+
+    def test_small_routes_are_optimal(self):
+        rng = random.Random(2)
+        for _ in range(20):
+            matrix = haversine_matrix(_random_points(rng, 7))
+            order = RouteOptimizer(time_budget_seconds=5)._improve(nearest_neighbour(matrix, 0), matrix, _far_future())
+            best = min(path_cost([0] + list(p), matrix) for p in itertools.permutations(range(1, 7)))
+            # 2-opt + Or-opt yerel en iyidir; küçük örneklerde en iyiye çok yakın olmalı
+            self.assertLessEqual(path_cost(order, matrix), best * 1.05 + 1e-9)
+
+
+class RouteOptimizerTest(unittest.TestCase):
+    def test_first_stop_fixed_and_unlocated_stops_last(self):
+        rng = random.Random(3)
+        points = _random_points(rng, 8)
+        points.insert(3, None)
+        points.append(None)
+        order = RouteOptimizer().optimize(points)
+        self.assertEqual(order[0], 0)
+        self.assertEqual(order[-2:], [3, 9])
+        self.assertEqual(sorted(order), list(range(10)))
+
+    def test_travel_matrix_refinement_never_worse(self):
+        rng = random.Random(4)
+        points = _random_points(rng, 12)
+        # Asimetrik süre matrisi: haversine sırasından daha kötü bir sonuç kabul edilmemeli
+        travel = [[rng.uniform(1, 60) if i != j else 0.0 for j in range(12)] for i in range(12)]
+        baseline = RouteOptimizer().optimize(points)
+        refined = RouteOptimizer(lambda coords, mode: travel).optimize(points)
+        self.assertLessEqual(path_cost(refined, travel), path_cost(baseline, travel) + 1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
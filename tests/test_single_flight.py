@@ -0,0 +1,89 @@
+import threading
+import unittest
+
+from services.single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def _slow(self, value="sonuç", error=None):
+        def fn():
+            self.calls += 1
+            self.started.set()
+            self.release.wait(5)
+            if error:
+                raise error
+            return value
+        return fn
+
+    def _run_leader(self, fn, results):
+        def target():
+            try:
+                results.append(self.flights.do("k", fn))
+            except Exception as e:
+                results.append(e)
+        thread = threading.Thread(target=target)
+        thread.start()
+        self.assertTrue(self.started.wait(5))
+        return thread
+
+    def _run_waiters(self, count, fn, results):
+        threads = [threading.Thread(target=lambda: results.append(self.flights.do("k", fn, timeout=5))) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        # Bekleyenler lidere bağlanana kadar lider bırakılmaz
+        while self.flights.stats()["coalesced"] < count:
+            threading.Event().wait(0.001)
+        return threads
+
+    def test_waiters_share_the_leader_result(self):
+        results = []
+        leader = self._run_leader(self._slow(), results)
+        waiters = self._run_waiters(5, lambda: "kendi", results)
+        self.release.set()
+        for thread in [leader] + waiters:
+            thread.join(5)
+        self.assertEqual(results, ["sonuç"] * 6)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flights.stats(), {"leaders": 1, "coalesced": 5, "in_flight": 0})
+
+    def test_leader_error_is_raised_and_waiters_run_their_own(self):
+        results = []
+        leader = self._run_leader(self._slow(error=RuntimeError("sağlayıcı hatası")), results)
+        waiters = self._run_waiters(3, lambda: "kendi", results)
+        self.release.set()
+        for thread in [leader] + waiters:
+            thread.join(5)
+        errors = [r for r in results if isinstance(r, Exception)]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(str(errors[0]), "sağlayıcı hatası")
+        self.assertEqual(sorted(r for r in results if not isinstance(r, Exception)), ["kendi"] * 3)
+        self.assertEqual(self.flights.stats()["in_flight"], 0)
+
+    def test_waiter_timeout_runs_its_own(self):
+        results = []
+        leader = self._run_leader(self._slow(), results)
+        call, is_leader = self.flights.begin("k")
+        self.assertFalse(is_leader)
+        self.assertEqual(call.wait(0.01), (False, None))
+        self.release.set()
+        leader.join(5)
+        self.assertEqual(call.wait(0), (True, "sonuç"))
+
+    def test_finish_is_idempotent_and_next_call_leads(self):
+        call, is_leader = self.flights.begin("k")
+        self.assertTrue(is_leader)
+        self.flights.finish("k", call, result=1)
+        self.flights.finish("k", call, succeeded=False)
+        self.assertEqual(call.wait(0), (True, 1))
+        _, is_leader = self.flights.begin("k")
+        self.assertTrue(is_leader)
+
+
+if __name__ == "__main__":
+    unittest.main()
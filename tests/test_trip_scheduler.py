@@ -0,0 +1,55 @@
+import random
+import unittest
+from datetime import date, timedelta
+
+from services.trip_scheduler import DAY_END_HOUR, DAY_START_HOUR, TripScheduler
+
+CATEGORIES = ["Müze", "Park", "Kafe", "Plaj", "Tarihi Yer"]
+
+
+class _FixedWindows:
+    """Suggests the same off-grid windows for every category, the worst case for fragmentation."""
+
+    def suggest_hours(self, category, place_name=None):
+        return "09:00-11:00", "14:00-16:00"
+
+
+class TripSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TripScheduler(_FixedWindows())
+        self.start = date(2026, 7, 1)
+
+    def _schedule(self, count: int, days: int, seed: int = 0):
+        rng = random.Random(seed)
+        places = [{"place_name": f"Yer {i}", "category": rng.choice(CATEGORIES)} for i in range(count)]
+        return self.scheduler.schedule(places, self.start, self.start + timedelta(days=days - 1))
+
+    def test_everything_fits_when_capacity_allows(self):
+        per_day = (DAY_END_HOUR - DAY_START_HOUR) // 2
+        for days in (1, 3, 7):
+            for seed in range(5):
+                schedule = self._schedule(per_day * days, days, seed)
+                self.assertEqual(schedule.unscheduled, [], f"{days} days, seed {seed}")
+                self.assertEqual(len(schedule.visits), per_day * days)
+
+    def test_only_overflow_is_unscheduled(self):
+        per_day = (DAY_END_HOUR - DAY_START_HOUR) // 2
+        schedule = self._schedule(50, 7)
+        self.assertEqual(len(schedule.unscheduled), 50 - per_day * 7)
+
+    def test_visits_stay_in_day_bounds_and_do_not_overlap(self):
+        schedule = self._schedule(45, 7, seed=3)
+        for visits in schedule.by_day().values():
+            for visit in visits:
+                self.assertGreaterEqual(visit.start_hour, DAY_START_HOUR)
+                self.assertLessEqual(visit.end_hour, DAY_END_HOUR)
+            for before, after in zip(visits, visits[1:]):
+                self.assertLessEqual(before.end_hour, after.start_hour)
+
+    def test_suggested_window_used_when_day_is_free(self):
+        schedule = self._schedule(1, 1)
+        self.assertEqual(schedule.visits[0].time_window, "09:00-11:00")
+
+
+if __name__ == "__main__":
+    unittest.main()